@@ -3,11 +3,6 @@ import json
 import logging
 log = logging.getLogger(__name__)
 
-try:
-    import requests
-except ImportError:
-    raise ImportError("Missing dependency: python-requests")
-
 
 class UnauthorizedError(Exception):
     pass
@@ -89,6 +84,10 @@ class GrapheneAPI(object):
 
                 info -> grapheneapi.info()
         """
+        try:
+            import requests
+        except ImportError:
+            raise ImportError("Missing dependency: python-requests")
         try:
             response = requests.post("http://{}:{}/rpc".format(self.host,
                                                                self.port),
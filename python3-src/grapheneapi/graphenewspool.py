@@ -0,0 +1,373 @@
+import random
+import threading
+import time
+import logging
+
+from .graphenewsrpc import GrapheneWebsocketRPC, RPCError, NumRetriesReached
+
+log = logging.getLogger(__name__)
+
+
+class GrapheneWebsocketNode(GrapheneWebsocketRPC):
+    """ Connection to a single node of a ``GrapheneWebsocketPool``
+
+        Instead of registering to a fixed set of APIs, it registers to
+        the APIs the pool has registered to and remembers how the API
+        ids of the pool map onto its own.
+    """
+    def __init__(self, url, user, password, pool, **kwargs):
+        self.owner = pool
+        self.api_map = {1: 1}
+        super(GrapheneWebsocketNode, self).__init__(
+            url, user, password, **kwargs)
+
+    def register_apis(self):
+        for method, args, pool_api_id in self.owner.registrations:
+            self.add_api(method, args, pool_api_id,
+                         getattr(self, method)(*args, api_id=1))
+
+    def add_api(self, method, args, pool_api_id, api_id):
+        """ Remember that ``pool_api_id`` is ``api_id`` on this node
+        """
+        self.api_map[pool_api_id] = api_id
+        if method == "get_api_by_name":
+            self.api_id[args[0].replace("_api", "")] = api_id
+        else:
+            self.api_id[method] = api_id
+
+    def _connection_lost(self):
+        """ Let the pool renew the subscriptions on another node
+        """
+        if self._subscriptions:
+            threading.Thread(
+                target=self.owner._renew,
+                args=(self,),
+                name="GrapheneWebsocketPool-renew",
+                daemon=True
+            ).start()
+
+    def translate(self, payload):
+        """ Rewrite the API id of a payload built by the pool
+        """
+        params = list(payload["params"])
+        params[0] = self.api_map.get(params[0], params[0])
+        return dict(payload, params=params)
+
+
+class GrapheneWebsocketPoolNode(object):
+    """ Health statistics of a node in a ``GrapheneWebsocketPool``
+
+        :param str url: Websocket URL of the node
+    """
+
+    #: Weight of the latest call in the moving averages
+    alpha = 0.2
+
+    def __init__(self, url):
+        self.url = url
+        self.rpc = None
+        self.latency = None
+        self.error_rate = 0.0
+        self.calls = 0
+        self.failures = 0
+        self.ejections = 0
+        self.ejected_until = 0
+
+    def healthy(self):
+        return time.time() >= self.ejected_until
+
+    def score(self):
+        """ Lower is better
+        """
+        return (self.latency or 0) * (1 + 4 * self.error_rate)
+
+    def success(self, elapsed):
+        self.calls += 1
+        if self.latency is None:
+            self.latency = elapsed
+        else:
+            self.latency += self.alpha * (elapsed - self.latency)
+        self.error_rate *= (1 - self.alpha)
+        self.ejections = 0
+
+    def failure(self, eject_time):
+        """ Drop the connection and eject the node for a while. The time
+            doubles with every consecutive ejection.
+        """
+        self.calls += 1
+        self.failures += 1
+        self.error_rate += self.alpha * (1 - self.error_rate)
+        if self.rpc:
+            try:
+                self.rpc.ws.close()
+            except Exception:
+                pass
+        self.rpc = None
+        self.ejections += 1
+        self.ejected_until = time.time() + min(
+            eject_time * 2 ** (self.ejections - 1), 300)
+
+    def stats(self):
+        return {
+            "url": self.url,
+            "connected": self.rpc is not None,
+            "healthy": self.healthy(),
+            "latency": self.latency,
+            "error_rate": self.error_rate,
+            "calls": self.calls,
+            "failures": self.failures,
+        }
+
+
+class GrapheneWebsocketPool(object):
+    """ Pool of connections to several nodes
+
+        :param list urls: Websocket URLs of the nodes
+        :param str user: Username for Authentication
+        :param str password: Password for Authentication
+        :param int num_retries: Retry x times when all nodes failed, -1
+            for indefinitely
+        :param int eject_time: Seconds a failed node is left alone before
+            it is tried again (doubles with every consecutive failure)
+
+        Every call is routed to the node with the lowest moving average
+        of latency, weighed by its recent error rate. Read-only calls
+        (everything but ``network_broadcast``) are spread over the
+        nodes by picking the better one of two random healthy nodes.
+        Nodes that lose their connection are ejected and the call is
+        retried on the next node. Ejected nodes are re-admitted after
+        ``eject_time``.
+
+        Calls to the login API (``api_id=1``) go to all nodes. This way,
+        all nodes register to the same APIs. The pool uses the API ids
+        of the first node and translates them for the others.
+
+        The pool is used by ``GrapheneWebsocketRPC`` when called with
+        ``pool=True`` and a list of URLs, e.g.:
+
+        .. code-block:: python
+
+            steem = Steem(node=["wss://node-a", "wss://node-b"], pool=True)
+            print(steem.rpc.pool.stats())
+    """
+    def __init__(self, urls, user="", password="", **kwargs):
+        self.nodes = [GrapheneWebsocketPoolNode(url) for url in urls]
+        self.user = user
+        self.password = password
+        self.num_retries = kwargs.get("num_retries", -1)
+        self.eject_time = kwargs.get("eject_time", 10)
+        self._lock = threading.RLock()
+
+        #: (method, args, api id of the pool) of all API registrations
+        self.registrations = []
+        #: API names by API id of the pool
+        self.api_names = {}
+        #: ``[connection, subscription id of the connection, name,
+        #: callback, args, kwargs]`` by subscription id of the pool
+        self.subscriptions = {}
+        self._subscription_id = 0
+
+        for node in self.nodes:
+            try:
+                self._connect(node)
+            except Exception as e:
+                log.warning("Cannot connect to %s: %s" % (node.url, str(e)))
+                node.failure(self.eject_time)
+
+    @property
+    def url(self):
+        node = self._select()
+        return node.url if node else self.nodes[0].url
+
+    def stats(self):
+        """ Returns the health statistics of all nodes
+        """
+        return [node.stats() for node in self.nodes]
+
+    def _connect(self, node):
+        with self._lock:
+            if not node.rpc:
+                node.rpc = GrapheneWebsocketNode(
+                    node.url, self.user, self.password, self, num_retries=0)
+            return node.rpc
+
+    def _select(self, exclude=set(), read_only=False):
+        """ Pick the node for the next call (internally used)
+        """
+        candidates = [
+            node for node in self.nodes
+            if node.healthy() and node not in exclude
+        ]
+        if not candidates:
+            return None
+        # Measure all nodes first
+        unmeasured = [node for node in candidates if node.latency is None]
+        if unmeasured:
+            return random.choice(unmeasured)
+        if read_only and len(candidates) > 1:
+            candidates = random.sample(candidates, 2)
+        return min(candidates, key=lambda node: node.score())
+
+    def _route(self, read_only, call):
+        """ Run ``call(node)`` on the best node, failing over to the
+            next one if the connection breaks (internally used)
+        """
+        cnt = 0
+        while True:
+            tried = set()
+            while True:
+                node = self._select(tried, read_only)
+                if not node:
+                    break
+                tried.add(node)
+                start = time.time()
+                try:
+                    result = call(node)
+                except RPCError:
+                    # The node answered, the call is to blame
+                    node.success(time.time() - start)
+                    raise
+                except KeyboardInterrupt:
+                    raise
+                except Exception as e:
+                    log.warning("Node %s failed: %s" % (node.url, str(e)))
+                    node.failure(self.eject_time)
+                    continue
+                node.success(time.time() - start)
+                return result
+
+            cnt += 1
+            if self.num_retries > -1 and cnt > self.num_retries:
+                raise NumRetriesReached()
+            sleeptime = (cnt - 1) * 2 if cnt < 10 else 10
+            log.warning(
+                "All nodes failed (%d/%d). " % (cnt, self.num_retries) +
+                "Retrying in %d seconds" % sleeptime
+            )
+            time.sleep(sleeptime)
+            for node in self.nodes:
+                node.ejected_until = 0
+
+    def _is_read_only(self, payload):
+        return self.api_names.get(payload["params"][0]) != "network_broadcast"
+
+    def rpcexec(self, payload):
+        """ Execute a call on the best node
+
+            :param json payload: Payload data
+        """
+        if payload["params"][0] == 1:
+            return self._register(payload)
+        return self._route(
+            self._is_read_only(payload),
+            lambda node: self._connect(node).rpcexec(
+                node.rpc.translate(payload))
+        )
+
+    def rpcexec_many(self, queries):
+        """ Execute several calls on the best node, see
+            ``GrapheneWebsocketRPC.rpcexec_many()``
+        """
+        read_only = all(self._is_read_only(q) for q in queries)
+        return self._route(
+            read_only,
+            lambda node: self._connect(node).rpcexec_many(
+                [node.rpc.translate(q) for q in queries])
+        )
+
+    def subscribe(self, name, callback, *args, **kwargs):
+        """ Subscribe to notices of the best node, see
+            ``GrapheneWebsocketRPC.subscribe()``
+
+            If the connection to that node is lost, the subscription is
+            renewed on the next best node.
+        """
+        rpc, node_subscription = self._subscribe(name, callback, args, kwargs)
+        with self._lock:
+            self._subscription_id += 1
+            subscription = self._subscription_id
+            self.subscriptions[subscription] = [
+                rpc, node_subscription, name, callback, args, kwargs]
+        return subscription
+
+    def _subscribe(self, name, callback, args, kwargs):
+        def subscribe(node):
+            rpc = self._connect(node)
+            return rpc, rpc.subscribe(name, callback, *args, **kwargs)
+        return self._route(True, subscribe)
+
+    def unsubscribe(self, subscription):
+        """ Cancel a subscription of ``subscribe()``
+        """
+        with self._lock:
+            entry = self.subscriptions.pop(subscription, None)
+        if entry and entry[0]:
+            entry[0].unsubscribe(entry[1])
+
+    def _renew(self, rpc):
+        """ Subscribe again on another node after the connection ``rpc``
+            has been lost (internally used)
+        """
+        with self._lock:
+            for node in self.nodes:
+                if node.rpc is rpc:
+                    node.failure(self.eject_time)
+            lost = [
+                (subscription, entry)
+                for subscription, entry in self.subscriptions.items()
+                if entry[0] is rpc
+            ]
+            for _, entry in lost:
+                entry[0] = None
+        for subscription, (_, _, name, callback, args, kwargs) in lost:
+            try:
+                new_rpc, node_subscription = self._subscribe(
+                    name, callback, args, kwargs)
+            except Exception as e:
+                log.error(
+                    "Could not renew subscription to %s: %s" % (name, str(e)))
+                continue
+            log.warning(
+                "Renewed subscription to %s on %s" % (name, new_rpc.url))
+            with self._lock:
+                entry = self.subscriptions.get(subscription)
+                if entry:
+                    entry[0], entry[1] = new_rpc, node_subscription
+            if not entry:
+                # Cancelled in the meantime
+                new_rpc.unsubscribe(node_subscription)
+
+    def _register(self, payload):
+        """ Send a call of the login API to all nodes and return the
+            result of the first one (internally used)
+        """
+        method, args = payload["params"][1], payload["params"][2]
+        results = []
+        for node in self.nodes:
+            if not node.healthy():
+                continue
+            try:
+                results.append(
+                    (node, self._connect(node).rpcexec(payload)))
+            except RPCError:
+                raise
+            except KeyboardInterrupt:
+                raise
+            except Exception as e:
+                log.warning("Node %s failed: %s" % (node.url, str(e)))
+                node.failure(self.eject_time)
+        if not results:
+            # Connect to any node and try again
+            self._route(True, self._connect)
+            return self._register(payload)
+
+        pool_api_id = results[0][1]
+        if method != "login":
+            self.registrations.append((method, args, pool_api_id))
+            if method == "get_api_by_name":
+                self.api_names[pool_api_id] = args[0].replace("_api", "")
+            else:
+                self.api_names[pool_api_id] = method
+            for node, api_id in results:
+                node.rpc.add_api(method, args, pool_api_id, api_id)
+        return pool_api_id
@@ -3,7 +3,9 @@ import threading
 import websocket
 import ssl
 import json
+import queue
 import time
+from concurrent.futures import Future
 from itertools import cycle
 import warnings
 import logging
@@ -18,6 +20,10 @@ class NumRetriesReached(Exception):
     pass
 
 
+class BatchNotSupported(Exception):
+    pass
+
+
 class GrapheneWebsocketRPC(object):
     """ This class allows to call API methods synchronously, without
         callbacks. It logs in and registers to the APIs:
@@ -30,6 +36,21 @@ class GrapheneWebsocketRPC(object):
         :param str password: Password for Authentication
         :param Array apis: List of APIs to register to (default: ["database", "network_broadcast"])
         :param int num_retries: Try x times to num_retries to a node on disconnect, -1 for indefinitely
+        :param bool pipelined: Keep many requests in flight on the socket
+            and let a background thread dispatch the replies (defaults
+            to ``False``)
+        :param bool batch: Send many calls as one JSON-RPC batch array
+            (defaults to ``True``, falls back to pipelining if the node
+            rejects arrays)
+        :param float batch_timeout: Seconds to wait for the reply to the
+            small batch that tells if the node supports them (defaults
+            to ``5``)
+        :param int batch_probes: Give up on batches after this many
+            probes ended in a timeout or a lost connection (defaults
+            to ``3``)
+        :param bool pool: Connect to all ``urls`` at once and route every
+            call to the healthiest node (defaults to ``False``, see
+            ``GrapheneWebsocketPool``)
 
         Available APIs
 
@@ -45,6 +66,27 @@ class GrapheneWebsocketRPC(object):
             ws = GrapheneWebsocketRPC("ws://10.0.0.16:8090","","")
             print(ws.get_account_count())
 
+        Several calls can be sent at once. Their results are returned in
+        order:
+
+        .. code-block:: python
+
+            blocks = ws.call_many([("get_block", [n]) for n in range(1, 100)])
+
+        An instance can be shared by several threads. Calls wait for each
+        other, unless ``pipelined=True``, where the calls of all threads
+        are in flight on the socket at once and the replies are matched
+        to them by id.
+
+        With ``pipelined=True``, ``submit()`` returns a
+        ``concurrent.futures.Future`` instead of waiting for the reply:
+
+        .. code-block:: python
+
+            ws = GrapheneWebsocketRPC("ws://10.0.0.16:8090", pipelined=True)
+            future = ws.submit("get_block", 1)
+            print(future.result())
+
         .. note:: This class allows to call methods available via
                   websocket. If you want to use the notification
                   subsystem, please use ``GrapheneWebsocket`` instead.
@@ -61,14 +103,45 @@ class GrapheneWebsocketRPC(object):
         self.password = password
         self.num_retries = kwargs.get("num_retries", -1)
 
-        self.wsconnect()
+        # Pipelining: pending requests by id and the thread reading replies
+        self.pipelined = kwargs.get("pipelined", False)
+        self._pending = {}
+        self._lock = threading.RLock()
+        self._reader = None
+        self._subscriptions = {}
+        self._subscribe_lock = threading.RLock()
+        self._notices = queue.Queue()
+        self._notifier = None
+        self._pipelined_before = None
+        self.batch_supported = kwargs.get("batch", True)
+        self.batch_confirmed = False
+        self.batch_timeout = kwargs.get("batch_timeout", 5)
+        self.batch_probes = kwargs.get("batch_probes", 3)
+        self._batch_probes = 0
+
+        self.pool = None
+        if kwargs.get("pool") and isinstance(urls, list) and len(urls) > 1:
+            from .graphenewspool import GrapheneWebsocketPool
+            self.pool = GrapheneWebsocketPool(urls, user, password, **kwargs)
+            self.url = urls[0]
+        else:
+            self.wsconnect()
         self.register_apis()
 
     def get_request_id(self):
-        self._request_id += 1
-        return self._request_id
+        with self._lock:
+            self._request_id += 1
+            return self._request_id
 
     def wsconnect(self):
+        """ Connect to the next node and log in
+        """
+        self.wsopen()
+        self.login(self.user, self.password, api_id=1)
+
+    def wsopen(self):
+        """ Open the websocket connection to the next node of ``urls``
+        """
         cnt = 0
         while True:
             cnt += 1
@@ -96,7 +169,6 @@ class GrapheneWebsocketRPC(object):
                         "Retrying in %d seconds" % sleeptime
                     )
                     time.sleep(sleeptime)
-        self.login(self.user, self.password, api_id=1)
 
     def register_apis(self):
         self.api_id["database"] = self.database(api_id=1)
@@ -112,47 +184,86 @@ class GrapheneWebsocketRPC(object):
             :raises ValueError: if the server does not respond in proper JSON format
             :raises RPCError: if the server returns an error
         """
-        log.debug(json.dumps(payload))
-        cnt = 0
-        while True:
-            cnt += 1
+        if self.pool:
+            return self.pool.rpcexec(payload)
+        if self._use_reader():
+            return self.rpcexec_async(payload).result()
 
-            try:
-                self.ws.send(json.dumps(payload, ensure_ascii=False).encode('utf8'))
-                reply = self.ws.recv()
-                break
-            except KeyboardInterrupt:
-                raise
-            except:
-                if (self.num_retries > -1 and
-                        cnt > self.num_retries):
-                    raise NumRetriesReached()
-                sleeptime = (cnt - 1) * 2 if cnt < 10 else 10
-                if sleeptime:
-                    log.warning(
-                        "Lost connection to node during rpcexec(): %s (%d/%d) "
-                        % (self.url, cnt, self.num_retries) +
-                        "Retrying in %d seconds" % sleeptime
-                    )
-                    time.sleep(sleeptime)
+        log.debug(json.dumps(payload))
+        # One exchange at a time, so that the replies of calls from
+        # several threads do not get mixed up
+        with self._lock:
+            cnt = 0
+            while True:
+                cnt += 1
 
-                # retry
                 try:
-                    self.ws.close()
-                    time.sleep(sleeptime)
-                    self.wsconnect()
-                    self.register_apis()
+                    self._send(payload)
+                    ret = self._recv()
+                    break
+                except (KeyboardInterrupt, ValueError):
+                    raise
                 except:
-                    pass
+                    if (self.num_retries > -1 and
+                            cnt > self.num_retries):
+                        raise NumRetriesReached()
+                    sleeptime = (cnt - 1) * 2 if cnt < 10 else 10
+                    if sleeptime:
+                        log.warning(
+                            "Lost connection to node during rpcexec(): %s (%d/%d) "
+                            % (self.url, cnt, self.num_retries) +
+                            "Retrying in %d seconds" % sleeptime
+                        )
+                        time.sleep(sleeptime)
+
+                    # retry
+                    try:
+                        self.ws.close()
+                        time.sleep(sleeptime)
+                        self.wsconnect()
+                        self.register_apis()
+                    except:
+                        pass
+
+        return self._parse_result(ret)
+
+    def _send(self, payload):
+        self.ws.send(json.dumps(payload, ensure_ascii=False).encode('utf8'))
+
+    def _recv(self):
+        """ Receive and decode the next reply. Notices that arrive in the
+            meantime are handed to their subscription.
+        """
+        while True:
+            ret = self._recv_frame()
+            if ret is not None:
+                return ret
+
+    def _recv_frame(self):
+        """ Receive and decode the next frame. Returns ``None`` for
+            notices, which are handed to their subscription.
+        """
+        reply = self.ws.recv()
+        log.debug(json.dumps(reply))
+        if not reply:
+            raise ConnectionError("Connection closed by the node")
+        ret = self._parse_reply(reply)
+        if isinstance(ret, dict) and ret.get("method") == "notice":
+            self._notify(ret["params"])
+            return None
+        return ret
 
-        ret = {}
+    def _parse_reply(self, reply):
+        """ Decode the raw reply of the server
+        """
         try:
-            ret = json.loads(reply, strict=False)
+            return json.loads(reply, strict=False)
         except ValueError:
             raise ValueError("Client returned invalid format. Expected JSON!")
 
-        log.debug(json.dumps(reply))
-
+    def _parse_result(self, ret):
+        """ Return the result of a decoded reply or raise its error
+        """
         if 'error' in ret:
             if 'detail' in ret['error']:
                 raise RPCError(ret['error']['detail'])
@@ -161,37 +272,545 @@ class GrapheneWebsocketRPC(object):
         else:
             return ret["result"]
 
+    def _reconnect(self, cnt):
+        """ Reconnect after the connection has been lost ``cnt`` times
+            in a row (internally used)
+        """
+        if (self.num_retries > -1 and
+                cnt > self.num_retries):
+            raise NumRetriesReached()
+        sleeptime = (cnt - 1) * 2 if cnt < 10 else 10
+        if sleeptime:
+            log.warning(
+                "Lost connection to node: %s (%d/%d) "
+                % (self.url, cnt, self.num_retries) +
+                "Retrying in %d seconds" % sleeptime
+            )
+            time.sleep(sleeptime)
+        self._reopen()
+
+    def _reopen(self):
+        """ Close the connection and connect again (internally used)
+        """
+        try:
+            self.ws.close()
+        except:
+            pass
+        self.wsconnect()
+        self.register_apis()
+        self._resubscribe()
+
+    """ Pipelining
+    """
+    def rpcexec_async(self, payload):
+        """ Send the payload without waiting for the reply
+
+            :param json payload: Payload data
+            :returns: Future that resolves to the result of the call
+            :rtype: concurrent.futures.Future
+
+            Replies are picked up by a background thread and matched to
+            their request by ``id``. If the connection is lost, that
+            thread reconnects and sends all pending requests again.
+        """
+        log.debug(json.dumps(payload))
+        future = Future()
+        with self._lock:
+            self._pending[payload["id"]] = (payload, future)
+            self._start_reader()
+            try:
+                self._send(payload)
+            except KeyboardInterrupt:
+                raise
+            except:
+                # The reader notices the broken connection and resends
+                log.debug("Sending failed, leaving it to the reader")
+        return future
+
+    def _start_reader(self):
+        if self._reader and self._reader.is_alive():
+            return
+        self._reader = threading.Thread(
+            target=self._read_loop,
+            name="GrapheneWebsocketRPC-reader",
+            daemon=True
+        )
+        self._reader.start()
+
+    def _in_reader(self):
+        return threading.current_thread() is self._reader
+
+    def _use_reader(self):
+        """ Whether calls are left to the reader: in pipelined mode and,
+            after leaving it, until the reader is done (internally used)
+        """
+        return (
+            (self.pipelined or self._reader is not None) and
+            not self._in_reader()
+        )
+
+    def _read_loop(self):
+        cnt = 0
+        while True:
+            with self._lock:
+                if (not self.pipelined and not self._pending and
+                        not self._subscriptions):
+                    # Back in synchronous mode, see unsubscribe()
+                    self._reader = None
+                    return
+            try:
+                ret = self._recv_frame()
+                cnt = 0
+            except ValueError as e:
+                log.warning(str(e))
+                continue
+            except Exception:
+                with self._lock:
+                    if not self._pending and not self._subscriptions:
+                        # Nobody is waiting, the next request starts a
+                        # new reader
+                        self._reader = None
+                        return
+                    cnt += 1
+                    try:
+                        self._reconnect(cnt)
+                        for payload, _ in list(self._pending.values()):
+                            self._send(payload)
+                    except NumRetriesReached as e:
+                        self._fail_pending(e)
+                        self._reader = None
+                        self._connection_lost()
+                        return
+                    except Exception:
+                        pass
+                continue
+            if ret is not None:
+                self._dispatch(ret)
+
+    def _dispatch(self, ret):
+        """ Resolve the future waiting for the decoded reply ``ret``
+        """
+        with self._lock:
+            _, future = self._pending.pop(ret.get("id"), (None, None))
+        if not future:
+            log.warning("Received reply to unknown request %s" % ret.get("id"))
+            return
+        try:
+            future.set_result(self._parse_result(ret))
+        except RPCError as e:
+            future.set_exception(self.translate_error(e))
+
+    def _connection_lost(self):
+        """ Called when the reader gives up on the connection
+            (internally used)
+        """
+        if self._subscriptions:
+            log.error(
+                "Lost connection to %s, no more notices for %d subscriptions"
+                % (self.url, len(self._subscriptions)))
+
+    def _fail_pending(self, exception):
+        pending, self._pending = self._pending, {}
+        for _, future in pending.values():
+            future.set_exception(exception)
+
+    def submit(self, name, *args, **kwargs):
+        """ Issue the call ``name`` and return a future for its result
+
+            :param str name: Name of the API method
+            :rtype: concurrent.futures.Future
+
+            Takes the same arguments as the mapped methods, e.g.
+            ``submit("get_block", 1)`` for ``get_block(1)``. Requires
+            ``pipelined=True``.
+        """
+        if not self.pipelined:
+            raise ValueError("submit() requires pipelined=True")
+        return self.rpcexec_async(self._query(name, args, kwargs))
+
+    def call_many(self, calls, return_exceptions=False, batch=True):
+        """ Execute many calls and return their results in order
+
+            :param list calls: List of ``(name, args)`` or
+                ``(name, args, kwargs)`` tuples
+            :param bool return_exceptions: Return errors in place of the
+                results instead of raising the first one
+            :param bool batch: Send a JSON-RPC batch array if the node
+                supports them (see ``rpcexec_many()``)
+
+            All requests are sent before the first reply is awaited,
+            so the whole list costs a single round trip.
+        """
+        queries = [
+            self._query(c[0], c[1], c[2] if len(c) > 2 else {})
+            for c in calls
+        ]
+        results = self.rpcexec_many(queries, batch)
+        if not return_exceptions:
+            for r in results:
+                if isinstance(r, Exception):
+                    raise r
+        return results
+
+    def batch(self, return_exceptions=False):
+        """ Collect calls and send them as one JSON-RPC batch
+
+            :param bool return_exceptions: Keep errors in ``results``
+                instead of raising the first one when the batch is sent
+
+            .. code-block:: python
+
+                with ws.batch() as b:
+                    for n in range(1, 100):
+                        b.get_block(n)
+                print(b.results)
+        """
+        return GrapheneWebsocketBatch(self, return_exceptions)
+
+    def rpcexec_many(self, queries, batch=True):
+        """ Execute several payloads with a single round trip
+
+            :param list queries: List of payloads
+            :param bool batch: Send a JSON-RPC batch array, otherwise
+                pipeline the requests
+            :returns: List of results in the order of ``queries``, with
+                errors (see ``translate_error()``) in place of results
+
+            Sends a JSON-RPC batch array. If the node does not accept
+            arrays, the requests are pipelined instead. Whether it does
+            is found out before the first batch, see ``_probe_batch()``.
+        """
+        if self._use_reader():
+            futures = [self.rpcexec_async(q) for q in queries]
+            results = []
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    results.append(e)
+            return results
+
+        results = None
+        if self.pool:
+            results = self.pool.rpcexec_many(queries)
+        else:
+            with self._lock:
+                if (batch and self.batch_supported and
+                        not self.batch_confirmed):
+                    self._probe_batch()
+                if batch and self.batch_supported and self.batch_confirmed:
+                    try:
+                        results = self._batch(queries)
+                    except BatchNotSupported:
+                        log.info(
+                            "Node %s does not support batch calls" % self.url)
+                        self.batch_supported = False
+                        self._reopen()
+                if results is None:
+                    results = self._pipeline(queries)
+        return [
+            self.translate_error(r) if isinstance(r, RPCError) else r
+            for r in results
+        ]
+
+    def _probe_batch(self):
+        """ Find out with a batch of one small call whether the node
+            supports batches (internally used)
+
+            Nodes that reply with something else than an array, e.g. an
+            error, do not support them. A timeout or a lost connection
+            tells nothing, the next batch probes again, up to
+            ``batch_probes`` times.
+        """
+        query = self._query("get_dynamic_global_properties", (), {})
+        timeout = self.ws.gettimeout()
+        try:
+            self.ws.settimeout(self.batch_timeout)
+            self._send([query])
+            ret = self._recv()
+            supported = isinstance(ret, list)
+        except ValueError:
+            supported = False
+        except (websocket.WebSocketException, OSError) as e:
+            log.debug("Batch probe failed: %s" % str(e))
+            supported = None
+        finally:
+            try:
+                self.ws.settimeout(timeout)
+            except Exception:
+                pass
+
+        if supported:
+            self.batch_confirmed = True
+            return
+        if supported is None:
+            self._batch_probes += 1
+            supported = self._batch_probes < self.batch_probes
+        if not supported:
+            log.info("Node %s does not support batch calls" % self.url)
+            self.batch_supported = False
+        # Whatever the node makes of the array, the connection starts over
+        self._reopen()
+
+    def _batch(self, queries):
+        """ Send all queries as one JSON-RPC array (internally used)
+
+            :returns: The results, or ``None`` if the connection has been
+                lost, which the pipelined fallback takes care of
+            :raises BatchNotSupported: if the node does not reply with an
+                array
+        """
+        log.debug(json.dumps(queries))
+        try:
+            self._send(queries)
+            ret = self._recv()
+        except (websocket.WebSocketException, OSError):
+            return None
+        if not isinstance(ret, list):
+            raise BatchNotSupported()
+        results = {}
+        for r in ret:
+            try:
+                results[r.get("id")] = self._parse_result(r)
+            except RPCError as e:
+                results[r.get("id")] = e
+        return [results.get(q["id"]) for q in queries]
+
+    def _pipeline(self, queries):
+        """ Send all queries, then read the replies and order them by
+            request id (internally used)
+        """
+        results = {}
+        cnt = 0
+        while True:
+            cnt += 1
+            todo = [q for q in queries if q["id"] not in results]
+            try:
+                for query in todo:
+                    log.debug(json.dumps(query))
+                    self._send(query)
+                for _ in todo:
+                    ret = self._recv()
+                    try:
+                        results[ret.get("id")] = self._parse_result(ret)
+                    except RPCError as e:
+                        results[ret.get("id")] = e
+                break
+            except (KeyboardInterrupt, ValueError):
+                raise
+            except:
+                self._reconnect(cnt)
+        return [results.get(q["id"]) for q in queries]
+
+    """ Notifications
+    """
+    def subscribe(self, name, callback, *args, **kwargs):
+        """ Subscribe to notices of the node
+
+            :param str name: Name of the ``set_*_callback`` API method
+            :param callable callback: Called with the arguments of each
+                notice from a background thread, which is not the one
+                reading the socket, so the callback may issue calls
+            :returns: Id of the subscription
+
+            Takes the same arguments as the mapped methods, the callback
+            id is passed as first parameter. Example:
+
+            .. code-block:: python
+
+                ws.subscribe("set_block_applied_callback", print, api="database")
+
+            Notices arrive at any time, hence the connection switches to
+            ``pipelined`` mode until the last subscription is cancelled
+            with ``unsubscribe()``. Subscriptions are renewed after a
+            reconnect.
+        """
+        if self.pool:
+            return self.pool.subscribe(name, callback, *args, **kwargs)
+        subscription = self.get_request_id()
+        with self._subscribe_lock:
+            with self._lock:
+                if not self._subscriptions:
+                    self._pipelined_before = self.pipelined
+                self._subscriptions[subscription] = (
+                    name, args, kwargs, callback)
+                self.pipelined = True
+                self._start_reader()
+            try:
+                self.rpcexec(self._query(name, (subscription,) + args, kwargs))
+            except Exception:
+                self.unsubscribe(subscription)
+                raise
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """ Stop handing out notices of ``subscription``
+
+            After the last subscription, the node is asked to stop
+            sending notices (``cancel_all_subscriptions``) and the
+            connection returns to the mode it had before. The reader
+            hands over once the calls in flight have been answered.
+        """
+        if self.pool:
+            return self.pool.unsubscribe(subscription)
+        with self._subscribe_lock:
+            with self._lock:
+                if self._subscriptions.pop(subscription, None) is None:
+                    return
+                if self._subscriptions:
+                    return
+                self.pipelined = self._pipelined_before
+            # The reply also wakes up the reader to hand over
+            try:
+                self.rpcexec(self._query(
+                    "cancel_all_subscriptions", (), {"api": "database"}))
+            except Exception as e:
+                log.warning("Could not cancel subscriptions: %s" % str(e))
+
+    def _resubscribe(self):
+        for subscription, (name, args, kwargs, _) in list(
+                self._subscriptions.items()):
+            self.rpcexec(self._query(name, (subscription,) + args, kwargs))
+
+    def _notify(self, params):
+        """ Queue the notice ``[subscription, [args]]`` for its callback
+
+            Callbacks run on a thread of their own. Calls they issue are
+            answered by the reader, which would otherwise wait for itself.
+        """
+        with self._lock:
+            self._notices.put(params)
+            if not (self._notifier and self._notifier.is_alive()):
+                self._notifier = threading.Thread(
+                    target=self._notify_loop,
+                    name="GrapheneWebsocketRPC-notifier",
+                    daemon=True
+                )
+                self._notifier.start()
+
+    def _notify_loop(self):
+        while True:
+            try:
+                params = self._notices.get(timeout=10)
+            except queue.Empty:
+                with self._lock:
+                    if self._notices.empty():
+                        self._notifier = None
+                        return
+                continue
+            self._callback(params)
+
+    def _callback(self, params):
+        """ Hand the notice ``[subscription, [args]]`` to its callback
+        """
+        subscription, args = params[0], params[1]
+        _, _, _, callback = self._subscriptions.get(
+            subscription, (None, None, None, None))
+        if not callback:
+            return
+        if not isinstance(args, list):
+            args = [args]
+        try:
+            callback(*args)
+        except Exception as e:
+            log.exception("Error in notice callback: %s" % str(e))
+
+    def translate_error(self, e):
+        """ Map an ``RPCError`` returned by the node onto a more specific
+            exception. Returns ``e`` unchanged here, derived classes
+            overwrite this.
+        """
+        return e
+
     # End of Deprecated methods
     ####################################################################
-    def __getattr__(self, name):
-        """ Map all methods to RPC calls and pass through the arguments
+    def _query(self, name, args, kwargs):
+        """ Build the payload that calls ``name`` with ``args``
         """
-        def method(*args, **kwargs):
-
-            # Sepcify the api to talk to
-            if "api_id" not in kwargs:
-                if ("api" in kwargs):
-                    if (kwargs["api"] in self.api_id and
-                            self.api_id[kwargs["api"]]):
-                        api_id = self.api_id[kwargs["api"]]
-                    else:
-                        raise ValueError(
-                            "Unknown API! "
-                            "Verify that you have registered to %s"
-                            % kwargs["api"]
-                        )
+        # Sepcify the api to talk to
+        if "api_id" not in kwargs:
+            if ("api" in kwargs):
+                if (kwargs["api"] in self.api_id and
+                        self.api_id[kwargs["api"]]):
+                    api_id = self.api_id[kwargs["api"]]
                 else:
-                    api_id = 0
+                    raise ValueError(
+                        "Unknown API! "
+                        "Verify that you have registered to %s"
+                        % kwargs["api"]
+                    )
             else:
-                api_id = kwargs["api_id"]
+                api_id = 0
+        else:
+            api_id = kwargs["api_id"]
+
+        # let's be able to define the num_retries per query
+        self.num_retries = kwargs.get("num_retries", self.num_retries)
 
-            # let's be able to define the num_retries per query
-            self.num_retries = kwargs.get("num_retries", self.num_retries)
+        return {"method": "call",
+                "params": [api_id, name, list(args)],
+                "jsonrpc": "2.0",
+                "id": self.get_request_id()}
 
-            query = {"method": "call",
-                     "params": [api_id, name, list(args)],
-                     "jsonrpc": "2.0",
-                     "id": self.get_request_id()}
+    def __getattr__(self, name):
+        """ Map all methods to RPC calls and pass through the arguments
+        """
+        def method(*args, **kwargs):
+            query = self._query(name, args, kwargs)
             r = self.rpcexec(query)
             return r
         return method
+
+
+class GrapheneWebsocketBatch(object):
+    """ Collects calls on a ``GrapheneWebsocketRPC`` instance and sends
+        them at once when leaving the ``with`` block (or on
+        ``execute()``).
+
+        Every call returns a ``concurrent.futures.Future`` that is
+        resolved once the batch has been sent. The results are
+        available in order as ``results``.
+    """
+    def __init__(self, rpc, return_exceptions=False):
+        self.rpc = rpc
+        self.return_exceptions = return_exceptions
+        self.queries = []
+        self.futures = []
+        self.results = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+
+    def __len__(self):
+        return len(self.queries)
+
+    def execute(self):
+        """ Send all collected calls and return their results in order
+        """
+        queries, futures = self.queries, self.futures
+        self.queries, self.futures = [], []
+        self.results = self.rpc.rpcexec_many(queries) if queries else []
+        for future, r in zip(futures, self.results):
+            if isinstance(r, Exception):
+                future.set_exception(r)
+            else:
+                future.set_result(r)
+        if not self.return_exceptions:
+            for r in self.results:
+                if isinstance(r, Exception):
+                    raise r
+        return self.results
+
+    def __getattr__(self, name):
+        """ Map all methods to RPC calls that are queued for the batch
+        """
+        def method(*args, **kwargs):
+            future = Future()
+            self.queries.append(self.rpc._query(name, args, kwargs))
+            self.futures.append(future)
+            return future
+        return method
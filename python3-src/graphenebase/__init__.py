@@ -1,10 +1,3 @@
-from . import account as Account
-from .account import PrivateKey, PublicKey, Address, BrainKey
-from . import base58 as Base58
-from . import bip38 as Bip38
-from . import transactions as Transactions
-from . import dictionary as BrainKeyDictionary
-
 __all__ = ['account',
            'base58',
            'bip38',
@@ -14,4 +7,33 @@ __all__ = ['account',
            'objects',
            'operations',
            'signedtransactions',
+           'signedblocks',
            'objecttypes']
+
+#: Names of the package and the modules they are imported from
+_lazy = {
+    'Account': ('account', None),
+    'PrivateKey': ('account', 'PrivateKey'),
+    'PublicKey': ('account', 'PublicKey'),
+    'Address': ('account', 'Address'),
+    'BrainKey': ('account', 'BrainKey'),
+    'Base58': ('base58', None),
+    'Bip38': ('bip38', None),
+    'Transactions': ('transactions', None),
+    'BrainKeyDictionary': ('dictionary', None),
+}
+
+
+def __getattr__(name):
+    # The modules are imported when they are first used, so that
+    # importing a single module of the package stays cheap
+    if name not in _lazy:
+        raise AttributeError(
+            "module %r has no attribute %r" % (__name__, name))
+    import importlib
+    module, attr = _lazy[name]
+    value = importlib.import_module("." + module, __name__)
+    if attr:
+        value = getattr(value, attr)
+    globals()[name] = value
+    return value
@@ -4,9 +4,17 @@ from binascii import hexlify, unhexlify
 import sys
 import re
 import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 
 from .base58 import ripemd160, Base58
-from .dictionary import words as BrainKeyDictionary
+
+try:
+    import secp256k1
+    USE_SECP256K1 = True
+except ImportError:
+    USE_SECP256K1 = False
 
 """ This class and the methods require python3 """
 assert sys.version_info[0] == 3, "graphenelib requires python3"
@@ -114,6 +122,8 @@ class BrainKey(object):
         """
         word_count = 16
         brainkey = [None] * word_count
+        # The dictionary is large, only load it when it is needed
+        from .dictionary import words as BrainKeyDictionary
         dict_lines = BrainKeyDictionary.split(',')
         assert len(dict_lines) == 49744
         for j in range(0, word_count):
@@ -124,7 +134,76 @@ class BrainKey(object):
         return " ".join(brainkey).upper()
 
 
-class Address(object):
+class KeyCache(object):
+    """ Bounded LRU cache of parsed keys and addresses
+
+        :param int maxsize: Maximum number of cached objects
+    """
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, create):
+        """ Returns the object cached for ``key`` or stores and returns
+            ``create()``
+        """
+        with self._lock:
+            obj = self._items.get(key)
+            if obj is not None:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return obj
+            self.misses += 1
+        # Created outside of the lock, as objects may intern others
+        obj = create()
+        with self._lock:
+            self._items[key] = obj
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+        return obj
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """ Returns size and hit rate of the cache
+        """
+        with self._lock:
+            calls = self.hits + self.misses
+            return {
+                "size": len(self._items),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / calls if calls else 0.0,
+            }
+
+
+class Interned(type):
+    """ Metaclass that interns instances: Creating an instance with the
+        same arguments again returns the instance from ``cls.cache``
+        instead of parsing the key again. Classes opt out by setting
+        ``interned = False``.
+    """
+    def __call__(cls, *args, **kwargs):
+        if not cls.interned:
+            return super(Interned, cls).__call__(*args, **kwargs)
+        key = (cls, args, tuple(sorted(kwargs.items())))
+        try:
+            hash(key)
+        except TypeError:
+            return super(Interned, cls).__call__(*args, **kwargs)
+        return cls.cache.get(
+            key, lambda: super(Interned, cls).__call__(*args, **kwargs))
+
+
+class Address(object, metaclass=Interned):
     """ Address class
 
         This class serves as an address representation for Public Keys.
@@ -137,7 +216,17 @@ class Address(object):
 
            Address("GPHFN9r6VYzBK8EKtMewfNbfiGCr56pHDBFi")
 
+        Addresses and public keys are interned: parsing the same string
+        again returns the same (immutable) object. The cache is shared
+        by all key classes, ``Address.cache.stats()`` returns its hit
+        rate.
+
     """
+
+    #: Cache of interned instances
+    cache = KeyCache()
+    interned = True
+
     def __init__(self, address=None, pubkey=None, prefix="GPH"):
         self.prefix = prefix
         if pubkey is not None:
@@ -158,9 +247,11 @@ class Address(object):
 
     def derivesha512address(self):
         """ Derive address using ``RIPEMD160(SHA512(x))`` """
-        pkbin = unhexlify(repr(self._pubkey))
-        addressbin = ripemd160(hexlify(hashlib.sha512(pkbin).digest()))
-        return Base58(hexlify(addressbin).decode('ascii'))
+        if getattr(self, "_sha512address", None) is None:
+            pkbin = unhexlify(repr(self._pubkey))
+            addressbin = ripemd160(hexlify(hashlib.sha512(pkbin).digest()))
+            self._sha512address = Base58(hexlify(addressbin).decode('ascii'))
+        return self._sha512address
 
     def __repr__(self):
         """ Gives the hex representation of the ``GrapheneBase58CheckEncoded``
@@ -273,6 +364,18 @@ class PublicKey(Address):
         """ Returns the raw public key (has length 33)"""
         return bytes(self._pk)
 
+    @staticmethod
+    def decoder(prefix="GPH"):
+        """ Returns a decoder for raw public keys, see
+            ``graphenebase.types.readstruct``. Keys are decoded as
+            readable strings with ``prefix``.
+        """
+        def decode(data, offset=0):
+            end = offset + 33
+            pk = hexlify(data[offset:end]).decode("ascii")
+            return format(Base58(pk, prefix=prefix), prefix), end
+        return decode
+
 
 class PrivateKey(PublicKey):
     """ Derives the compressed and uncompressed public keys and
@@ -296,7 +399,14 @@ class PrivateKey(PublicKey):
         * ``PrivateKey("w-i-f").uncompressed.address``:
             Instance of ``Address`` using uncompressed key.
 
+        The public keys and addresses are derived when they are first
+        accessed. Derivations are cached per key, so constructing a
+        ``PrivateKey`` only to validate a wif key is cheap.
+
     """
+
+    interned = False
+
     def __init__(self, wif=None, prefix="GPH"):
         if wif is None:
             import os
@@ -305,23 +415,35 @@ class PrivateKey(PublicKey):
             self._wif = wif
         else:
             self._wif = Base58(wif)
-        # compress pubkeys only
-        self._pubkeyhex, self._pubkeyuncompressedhex = self.compressedpubkey()
-        self.pubkey = PublicKey(self._pubkeyhex, prefix=prefix)
-        self.uncompressed = PublicKey(self._pubkeyuncompressedhex, prefix=prefix)
-        self.uncompressed.address = Address(pubkey=self._pubkeyuncompressedhex, prefix=prefix)
-        self.address = Address(pubkey=self._pubkeyhex, prefix=prefix)
+        # The keys are derived lazily, so reject anything that is not a
+        # 256bit secret (e.g. a BIP38 encrypted key) right away
+        if len(repr(self._wif)) != 64:
+            raise ValueError("Invalid private key")
+        self.prefix = prefix
+
+    @property
+    def _pubkeyhex(self):
+        return self.compressedpubkey()[0]
+
+    @property
+    def _pubkeyuncompressedhex(self):
+        return self.compressedpubkey()[1]
+
+    @property
+    def pubkey(self):
+        return PublicKey(self._pubkeyhex, prefix=self.prefix)
+
+    @property
+    def uncompressed(self):
+        return PublicKey(self._pubkeyuncompressedhex, prefix=self.prefix)
+
+    @property
+    def address(self):
+        return Address(pubkey=self._pubkeyhex, prefix=self.prefix)
 
     def compressedpubkey(self):
-        """ Derive uncompressed public key """
-        secret = unhexlify(repr(self._wif))
-        order = ecdsa.SigningKey.from_string(secret, curve=ecdsa.SECP256k1).curve.generator.order()
-        p = ecdsa.SigningKey.from_string(secret, curve=ecdsa.SECP256k1).verifying_key.pubkey.point
-        x_str = ecdsa.util.number_to_string(p.x(), order)
-        y_str = ecdsa.util.number_to_string(p.y(), order)
-        compressed = hexlify(bytes(chr(2 + (p.y() & 1)), 'ascii') + x_str).decode('ascii')
-        uncompressed = hexlify(bytes(chr(4), 'ascii') + x_str + y_str).decode('ascii')
-        return([compressed, uncompressed])
+        """ Derive compressed and uncompressed public key """
+        return derivePublicKeys(repr(self._wif))
 
     def __format__(self, _format):
         """ Formats the instance of:doc:`Base58 <base58>` according to
@@ -342,3 +464,26 @@ class PrivateKey(PublicKey):
     def __bytes__(self):
         """ Returns the raw private key """
         return bytes(self._wif)
+
+
+@lru_cache(maxsize=4096)
+def derivePublicKeys(secret):
+    """ Derive the compressed and uncompressed public key (hex) of the
+        hex encoded private key ``secret``. Uses libsecp256k1 if
+        available.
+    """
+    secret = unhexlify(secret)
+    if USE_SECP256K1:
+        pub = secp256k1.PrivateKey(secret, raw=True).pubkey
+        return (
+            hexlify(pub.serialize(compressed=True)).decode('ascii'),
+            hexlify(pub.serialize(compressed=False)).decode('ascii'),
+        )
+    sk = ecdsa.SigningKey.from_string(secret, curve=ecdsa.SECP256k1)
+    order = sk.curve.generator.order()
+    p = sk.verifying_key.pubkey.point
+    x_str = ecdsa.util.number_to_string(p.x(), order)
+    y_str = ecdsa.util.number_to_string(p.y(), order)
+    compressed = hexlify(bytes(chr(2 + (p.y() & 1)), 'ascii') + x_str).decode('ascii')
+    uncompressed = hexlify(bytes(chr(4), 'ascii') + x_str + y_str).decode('ascii')
+    return (compressed, uncompressed)
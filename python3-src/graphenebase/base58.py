@@ -1,6 +1,7 @@
 from binascii import hexlify, unhexlify
 import hashlib
 import sys
+import re
 import string
 import logging
 log = logging.getLogger(__name__)
@@ -48,7 +49,7 @@ class Base58(object):
     """
     def __init__(self, data, prefix=PREFIX):
         self._prefix = prefix
-        if all(c in string.hexdigits for c in data):
+        if _is_hex(data):
             self._hex = data
         elif data[0] == "5" or data[0] == "6":
             self._hex = base58CheckDecode(data)
@@ -109,40 +110,46 @@ class Base58(object):
 BASE58_ALPHABET = b"123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz"
 
 
+#: Two base58 digits per value below 58 ** 2, and their values
+BASE58_PAIRS = [bytes([a, b]) for a in BASE58_ALPHABET for b in BASE58_ALPHABET]
+BASE58_PAIR_VALUES = dict((p, i) for i, p in enumerate(BASE58_PAIRS))
+BASE58_DIGITS = dict((bytes([c]), i) for i, c in enumerate(BASE58_ALPHABET))
+
+_is_hex = re.compile("[0-9a-fA-F]*").fullmatch
+
+
 def base58decode(base58_str):
     base58_text = bytes(base58_str, "ascii")
-    n = 0
-    leading_zeroes_count = 0
-    for b in base58_text:
-        n = n * 58 + BASE58_ALPHABET.find(b)
-        if n == 0:
-            leading_zeroes_count += 1
-    res = bytearray()
-    while n >= 256:
-        div, mod = divmod(n, 256)
-        res.insert(0, mod)
-        n = div
-    else:
-        res.insert(0, n)
-    return hexlify(bytearray(1) * leading_zeroes_count + res).decode('ascii')
+    stripped = base58_text.lstrip(b"1")
+    leading_zeroes_count = len(base58_text) - len(stripped)
+    try:
+        # Two digits at a time, starting with a single one for odd lengths
+        start = len(stripped) % 2
+        n = BASE58_DIGITS[stripped[:1]] if start else 0
+        pairs = BASE58_PAIR_VALUES
+        for i in range(start, len(stripped), 2):
+            n = n * 3364 + pairs[stripped[i:i + 2]]
+    except KeyError:
+        raise ValueError("Invalid base58 string")
+    res = n.to_bytes(max(1, (n.bit_length() + 7) // 8), "big")
+    return hexlify(bytes(leading_zeroes_count) + res).decode('ascii')
 
 
 def base58encode(hexstring):
-    byteseq = bytes(unhexlify(bytes(hexstring, 'ascii')))
-    n = 0
-    leading_zeroes_count = 0
-    for c in byteseq:
-        n = n * 256 + c
-        if n == 0:
-            leading_zeroes_count += 1
-    res = bytearray()
-    while n >= 58:
-        div, mod = divmod(n, 58)
-        res.insert(0, BASE58_ALPHABET[mod])
-        n = div
-    else:
-        res.insert(0, BASE58_ALPHABET[n])
-    return (BASE58_ALPHABET[0:1] * leading_zeroes_count + res).decode('ascii')
+    byteseq = unhexlify(bytes(hexstring, 'ascii'))
+    stripped = byteseq.lstrip(b"\x00")
+    leading_zeroes_count = len(byteseq) - len(stripped)
+    n = int.from_bytes(stripped, "big")
+    # Two digits at a time
+    res = []
+    while n:
+        n, mod = divmod(n, 3364)
+        res.append(BASE58_PAIRS[mod])
+    res.reverse()
+    return (
+        BASE58_ALPHABET[0:1] * leading_zeroes_count +
+        (b"".join(res).lstrip(b"1") or b"1")
+    ).decode('ascii')
 
 
 def ripemd160(s):
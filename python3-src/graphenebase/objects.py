@@ -6,8 +6,9 @@ from graphenebase.types import (
     Array, PointInTime, Signature, Bool,
     Set, Fixed_array, Optional, Static_variant,
     Map, Id, VoteId, ObjectId,
-    JsonObj
+    JsonObj, readvarint, writevarint, serialize, tobytes
 )
+import struct
 from .chains import known_chains
 from .objecttypes import object_type
 from .account import PublicKey
@@ -54,7 +55,41 @@ class Operation():
         return class_
 
     def __bytes__(self):
-        return bytes(Id(self.opId)) + bytes(self.op)
+        return tobytes(self)
+
+    def serialize(self, buf):
+        writevarint(buf, self.opId)
+        serialize(self.op, buf)
+
+    @classmethod
+    def decode(cls, data, offset=0):
+        """ Read an operation from its wire format
+
+            :param memoryview data: Binary data
+            :param int offset: Position of the operation in ``data``
+            :return: ``([name, op], offset)``
+        """
+        # Only used to look up names and classes of this chain
+        lookup = cls.__new__(cls)
+        opId, offset = readvarint(data, offset)
+        if opId not in lookup.operations().values():
+            raise ValueError("Unknown operation id %d" % opId)
+        name = lookup.getOperationNameForId(opId)
+        try:
+            klass = lookup._getklass(name[0].upper() + name[1:])
+        except AttributeError:
+            raise NotImplementedError("Unimplemented Operation %s" % name)
+        op, offset = klass.decode(data, offset)
+        return [name, op], offset
+
+    @classmethod
+    def from_bytes(cls, data):
+        """ Create an operation from its wire format
+        """
+        op, offset = cls.decode(memoryview(data))
+        if offset != len(data):
+            raise ValueError("Trailing bytes after operation")
+        return cls(op)
 
     def __str__(self):
         return json.dumps([self.opId, self.op.toJson()])
@@ -68,21 +103,78 @@ class GrapheneObject(object):
         * ``instance.__json__()``: encodes data into json format
         * ``bytes(instance)``: encodes data into wire format
         * ``str(instances)``: dumps json object as string
+        * ``klass.from_bytes(data)``: decodes data from wire format
+          (requires ``layout``)
 
     """
+
+    #: Wire format as list of ``(name, decoder)``, see
+    #: ``graphenebase.types.readstruct``
+    layout = None
+
     def __init__(self, data=None):
         self.data = data
 
+    @classmethod
+    def getLayout(cls):
+        return cls.layout
+
+    @classmethod
+    def decode(cls, data, offset=0):
+        """ Read the object from its wire format
+
+            :param memoryview data: Binary data
+            :param int offset: Position of the object in ``data``
+            :return: ``(dict, offset)`` with the object as in the JSON
+                API. Absent optional fields are left out.
+        """
+        layout = cls.getLayout()
+        if layout is None:
+            raise NotImplementedError(
+                "%s cannot be decoded" % cls.__name__)
+        result = OrderedDict()
+        for name, decoder in layout:
+            value, offset = decoder(data, offset)
+            if value is not None:
+                result[name] = value
+        return result, offset
+
+    @classmethod
+    def from_bytes(cls, data):
+        """ Create the object from its wire format
+
+            :param bytes data: Binary data
+        """
+        d, offset = cls.decode(memoryview(data))
+        if offset != len(data):
+            raise ValueError("Trailing bytes after %s" % cls.__name__)
+        return cls(d)
+
     def __bytes__(self):
         if self.data is None:
             return bytes()
-        b = b""
-        for name, value in self.data.items():
-            if isinstance(value, str):
-                b += bytes(value, 'utf-8')
+        return tobytes(self)
+
+    def serialize(self, buf):
+        """ Append the wire format to the bytearray ``buf``
+        """
+        if self.data is None:
+            return
+        values = list(self.data.values())
+        key = (type(self),) + tuple(type(v) for v in values)
+        steps = _compiled.get(key)
+        if steps is None:
+            steps = _compiled[key] = compileLayout(values)
+        for packer, padding, indexes in steps:
+            if packer is None:
+                serialize(values[indexes], buf)
             else:
-                b += bytes(value)
-        return b
+                args = []
+                for i in indexes:
+                    args.extend(values[i].packValues())
+                offset = len(buf)
+                buf += padding
+                packer.pack_into(buf, offset, *args)
 
     def __json__(self):
         if self.data is None:
@@ -111,5 +203,35 @@ class GrapheneObject(object):
         return self.__json__()
 
 
+#: Compiled serializers by object class and types of its fields
+_compiled = {}
+
+
+def compileLayout(values):
+    """ Compile the serializer for a ``GrapheneObject`` with the field
+        values ``values``. Consecutive fields of fixed size types (that
+        have a ``fmt``) are packed with a single ``struct.Struct``.
+
+        :return: list of ``(packer, padding, indexes)`` steps, or
+            ``(None, None, index)`` for fields that serialize themselves
+    """
+    steps = []
+    fmt, indexes = "", []
+    for i, value in enumerate(values):
+        if hasattr(value, "fmt"):
+            fmt += value.fmt.lstrip("<")
+            indexes.append(i)
+            continue
+        if indexes:
+            packer = struct.Struct("<" + fmt)
+            steps.append((packer, bytes(packer.size), indexes))
+            fmt, indexes = "", []
+        steps.append((None, None, i))
+    if indexes:
+        packer = struct.Struct("<" + fmt)
+        steps.append((packer, bytes(packer.size), indexes))
+    return steps
+
+
 def isArgsThisClass(self, args):
     return (len(args) == 1 and type(args[0]).__name__ == type(self).__name__)
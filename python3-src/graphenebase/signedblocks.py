@@ -0,0 +1,152 @@
+import hashlib
+import mmap
+import struct
+from binascii import hexlify
+from collections import OrderedDict
+
+from .types import (
+    Array,
+    Bytes,
+    PointInTime,
+    Signature,
+    Static_variant,
+    String,
+    Uint32,
+    Void,
+    readvarint,
+    varint,
+)
+from .signedtransactions import Signed_Transaction
+
+
+def decodeVersion(data, offset=0):
+    """ Decode a protocol version (``major.minor.patch``)
+    """
+    v, offset = Uint32.decode(data, offset)
+    return "%d.%d.%d" % (v >> 24, (v >> 16) & 0xff, v & 0xffff), offset
+
+
+def decodeBlockId(data, offset=0):
+    """ Decode a block id (ripemd160)
+    """
+    return Bytes.decode(data, offset, 20)
+
+
+def decodeHardforkVote(data, offset=0):
+    hf_version, offset = decodeVersion(data, offset)
+    hf_time, offset = PointInTime.decode(data, offset)
+    return OrderedDict([
+        ("hf_version", hf_version),
+        ("hf_time", hf_time),
+    ]), offset
+
+
+class Signed_Block(object):
+    """ Decodes signed blocks from their wire format
+
+        Blocks are decoded as ``dict`` like the ones returned by
+        ``get_block``. ``block_id`` and ``transaction_ids`` are derived
+        from the binary data, ``signing_key`` is left out as it requires
+        to recover the key from the witness signature.
+
+        .. code-block:: python
+
+            block = Signed_Block.from_bytes(data)
+            for block in Signed_Block.fromBlockLog("blockchain/block_log"):
+                print(block["block_id"])
+    """
+
+    layout = [
+        ('previous', decodeBlockId),
+        ('timestamp', PointInTime.decode),
+        ('witness', String.decode),
+        ('transaction_merkle_root', decodeBlockId),
+        ('extensions', Array.decoder(Static_variant.decoder([
+            Void.decode,
+            decodeVersion,
+            decodeHardforkVote,
+        ]))),
+        ('witness_signature', Signature.decode),
+    ]
+
+    @classmethod
+    def getTransactionKlass(cls):
+        return Signed_Transaction
+
+    @classmethod
+    def decode(cls, data, offset=0):
+        """ Read a block from its wire format
+
+            :param memoryview data: Binary data
+            :param int offset: Position of the block in ``data``
+            :return: ``(dict, offset)``
+        """
+        start = offset
+        block = OrderedDict()
+        for name, decoder in cls.layout:
+            block[name], offset = decoder(data, offset)
+
+        # The block id is the hash of the signed header with the block
+        # number in its first four bytes
+        blocknum = int(block["previous"][:8], 16) + 1
+        block_id = (
+            struct.pack(">I", blocknum) +
+            hashlib.sha224(data[start:offset]).digest()[4:20])
+
+        txklass = cls.getTransactionKlass()
+        transactions = []
+        transaction_ids = []
+        count, offset = readvarint(data, offset)
+        for i in range(count):
+            tx_start = offset
+            tx, offset = txklass.decode(data, offset)
+            # The transaction id is the hash of the unsigned transaction
+            signatures = len(tx["signatures"])
+            unsigned_end = offset - 65 * signatures - len(varint(signatures))
+            transaction_ids.append(hexlify(
+                hashlib.sha256(data[tx_start:unsigned_end]).digest()[:20]
+            ).decode("ascii"))
+            transactions.append(tx)
+
+        block["transactions"] = transactions
+        block["block_id"] = hexlify(block_id).decode("ascii")
+        block["transaction_ids"] = transaction_ids
+        return block, offset
+
+    @classmethod
+    def from_bytes(cls, data):
+        """ Decode a block from its wire format
+
+            :param bytes data: Binary data
+        """
+        block, offset = cls.decode(memoryview(data))
+        if offset != len(data):
+            raise ValueError("Trailing bytes after block")
+        return block
+
+    @classmethod
+    def fromBlockLog(cls, filename, start=0):
+        """ Yield the blocks of a ``block_log`` file of a node
+
+            :param str filename: Path to the ``block_log``
+            :param int start: Position of the first block in the file
+
+            Every block is followed by its position in the file as 64bit
+            integer. The file is memory mapped, so only the decoded
+            blocks are held in memory.
+        """
+        with open(filename, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                data = memoryview(m)
+                try:
+                    offset = start
+                    while offset < len(data):
+                        block, end = cls.decode(data, offset)
+                        position = struct.unpack_from("<Q", data, end)[0]
+                        if position != offset:
+                            raise ValueError(
+                                "Corrupt block log at %d" % offset)
+                        offset = end + 8
+                        yield block
+                finally:
+                    data.release()
@@ -1,9 +1,12 @@
+import os
+import threading
 import time
 import ecdsa
 import hashlib
 from binascii import hexlify, unhexlify
 import struct
 from collections import OrderedDict
+from functools import lru_cache, partial
 
 from .account import PrivateKey, PublicKey
 from .types import (
@@ -13,6 +16,8 @@ from .types import (
     PointInTime,
     Uint16,
     Uint32,
+    Static_variant,
+    Void,
 )
 from .objects import GrapheneObject, isArgsThisClass
 from .operations import Operation
@@ -70,9 +75,21 @@ class Signed_Transaction(GrapheneObject):
                 ('signatures', kwargs['signatures']),
             ]))
 
-    def getOperationKlass(self):
+    @classmethod
+    def getOperationKlass(cls):
         return Operation
 
+    @classmethod
+    def getLayout(cls):
+        return [
+            ('ref_block_num', Uint16.decode),
+            ('ref_block_prefix', Uint32.decode),
+            ('expiration', PointInTime.decode),
+            ('operations', Array.decoder(cls.getOperationKlass().decode)),
+            ('extensions', Set.decoder(Static_variant.decoder([Void.decode]))),
+            ('signatures', Array.decoder(Signature.decode)),
+        ]
+
     def recoverPubkeyParameter(self, digest, signature, pubkey):
         """ Use to derive a number that allows to easily recover the
             public key from the signature
@@ -102,37 +119,12 @@ class Signed_Transaction(GrapheneObject):
         return '%064x%064x' % (x, y)
 
     def compressedPubkey(self, pk):
-        order = pk.curve.generator.order()
-        p = pk.pubkey.point
-        x_str = ecdsa.util.number_to_string(p.x(), order)
-        return bytes(chr(2 + (p.y() & 1)), 'ascii') + x_str
+        return compressedPubkey(pk)
 
     def recover_public_key(self, digest, signature, i):
         """ Recover the public key from the the signature
         """
-        # See http: //www.secg.org/download/aid-780/sec1-v2.pdf section 4.1.6 primarily
-        curve = ecdsa.SECP256k1.curve
-        G = ecdsa.SECP256k1.generator
-        order = ecdsa.SECP256k1.order
-        yp = (i % 2)
-        r, s = ecdsa.util.sigdecode_string(signature, order)
-        # 1.1
-        x = r + (i // 2) * order
-        # 1.3. This actually calculates for either effectively 02||X or 03||X depending on 'k' instead of always for 02||X as specified.
-        # This substitutes for the lack of reversing R later on. -R actually is defined to be just flipping the y-coordinate in the elliptic curve.
-        alpha = ((x * x * x) + (curve.a() * x) + curve.b()) % curve.p()
-        beta = ecdsa.numbertheory.square_root_mod_prime(alpha, curve.p())
-        y = beta if (beta - yp) % 2 == 0 else curve.p() - beta
-        # 1.4 Constructor of Point is supposed to check if nR is at infinity.
-        R = ecdsa.ellipticcurve.Point(curve, x, y, order)
-        # 1.5 Compute e
-        e = ecdsa.util.string_to_number(digest)
-        # 1.6 Compute Q = r^-1(sR - eG)
-        Q = ecdsa.numbertheory.inverse_mod(r, order) * (s * R + (-e % order) * G)
-        # Not strictly necessary, but let's verify the message for paranoia's sake.
-        if not ecdsa.VerifyingKey.from_public_point(Q, curve=ecdsa.SECP256k1).verify_digest(signature, digest, sigdecode=ecdsa.util.sigdecode_string):
-            return None
-        return ecdsa.VerifyingKey.from_public_point(Q, curve=ecdsa.SECP256k1)
+        return recover_public_key(digest, signature, i)
 
     def getKnownChains(self):
         return known_chains
@@ -173,38 +165,14 @@ class Signed_Transaction(GrapheneObject):
             raise
         chain_params = self.getChainParams(chain)
         self.deriveDigest(chain)
-        signatures = self.data["signatures"].data
-        pubKeysFound = []
-
-        for signature in signatures:
-            sig = bytes(signature)[1:]
-            recoverParameter = (bytes(signature)[0]) - 4 - 27  # recover parameter only
-
-            if USE_SECP256K1:
-                ALL_FLAGS = secp256k1.lib.SECP256K1_CONTEXT_VERIFY | secp256k1.lib.SECP256K1_CONTEXT_SIGN
-                # Placeholder
-                pub = secp256k1.PublicKey(flags=ALL_FLAGS)
-                # Recover raw signature
-                sig = pub.ecdsa_recoverable_deserialize(sig, recoverParameter)
-                # Recover PublicKey
-                verifyPub = secp256k1.PublicKey(pub.ecdsa_recover(bytes(self.message), sig))
-                # Convert recoverable sig to normal sig
-                normalSig = verifyPub.ecdsa_recoverable_convert(sig)
-                # Verify
-                verifyPub.ecdsa_verify(bytes(self.message), normalSig)
-                phex = hexlify(verifyPub.serialize(compressed=True)).decode('ascii')
-                pubKeysFound.append(phex)
-            else:
-                p = self.recover_public_key(self.digest, sig, recoverParameter)
-                # Will throw an exception of not valid
-                p.verify_digest(
-                    sig,
-                    self.digest,
-                    sigdecode=ecdsa.util.sigdecode_string
-                )
-                phex = hexlify(self.compressedPubkey(p)).decode('ascii')
-                pubKeysFound.append(phex)
+        pubKeysFound = [
+            recoverPubkey(self.digest, bytes(signature))
+            for signature in self.data["signatures"].data
+        ]
+        self._checkPubkeys(pubkeys, pubKeysFound, chain_params)
+        return pubKeysFound
 
+    def _checkPubkeys(self, pubkeys, pubKeysFound, chain_params):
         for pubkey in pubkeys:
             if not isinstance(pubkey, PublicKey):
                 raise Exception("Pubkeys must be array of 'PublicKey'")
@@ -214,13 +182,61 @@ class Signed_Transaction(GrapheneObject):
                 k = PublicKey(PublicKey(k).compressed())
                 f = format(k, chain_params["prefix"])
                 raise Exception("Signature for %s missing!" % f)
-        return pubKeysFound
+
+    @classmethod
+    def verifyMany(cls, transactions, pubkeys=None, chain=None, processes=None):
+        """ Verify the signatures of many transactions, e.g. of a block
+
+            :param list transactions: Transactions to verify
+            :param list pubkeys: For every transaction, a list of
+                ``PublicKey`` that must have signed it (optional)
+            :param str chain: identifier for the chain
+            :param int processes: Number of worker processes to use if
+                only the (slow) ``ecdsa`` backend is available. Defaults
+                to the number of CPUs, ``1`` disables the process pool.
+            :return: for every transaction, the list of public keys (hex)
+                that signed it
+
+            Recovered public keys are cached by digest and signature
+            (see ``recoverPubkey``).
+
+            .. code-block:: python
+
+                txs = [Signed_Transaction(dict(tx)) for tx in block["transactions"]]
+                Signed_Transaction.verifyMany(txs, chain="STEEM")
+        """
+        if not chain:
+            raise Exception("Chain needs to be provided!")
+        transactions = list(transactions)
+        chain_params = transactions[0].getChainParams(chain) if transactions else None
+
+        queries = []
+        for tx in transactions:
+            tx.deriveDigest(chain)
+            for signature in tx.data["signatures"].data:
+                queries.append((tx.digest, bytes(signature)))
+
+        missing = [q for q in queries if q not in _recovered]
+        if not USE_SECP256K1 and processes != 1 and len(missing) > 1:
+            processes = processes or os.cpu_count() or 1
+            chunksize = max(1, len(missing) // (processes * 4))
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(processes) as pool:
+                for query, pubkey in zip(missing, pool.map(
+                        _recoverPubkey, missing, chunksize=chunksize)):
+                    _cacheRecovered(query, pubkey)
+
+        result = []
+        found = iter([recoverPubkey(*q) for q in queries])
+        for n, tx in enumerate(transactions):
+            pubKeysFound = [next(found) for s in tx.data["signatures"].data]
+            if pubkeys:
+                tx._checkPubkeys(pubkeys[n], pubKeysFound, chain_params)
+            result.append(pubKeysFound)
+        return result
 
     def _is_canonical(self, sig):
-        return (not (sig[0] & 0x80) and
-                not (sig[0] == 0 and not (sig[1] & 0x80)) and
-                not (sig[32] & 0x80) and
-                not (sig[32] == 0 and not (sig[33] & 0x80)))
+        return isCanonical(sig)
 
     def sign(self, wifkeys, chain=None):
         """ Sign the transaction with the provided private keys.
@@ -240,78 +256,296 @@ class Signed_Transaction(GrapheneObject):
         # Sign the message with every private key given!
         sigs = []
         for wif in self.privkeys:
-            p = bytes(PrivateKey(wif))
-            i = 0
-            if USE_SECP256K1:
-                ndata = secp256k1.ffi.new("const int *ndata")
-                ndata[0] = 0
-                while True:
-                    ndata[0] += 1
-                    privkey = secp256k1.PrivateKey(p, raw=True)
-                    sig = secp256k1.ffi.new('secp256k1_ecdsa_recoverable_signature *')
-                    signed = secp256k1.lib.secp256k1_ecdsa_sign_recoverable(
-                        privkey.ctx,
-                        sig,
-                        self.digest,
-                        privkey.private_key,
-                        secp256k1.ffi.NULL,
-                        ndata
-                    )
-                    assert signed == 1
-                    signature, i = privkey.ecdsa_recoverable_serialize(sig)
-                    if self._is_canonical(signature):
-                        i += 4   # compressed
-                        i += 27  # compact
-                        break
-            else:
-                cnt = 0
-                sk = ecdsa.SigningKey.from_string(p, curve=ecdsa.SECP256k1)
-                while 1:
-                    cnt += 1
-                    if not cnt % 20:
-                        log.info("Still searching for a canonical signature. Tried %d times already!" % cnt)
-
-                    # Deterministic k
-                    #
-                    k = ecdsa.rfc6979.generate_k(
-                        sk.curve.generator.order(),
-                        sk.privkey.secret_multiplier,
-                        hashlib.sha256,
-                        hashlib.sha256(
-                            self.digest +
-                            struct.pack("d", time.time())  # use the local time to randomize the signature
-                        ).digest())
-
-                    # Sign message
-                    #
-                    sigder = sk.sign_digest(
-                        self.digest,
-                        sigencode=ecdsa.util.sigencode_der,
-                        k=k)
-
-                    # Reformating of signature
-                    #
-                    r, s = ecdsa.util.sigdecode_der(sigder, sk.curve.generator.order())
-                    signature = ecdsa.util.sigencode_string(r, s, sk.curve.generator.order())
-
-                    # Make sure signature is canonical!
-                    #
-                    lenR = sigder[3]
-                    lenS = sigder[5 + lenR]
-                    if lenR is 32 and lenS is 32:
-                        # Derive the recovery parameter
-                        #
-                        i = self.recoverPubkeyParameter(self.digest, signature, sk.get_verifying_key())
-                        i += 4   # compressed
-                        i += 27  # compact
-                        break
-
-            # pack signature
-            #
-            sigstr = struct.pack("<B", i)
-            sigstr += signature
-
-            sigs.append(Signature(sigstr))
+            sigs.append(Signature(signDigest(self.digest, rawPrivateKey(wif))))
 
         self.data["signatures"] = Array(sigs)
         return self
+
+    @classmethod
+    def signMany(cls, transactions, wifkeys, chain=None, processes=None):
+        """ Sign many transactions with the same private keys
+
+            :param list transactions: Transactions to sign
+            :param array wifkeys: Array of wif keys
+            :param str chain: identifier for the chain
+            :param int processes: Number of worker processes to use if
+                only the (slow) ``ecdsa`` backend is available. Defaults
+                to the number of CPUs, ``1`` disables the process pool.
+            :return: the signed transactions in the given order
+
+            The private keys are parsed only once and all signatures
+            share one secp256k1 context.
+        """
+        if not chain:
+            raise Exception("Chain needs to be provided!")
+        privkeys = []
+        [privkeys.append(item) for item in wifkeys if item not in privkeys]
+        rawkeys = [rawPrivateKey(wif) for wif in privkeys]
+
+        transactions = list(transactions)
+        for tx in transactions:
+            tx.deriveDigest(chain)
+            tx.privkeys = privkeys
+        digests = [tx.digest for tx in transactions]
+
+        if USE_SECP256K1 or processes == 1 or len(transactions) < 2:
+            signatures = [signDigests(digest, rawkeys) for digest in digests]
+        else:
+            processes = processes or os.cpu_count() or 1
+            chunksize = max(1, len(digests) // (processes * 4))
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(processes) as pool:
+                signatures = list(pool.map(
+                    partial(signDigests, rawkeys=rawkeys),
+                    digests,
+                    chunksize=chunksize
+                ))
+
+        for tx, sigs in zip(transactions, signatures):
+            tx.data["signatures"] = Array([Signature(sig) for sig in sigs])
+        return transactions
+
+
+@lru_cache(maxsize=1024)
+def rawPrivateKey(wif):
+    """ Returns the raw private key of ``wif`` (cached)
+    """
+    return bytes(PrivateKey(wif))
+
+
+def isCanonical(sig):
+    return (not (sig[0] & 0x80) and
+            not (sig[0] == 0 and not (sig[1] & 0x80)) and
+            not (sig[32] & 0x80) and
+            not (sig[32] == 0 and not (sig[33] & 0x80)))
+
+
+_secp256k1_ctx = None
+
+
+@lru_cache(maxsize=1024)
+def _secp256k1PrivateKey(p):
+    """ Parsed secp256k1 private keys, all sharing one context
+    """
+    global _secp256k1_ctx
+    privkey = secp256k1.PrivateKey(p, raw=True, ctx=_secp256k1_ctx)
+    _secp256k1_ctx = privkey.ctx
+    return privkey
+
+
+@lru_cache(maxsize=1024)
+def _ecdsaSigningKey(p):
+    return ecdsa.SigningKey.from_string(p, curve=ecdsa.SECP256k1)
+
+
+def signDigests(digest, rawkeys):
+    """ Sign ``digest`` with every raw private key in ``rawkeys``
+    """
+    return [signDigest(digest, p) for p in rawkeys]
+
+
+def signDigest(digest, p):
+    """ Returns the compact, canonical signature of ``digest`` with the
+        raw private key ``p``
+    """
+    if USE_SECP256K1:
+        privkey = _secp256k1PrivateKey(p)
+        ndata = secp256k1.ffi.new("const int *ndata")
+        ndata[0] = 0
+        while True:
+            ndata[0] += 1
+            sig = secp256k1.ffi.new('secp256k1_ecdsa_recoverable_signature *')
+            signed = secp256k1.lib.secp256k1_ecdsa_sign_recoverable(
+                privkey.ctx,
+                sig,
+                digest,
+                privkey.private_key,
+                secp256k1.ffi.NULL,
+                ndata
+            )
+            assert signed == 1
+            signature, i = privkey.ecdsa_recoverable_serialize(sig)
+            if isCanonical(signature):
+                i += 4   # compressed
+                i += 27  # compact
+                break
+    else:
+        cnt = 0
+        sk = _ecdsaSigningKey(p)
+        while 1:
+            cnt += 1
+            if not cnt % 20:
+                log.info("Still searching for a canonical signature. Tried %d times already!" % cnt)
+
+            # Deterministic k
+            #
+            k = ecdsa.rfc6979.generate_k(
+                sk.curve.generator.order(),
+                sk.privkey.secret_multiplier,
+                hashlib.sha256,
+                hashlib.sha256(
+                    digest +
+                    struct.pack("d", time.time())  # use the local time to randomize the signature
+                ).digest())
+
+            # Sign message
+            #
+            sigder = sk.sign_digest(
+                digest,
+                sigencode=ecdsa.util.sigencode_der,
+                k=k)
+
+            # Reformating of signature
+            #
+            r, s = ecdsa.util.sigdecode_der(sigder, sk.curve.generator.order())
+            signature = ecdsa.util.sigencode_string(r, s, sk.curve.generator.order())
+
+            # Make sure signature is canonical!
+            #
+            lenR = sigder[3]
+            lenS = sigder[5 + lenR]
+            if lenR == 32 and lenS == 32:
+                # Derive the recovery parameter from R = k * G instead
+                # of recovering the public key
+                #
+                R = sk.curve.generator * k
+                i = (R.y() & 1) | (2 if R.x() >= sk.curve.generator.order() else 0)
+                i += 4   # compressed
+                i += 27  # compact
+                break
+
+    # pack signature
+    #
+    return struct.pack("<B", i) + signature
+
+
+#: Recovered public keys by ``(digest, signature)``
+_recovered = OrderedDict()
+_recovered_size = 100000
+_recovered_lock = threading.Lock()
+
+
+def _cacheRecovered(query, pubkey):
+    with _recovered_lock:
+        _recovered[query] = pubkey
+        if len(_recovered) > _recovered_size:
+            _recovered.popitem(last=False)
+
+
+def recoverPubkey(digest, signature):
+    """ Returns the compressed public key (hex) that created the compact
+        ``signature`` (65 bytes) of ``digest``. Results are kept in an
+        LRU cache.
+
+        :raises Exception: if no public key can be recovered
+    """
+    query = (digest, signature)
+    with _recovered_lock:
+        pubkey = _recovered.get(query)
+        if pubkey is not None:
+            _recovered.move_to_end(query)
+            return pubkey
+    pubkey = _recoverPubkey(query)
+    _cacheRecovered(query, pubkey)
+    return pubkey
+
+
+def _recoverPubkey(query):
+    digest, signature = query
+    recoverParameter = signature[0] - 4 - 27  # recover parameter only
+    sig = signature[1:]
+    if not 0 <= recoverParameter <= 3:
+        raise Exception("Invalid signature")
+    if USE_SECP256K1:
+        ALL_FLAGS = secp256k1.lib.SECP256K1_CONTEXT_VERIFY | secp256k1.lib.SECP256K1_CONTEXT_SIGN
+        # Placeholder
+        pub = secp256k1.PublicKey(flags=ALL_FLAGS, ctx=_secp256k1_ctx)
+        # Recover raw signature
+        sig = pub.ecdsa_recoverable_deserialize(sig, recoverParameter)
+        # Recover PublicKey
+        verifyPub = secp256k1.PublicKey(pub.ecdsa_recover(digest, sig, raw=True), ctx=pub.ctx)
+        # Verify
+        normalSig = verifyPub.ecdsa_recoverable_convert(sig)
+        if not verifyPub.ecdsa_verify(digest, normalSig, raw=True):
+            raise Exception("Invalid signature")
+        return hexlify(verifyPub.serialize(compressed=True)).decode('ascii')
+    else:
+        Q = recover_point(digest, sig, recoverParameter)
+        if hasattr(Q, "to_affine"):
+            Q = Q.to_affine()
+        # Will throw an exception of not valid
+        ecdsa.VerifyingKey.from_public_point(
+            Q, curve=ecdsa.SECP256k1
+        ).verify_digest(sig, digest, sigdecode=ecdsa.util.sigdecode_string)
+        order = ecdsa.SECP256k1.order
+        return hexlify(
+            bytes([2 + (Q.y() & 1)]) + ecdsa.util.number_to_string(Q.x(), order)
+        ).decode('ascii')
+
+
+def recover_point(digest, signature, i):
+    """ Recover the public key point from the signature (``ecdsa``
+        backend). Uses jacobian coordinates if available.
+    """
+    curve = ecdsa.SECP256k1.curve
+    G = ecdsa.SECP256k1.generator
+    order = ecdsa.SECP256k1.order
+    yp = (i % 2)
+    if not 0 <= i <= 3:
+        raise Exception("Invalid signature")
+    r, s = ecdsa.util.sigdecode_string(signature, order)
+    if not (1 <= r < order and 1 <= s < order):
+        raise Exception("Invalid signature")
+    x = r + (i // 2) * order
+    if x >= curve.p():
+        raise Exception("Invalid signature")
+    alpha = ((x * x * x) + (curve.a() * x) + curve.b()) % curve.p()
+    beta = ecdsa.numbertheory.square_root_mod_prime(alpha, curve.p())
+    y = beta if (beta - yp) % 2 == 0 else curve.p() - beta
+    e = ecdsa.util.string_to_number(digest)
+    rinv = ecdsa.numbertheory.inverse_mod(r, order)
+    # Q = r^-1(sR - eG)
+    if hasattr(ecdsa.ellipticcurve, "PointJacobi"):
+        R = ecdsa.ellipticcurve.PointJacobi(curve, x, y, 1, order)
+        Q = R.mul_add(s * rinv % order, G, -e * rinv % order)
+    else:
+        R = ecdsa.ellipticcurve.Point(curve, x, y, order)
+        Q = rinv * (s * R + (-e % order) * G)
+    if Q == ecdsa.ellipticcurve.INFINITY:
+        raise Exception("Invalid signature")
+    return Q
+
+
+def compressedPubkey(pk):
+    order = pk.curve.generator.order()
+    p = pk.pubkey.point
+    x_str = ecdsa.util.number_to_string(p.x(), order)
+    return bytes(chr(2 + (p.y() & 1)), 'ascii') + x_str
+
+
+def recover_public_key(digest, signature, i):
+    """ Recover the public key from the the signature
+    """
+    # See http: //www.secg.org/download/aid-780/sec1-v2.pdf section 4.1.6 primarily
+    curve = ecdsa.SECP256k1.curve
+    G = ecdsa.SECP256k1.generator
+    order = ecdsa.SECP256k1.order
+    yp = (i % 2)
+    r, s = ecdsa.util.sigdecode_string(signature, order)
+    # 1.1
+    x = r + (i // 2) * order
+    # 1.3. This actually calculates for either effectively 02||X or 03||X depending on 'k' instead of always for 02||X as specified.
+    # This substitutes for the lack of reversing R later on. -R actually is defined to be just flipping the y-coordinate in the elliptic curve.
+    alpha = ((x * x * x) + (curve.a() * x) + curve.b()) % curve.p()
+    beta = ecdsa.numbertheory.square_root_mod_prime(alpha, curve.p())
+    y = beta if (beta - yp) % 2 == 0 else curve.p() - beta
+    # 1.4 Constructor of Point is supposed to check if nR is at infinity.
+    R = ecdsa.ellipticcurve.Point(curve, x, y, order)
+    # 1.5 Compute e
+    e = ecdsa.util.string_to_number(digest)
+    # 1.6 Compute Q = r^-1(sR - eG)
+    Q = ecdsa.numbertheory.inverse_mod(r, order) * (s * R + (-e % order) * G)
+    # Not strictly necessary, but let's verify the message for paranoia's sake.
+    if not ecdsa.VerifyingKey.from_public_point(Q, curve=ecdsa.SECP256k1).verify_digest(signature, digest, sigdecode=ecdsa.util.sigdecode_string):
+        return None
+    return ecdsa.VerifyingKey.from_public_point(Q, curve=ecdsa.SECP256k1)
@@ -3,7 +3,9 @@ import time
 from calendar import timegm
 from datetime import datetime
 import struct
+import threading
 from collections import OrderedDict
+from functools import lru_cache
 import json
 
 from .objecttypes import object_type
@@ -22,18 +24,38 @@ def varint(n):
     return data
 
 
+def writevarint(buf, n):
+    """ Append the varint encoding of ``n`` to the bytearray ``buf``
+    """
+    while n >= 0x80:
+        buf.append((n & 0x7f) | 0x80)
+        n >>= 7
+    buf.append(n)
+
+
 def varintdecode(data):
     """ Varint decoding
     """
+    return readvarint(data)[0]
+
+
+def readvarint(data, offset=0):
+    """ Read a varint from ``data`` starting at ``offset``
+
+        :param bytes data: Binary data (``bytes``, ``bytearray`` or
+            ``memoryview``)
+        :param int offset: Position of the varint in ``data``
+        :return: ``(value, offset)`` with the position after the varint
+    """
     shift = 0
     result = 0
-    for c in data:
-        b = ord(c)
+    while True:
+        b = data[offset]
+        offset += 1
         result |= ((b & 0x7f) << shift)
         if not (b & 0x80):
-            break
+            return result, offset
         shift += 7
-    return result
 
 
 def variable_buffer(s):
@@ -42,6 +64,65 @@ def variable_buffer(s):
     return varint(len(s)) + s
 
 
+def readstruct(fmt):
+    """ Returns a decoder for a fixed size ``struct`` format
+
+        All decoders take ``(data, offset)`` and return ``(value,
+        offset)`` with the value in the form of the JSON API and the
+        position after it. ``data`` may be a ``memoryview``, so that
+        nested values are read without copying the buffer.
+    """
+    packer = struct.Struct(fmt)
+    unpack_from = packer.unpack_from
+    size = packer.size
+
+    def decode(data, offset=0):
+        return unpack_from(data, offset)[0], offset + size
+    return decode
+
+
+_buffers = threading.local()
+
+
+def serialize(value, buf):
+    """ Append the wire format of ``value`` to the bytearray ``buf``
+
+        Types that implement ``serialize(buf)`` write into ``buf``
+        directly, all others are converted with ``bytes()``.
+    """
+    if hasattr(value, "serialize"):
+        value.serialize(buf)
+    elif isinstance(value, str):
+        buf += value.encode("utf-8")
+    else:
+        buf += bytes(value)
+
+
+def tobytes(value):
+    """ Returns the wire format of ``value``. Serializes into a buffer
+        that is reused by subsequent calls of the same thread.
+    """
+    buf = getattr(_buffers, "buf", None)
+    if buf is None:
+        # First call in this thread or called while serializing
+        buf = bytearray()
+    else:
+        _buffers.buf = None
+        del buf[:]
+    try:
+        value.serialize(buf)
+        return bytes(buf)
+    finally:
+        _buffers.buf = buf
+
+
+@lru_cache(maxsize=1024)
+def timestamp(d):
+    """ Returns the unix timestamp of a ``%Y-%m-%dT%H:%M:%S`` string
+    """
+    return timegm(time.strptime((d + "UTC"), timeformat))
+
+
 def JsonObj(data):
     """ Returns json object from data
     """
@@ -49,59 +130,94 @@ def JsonObj(data):
 
 
 class Uint8():
+    fmt = "<B"
+
     def __init__(self, d):
         self.data = d
 
     def __bytes__(self):
         return struct.pack("<B", self.data)
 
+    def packValues(self):
+        return (self.data,)
+
     def __str__(self):
         return '%d' % self.data
 
+    decode = staticmethod(readstruct("<B"))
+
 
 class Int16():
+    fmt = "<h"
+
     def __init__(self, d):
         self.data = int(d)
 
     def __bytes__(self):
         return struct.pack("<h", int(self.data))
 
+    def packValues(self):
+        return (int(self.data),)
+
     def __str__(self):
         return '%d' % self.data
 
+    decode = staticmethod(readstruct("<h"))
+
 
 class Uint16():
+    fmt = "<H"
+
     def __init__(self, d):
         self.data = int(d)
 
     def __bytes__(self):
         return struct.pack("<H", self.data)
 
+    def packValues(self):
+        return (self.data,)
+
     def __str__(self):
         return '%d' % self.data
 
+    decode = staticmethod(readstruct("<H"))
+
 
 class Uint32():
+    fmt = "<I"
+
     def __init__(self, d):
         self.data = int(d)
 
     def __bytes__(self):
         return struct.pack("<I", self.data)
 
+    def packValues(self):
+        return (self.data,)
+
     def __str__(self):
         return '%d' % self.data
 
+    decode = staticmethod(readstruct("<I"))
+
 
 class Uint64():
+    fmt = "<Q"
+
     def __init__(self, d):
         self.data = int(d)
 
     def __bytes__(self):
         return struct.pack("<Q", self.data)
 
+    def packValues(self):
+        return (self.data,)
+
     def __str__(self):
         return '%d' % self.data
 
+    decode = staticmethod(readstruct("<Q"))
+
 
 class Varint32():
     def __init__(self, d):
@@ -110,20 +226,32 @@ class Varint32():
     def __bytes__(self):
         return varint(self.data)
 
+    def serialize(self, buf):
+        writevarint(buf, self.data)
+
     def __str__(self):
         return '%d' % self.data
 
+    decode = staticmethod(readvarint)
+
 
 class Int64():
+    fmt = "<q"
+
     def __init__(self, d):
         self.data = d
 
     def __bytes__(self):
         return struct.pack("<q", self.data)
 
+    def packValues(self):
+        return (self.data,)
+
     def __str__(self):
         return '%d' % self.data
 
+    decode = staticmethod(readstruct("<q"))
+
 
 class String():
     def __init__(self, d):
@@ -133,32 +261,28 @@ class String():
         d = self.unicodify()
         return varint(len(d)) + d
 
+    def serialize(self, buf):
+        d = self.unicodify()
+        writevarint(buf, len(d))
+        buf += d
+
     def __str__(self):
         return '%s' % str(self.data)
 
+    #: Replacements of control characters
+    unicodify_table = dict(
+        [(o, "u%04x" % o) for o in range(32)] +
+        [(8, "b"), (9, "\t"), (10, "\n"), (12, "f"), (13, "\r")]
+    )
+
     def unicodify(self):
-        r = []
-        for s in self.data:
-            o = ord(s)
-            if o <= 7:
-                r.append("u%04x" % o)
-            elif o == 8:
-                r.append("b")
-            elif o == 9:
-                r.append("\t")
-            elif o == 10:
-                r.append("\n")
-            elif o == 11:
-                r.append("u%04x" % o)
-            elif o == 12:
-                r.append("f")
-            elif o == 13:
-                r.append("\r")
-            elif o > 13 and o < 32:
-                r.append("u%04x" % o)
-            else:
-                r.append(s)
-        return bytes("".join(r), "utf-8")
+        return self.data.translate(self.unicodify_table).encode("utf-8")
+
+    @staticmethod
+    def decode(data, offset=0):
+        length, offset = readvarint(data, offset)
+        end = offset + length
+        return str(data[offset:end], "utf-8"), end
 
 
 class Bytes():
@@ -174,9 +298,24 @@ class Bytes():
         d = unhexlify(bytes(self.data, 'utf-8'))
         return varint(len(d)) + d
 
+    def serialize(self, buf):
+        d = unhexlify(bytes(self.data, 'utf-8'))
+        writevarint(buf, len(d))
+        buf += d
+
     def __str__(self):
         return str(self.data)
 
+    @staticmethod
+    def decode(data, offset=0, length=None):
+        """ Read a length prefixed (or, if ``length`` is given, a fixed
+            size) buffer. Returns it hex encoded.
+        """
+        if length is None:
+            length, offset = readvarint(data, offset)
+        end = offset + length
+        return hexlify(data[offset:end]).decode("ascii"), end
+
 
 class Void():
     def __init__(self):
@@ -185,9 +324,16 @@ class Void():
     def __bytes__(self):
         return b''
 
+    def serialize(self, buf):
+        pass
+
     def __str__(self):
         return ""
 
+    @staticmethod
+    def decode(data, offset=0):
+        return {}, offset
+
 
 class Array():
     def __init__(self, d):
@@ -195,7 +341,12 @@ class Array():
         self.length = Varint32(len(self.data))
 
     def __bytes__(self):
-        return bytes(self.length) + b"".join([bytes(a) for a in self.data])
+        return tobytes(self)
+
+    def serialize(self, buf):
+        writevarint(buf, self.length.data)
+        for a in self.data:
+            serialize(a, buf)
 
     def __str__(self):
         r = []
@@ -210,17 +361,44 @@ class Array():
                 r.append(JsonObj(a))
         return json.dumps(r)
 
+    @staticmethod
+    def decoder(element):
+        """ Returns a decoder for an array of ``element``, e.g.
+            ``Array.decoder(String.decode)``
+        """
+        def decode(data, offset=0):
+            length, offset = readvarint(data, offset)
+            result = []
+            for i in range(length):
+                value, offset = element(data, offset)
+                result.append(value)
+            return result, offset
+        return decode
+
 
 class PointInTime():
+    fmt = "<I"
+
     def __init__(self, d):
         self.data = d
 
     def __bytes__(self):
-        return struct.pack("<I", timegm(time.strptime((self.data + "UTC"), timeformat)))
+        return struct.pack("<I", timestamp(self.data))
+
+    def packValues(self):
+        return (timestamp(self.data),)
 
     def __str__(self):
         return self.data
 
+    @staticmethod
+    def decode(data, offset=0):
+        timestamp = struct.unpack_from("<I", data, offset)[0]
+        return (
+            time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(timestamp)),
+            offset + 4
+        )
+
 
 class Signature():
     def __init__(self, d):
@@ -229,9 +407,17 @@ class Signature():
     def __bytes__(self):
         return self.data
 
+    def serialize(self, buf):
+        buf += self.data
+
     def __str__(self):
         return json.dumps(hexlify(self.data).decode('ascii'))
 
+    @staticmethod
+    def decode(data, offset=0):
+        end = offset + 65
+        return hexlify(data[offset:end]).decode("ascii"), end
+
 
 class Bool(Uint8):  # Bool = Uint8
     def __init__(self, d):
@@ -240,6 +426,10 @@ class Bool(Uint8):  # Bool = Uint8
     def __str__(self):
         return True if self.data else False
 
+    @staticmethod
+    def decode(data, offset=0):
+        return bool(data[offset]), offset + 1
+
 
 class Set(Array):  # Set = Array
     def __init__(self, d):
@@ -256,6 +446,16 @@ class Fixed_array():
     def __str__(self):
         raise NotImplementedError
 
+    @staticmethod
+    def decoder(element, length):
+        def decode(data, offset=0):
+            result = []
+            for i in range(length):
+                value, offset = element(data, offset)
+                result.append(value)
+            return result, offset
+        return decode
+
 
 class Optional():
     def __init__(self, d):
@@ -267,6 +467,17 @@ class Optional():
         else:
             return bytes(Bool(1)) + bytes(self.data) if bytes(self.data) else bytes(Bool(0))
 
+    def serialize(self, buf):
+        if not self.data:
+            buf.append(0)
+            return
+        offset = len(buf)
+        buf.append(1)
+        serialize(self.data, buf)
+        if len(buf) == offset + 1:
+            # Empty values are not serialized
+            buf[offset] = 0
+
     def __str__(self):
         return str(self.data)
 
@@ -275,6 +486,17 @@ class Optional():
             return True
         return not bool(bytes(self.data))
 
+    @staticmethod
+    def decoder(element):
+        """ Returns a decoder for an optional ``element``. Absent values
+            are decoded as ``None``.
+        """
+        def decode(data, offset=0):
+            if not data[offset]:
+                return None, offset + 1
+            return element(data, offset + 1)
+        return decode
+
 
 class Static_variant():
     def __init__(self, d, type_id):
@@ -282,10 +504,28 @@ class Static_variant():
         self.type_id = type_id
 
     def __bytes__(self):
-        return varint(self.type_id) + bytes(self.data)
+        return tobytes(self)
+
+    def serialize(self, buf):
+        writevarint(buf, self.type_id)
+        serialize(self.data, buf)
 
     def __str__(self):
-        return {self._type_id: str(self.data)}
+        return json.dumps([self.type_id, JsonObj(self.data)])
+
+    @staticmethod
+    def decoder(elements):
+        """ Returns a decoder for a variant of the types in
+            ``elements`` (indexed by type id). Values are decoded as
+            ``[type_id, value]``.
+        """
+        def decode(data, offset=0):
+            type_id, offset = readvarint(data, offset)
+            if type_id >= len(elements):
+                raise ValueError("Unknown type id %d" % type_id)
+            value, offset = elements[type_id](data, offset)
+            return [type_id, value], offset
+        return decode
 
 
 class Map():
@@ -293,11 +533,13 @@ class Map():
         self.data = data
 
     def __bytes__(self):
-        b = b""
-        b += varint(len(self.data))
+        return tobytes(self)
+
+    def serialize(self, buf):
+        writevarint(buf, len(self.data))
         for e in self.data:
-            b += bytes(e[0]) + bytes(e[1])
-        return b
+            serialize(e[0], buf)
+            serialize(e[1], buf)
 
     def __str__(self):
         r = []
@@ -305,6 +547,21 @@ class Map():
             r.append([str(e[0]), str(e[1])])
         return json.dumps(r)
 
+    @staticmethod
+    def decoder(key, value):
+        """ Returns a decoder for a map, decoded as list of
+            ``[key, value]`` pairs
+        """
+        def decode(data, offset=0):
+            length, offset = readvarint(data, offset)
+            result = []
+            for i in range(length):
+                k, offset = key(data, offset)
+                v, offset = value(data, offset)
+                result.append([k, v])
+            return result, offset
+        return decode
+
 
 class Id():
     def __init__(self, d):
@@ -313,11 +570,18 @@ class Id():
     def __bytes__(self):
         return bytes(self.data)
 
+    def serialize(self, buf):
+        writevarint(buf, self.data.data)
+
     def __str__(self):
         return str(self.data)
 
+    decode = staticmethod(readvarint)
+
 
 class VoteId():
+    fmt = "<I"
+
     def __init__(self, vote):
         parts = vote.split(":")
         assert len(parts) == 2
@@ -328,9 +592,17 @@ class VoteId():
         binary = (self.type & 0xff) | (self.instance << 8)
         return struct.pack("<I", binary)
 
+    def packValues(self):
+        return ((self.type & 0xff) | (self.instance << 8),)
+
     def __str__(self):
         return "%d:%d" % (self.type, self.instance)
 
+    @staticmethod
+    def decode(data, offset=0):
+        binary = struct.unpack_from("<I", data, offset)[0]
+        return "%d:%d" % (binary & 0xff, binary >> 8), offset + 4
+
 
 class ObjectId():
     """ Encodes object/protocol ids
@@ -353,5 +625,18 @@ class ObjectId():
     def __bytes__(self):
         return bytes(self.instance)  # only yield instance
 
+    def serialize(self, buf):
+        self.instance.serialize(buf)
+
     def __str__(self):
         return self.Id
+
+    @staticmethod
+    def decoder(space_type):
+        """ Returns a decoder for ids of the form ``space_type.instance``,
+            e.g. ``ObjectId.decoder("1.2")``
+        """
+        def decode(data, offset=0):
+            instance, offset = readvarint(data, offset)
+            return "%s.%d" % (space_type, instance), offset
+        return decode
@@ -1,16 +1,17 @@
-from .steem import Steem
-
 __all__ = [
     "account",
     "aes",
     "amount",
     "block",
+    "blockarchive",
     "blockchain",
     "blog",
+    "columnar",
     "converter",
     "data",
     "dex",
     "exceptions",
+    "historystore",
     "instance",
     "post",
     "profile",
@@ -22,3 +23,12 @@ __all__ = [
     "wallet",
     "witness",
 ]
+
+
+def __getattr__(name):
+    # Importing Steem pulls in the whole library, so it is only
+    # imported once it is used
+    if name == "Steem":
+        from .steem import Steem
+        return Steem
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
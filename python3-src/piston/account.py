@@ -1,17 +1,85 @@
 import datetime
 import json
 import math
+import queue
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import suppress
+from itertools import chain, tee
 
 from piston.instance import shared_steem_instance
 
 from .amount import Amount
 from .converter import Converter
 from .exceptions import AccountDoesNotExistsException
+from .historystore import historyStore, timestamp
 from .utils import parse_time
 
 
+def history_pages(rpc, account, pages, connections=1):
+    """ Fetch the history ``pages`` (``(from, limit)`` tuples) of
+        ``account`` and yield the results in order
+
+        :param SteemNodeRPC rpc: Connection to the node
+        :param str account: Name of the account
+        :param iter pages: Pages to fetch
+        :param int connections: Number of connections to the node to
+            fetch pages on concurrently. Up to ``2 * connections``
+            pages are fetched ahead of the one being consumed.
+    """
+    if connections <= 1:
+        for page in pages:
+            yield rpc.get_account_history(account, *page)
+        return
+
+    # Connections are opened on demand and shared by the workers
+    idle = queue.Queue()
+    idle.put(rpc)
+    opened = []
+    lock = threading.Lock()
+
+    def fetch(page):
+        try:
+            conn = idle.get_nowait()
+        except queue.Empty:
+            with lock:
+                if rpc.pool or len(opened) + 1 >= connections:
+                    conn = None
+                else:
+                    conn = rpc.clone()
+                    opened.append(conn)
+            if conn is None:
+                conn = idle.get()
+        try:
+            return conn.get_account_history(account, *page)
+        finally:
+            idle.put(conn)
+
+    pages = iter(pages)
+    futures = deque()
+    with ThreadPoolExecutor(connections) as pool:
+        try:
+            for page in pages:
+                futures.append(pool.submit(fetch, page))
+                if len(futures) >= 2 * connections:
+                    break
+            while futures:
+                result = futures.popleft().result()
+                for page in pages:
+                    futures.append(pool.submit(fetch, page))
+                    break
+                yield result
+        finally:
+            for future in futures:
+                future.cancel()
+            pool.shutdown(wait=True)
+            for conn in opened:
+                with suppress(Exception):
+                    conn.ws.close()
+
+
 class Account(dict):
     """ This class allows to easily access Account data
 
@@ -130,7 +198,12 @@ class Account(dict):
         reward_24h = 0.0
         reward_7d = 0.0
 
-        for reward in self.history2(filter_by="curation_reward", take=10000):
+        if self.steem.history_store:
+            rewards = self.query(
+                types=["curation_reward"], start=trailing_7d_t)
+        else:
+            rewards = self.history2(filter_by="curation_reward", take=10000)
+        for reward in rewards:
 
             timestamp = parse_time(reward['timestamp']).timestamp()
             if timestamp > trailing_7d_t:
@@ -166,6 +239,12 @@ class Account(dict):
 
     @staticmethod
     def filter_by_date(items, start_time, end_time=None):
+        """ Filter ``items`` by their ``time`` or ``timestamp``
+
+            To have the operations of a time range out of the history of
+            an account, ``query()`` finds them without going through the
+            whole history.
+        """
         start_time = parse_time(start_time).timestamp()
         if end_time:
             end_time = parse_time(end_time).timestamp()
@@ -184,55 +263,142 @@ class Account(dict):
 
         return filtered_items
 
-    def history(self, filter_by=None, start=0):
+    def _history_pages(self, pages, connections=1):
+        """ Fetch the history ``pages`` of this account, see
+            ``history_pages()`` (internally used)
+        """
+        return history_pages(self.steem.rpc, self.name, pages, connections)
+
+    def _stored_history(self, first, last, only_ops=None, exclude_ops=None,
+                        reverse=False, connections=1, start=None, end=None,
+                        store=None):
+        """ Sync the history store of the ``Steem`` instance and yield the
+            ``[index, entry]`` pairs from ``first`` to ``last`` out of it.
+            Only the entries that are newer than the stored ones, i.e.
+            of reversible blocks, are fetched from the node (internally
+            used)
+        """
+        store = store or self.steem.history_store
+        start = None if start is None else timestamp(start)
+        end = None if end is None else timestamp(end)
+        head = store.sync(self.steem.rpc, self.name, connections)
+        stored = store.last_index(self.name)
+        last = min(last, head)
+
+        tail = []
+        if last > stored:
+            size = store.page_size
+            pages = (
+                (min(i + size - 1, last), min(size - 1, last - i))
+                for i in range(max(stored + 1, first), last + 1, size)
+            )
+            for page in self._history_pages(pages, connections):
+                tail.extend(
+                    e for e in page
+                    if stored < e[0] <= last and
+                    (not only_ops or e[1]["op"][0] in only_ops) and
+                    not (exclude_ops and e[1]["op"][0] in exclude_ops) and
+                    (start is None or
+                     timestamp(e[1]["timestamp"]) >= start) and
+                    (end is None or timestamp(e[1]["timestamp"]) <= end))
+
+        entries = store.entries(
+            self.name, first, min(last, stored),
+            types=only_ops, exclude=exclude_ops, reverse=reverse,
+            start=start, end=end)
+        if reverse:
+            return chain(reversed(tail), entries)
+        return chain(entries, tail)
+
+    def _construct_op(self, index, entry):
+        """ Flatten a history entry into a dict (internally used)
+        """
+        r = {
+            "index": index,
+            "account": self.name,
+            "trx_id": entry['trx_id'],
+            "timestamp": entry['timestamp'],
+            "type": entry['op'][0],
+        }
+        r.update(entry['op'][1])
+        return r
+
+    def query(self, types=None, start=None, end=None, reverse=False,
+              connections=1):
+        """ Returns a generator for the operations of a time range and
+            of certain types, oldest first. The operations come as in
+            ``history()``.
+
+            :param list types: Operation types (defaults to all)
+            :param start: Earliest time, as a timestamp of the blockchain
+                (``2016-08-01T12:00:00``), ``datetime`` (UTC) or seconds
+                since epoch
+            :param end: Latest time
+            :param bool reverse: Latest operation first
+            :param int connections: Number of connections to sync the
+                history on (see ``rawhistory()``)
+
+            The history of the account is synced to the history store of
+            the ``Steem`` instance (or the default one, see
+            ``historystore.py``) and queried there. The store finds the
+            operations of a type through its index of types and the
+            range of indices for the time range in its sparse index of
+            timestamps, so the query does not go through the whole
+            history.
+
+            .. code-block:: python
+
+                for transfer in account.query(
+                        types=["transfer"], start="2017-01-01T00:00:00"):
+                    print(transfer["amount"])
+        """
+        if isinstance(types, str):
+            types = [types]
+        for item in self._stored_history(
+                0, self.virtual_op_count(), only_ops=types, reverse=reverse,
+                connections=connections, start=start, end=end,
+                store=self.steem.history_store or historyStore):
+            yield self._construct_op(*item)
+
+    def history(self, filter_by=None, start=0, connections=1):
         """
         Take all elements from start to last from history, oldest first.
+
+        :param int connections: Number of connections to fetch pages on
+            concurrently (see ``rawhistory()``)
         """
         batch_size = 1000
         max_index = self.virtual_op_count()
         if not max_index:
             return
 
-        start_index = start + batch_size
-        i = start_index
-        while True:
-            if i == start_index:
-                limit = batch_size
-            else:
-                limit = batch_size - 1
-            history = self.steem.rpc.get_account_history(self.name, i, limit)
+        def pages():
+            start_index = start + batch_size
+            i = start_index
+            while i - batch_size < max_index:
+                if i == start_index:
+                    yield i, batch_size
+                else:
+                    yield i, batch_size - 1
+                i += batch_size
+
+        if isinstance(filter_by, str):
+            filter_by = [filter_by]
+        if self.steem.history_store:
+            histories = [self._stored_history(
+                start, max_index - 1, only_ops=filter_by,
+                connections=connections)]
+        else:
+            histories = self._history_pages(pages(), connections)
+
+        for history in histories:
             for item in history:
                 index = item[0]
                 if index >= max_index:
                     return
 
-                op_type = item[1]['op'][0]
-                op = item[1]['op'][1]
-                timestamp = item[1]['timestamp']
-                trx_id = item[1]['trx_id']
-
-                def construct_op(account_name):
-                    r = {
-                        "index": index,
-                        "account": account_name,
-                        "trx_id": trx_id,
-                        "timestamp": timestamp,
-                        "type": op_type,
-                    }
-                    r.update(op)
-                    return r
-
-                if filter_by is None:
-                    yield construct_op(self.name)
-                else:
-                    if type(filter_by) is list:
-                        if op_type in filter_by:
-                            yield construct_op(self.name)
-
-                    if type(filter_by) is str:
-                        if op_type == filter_by:
-                            yield construct_op(self.name)
-            i += batch_size
+                if filter_by is None or item[1]['op'][0] in filter_by:
+                    yield self._construct_op(*item)
 
     def history2(self, filter_by=None, take=1000):
         """
@@ -247,7 +413,7 @@ class Account(dict):
 
     def rawhistory(
         self, first=99999999999,
-        limit=-1, only_ops=[], exclude_ops=[]
+        limit=-1, only_ops=[], exclude_ops=[], connections=1
     ):
         """ Returns a generator for individual account transactions. The
             latest operation will be first. This call can be used in a
@@ -257,14 +423,54 @@ class Account(dict):
             :param int first: sequence number of the first transaction to return
             :param int limit: limit number of transactions to return
             :param array only_ops: Limit generator by these operations
+            :param int connections: Number of connections to the node to
+                fetch pages on concurrently (defaults to ``1``, i.e. one
+                page after another on the connection of the ``Steem``
+                instance)
+
+            Once the first page is known, the indices of all further
+            pages are, so with several ``connections`` they are fetched
+            ahead while the transactions are yielded in order.
+
+            With a history store attached to the ``Steem`` instance
+            (see ``historystore.py``), the transactions are read from
+            the store and only the latest ones are fetched.
         """
         cnt = 0
         _limit = 100
         if _limit > first:
             _limit = first
-        while first > 0:
-            # RPC call
-            txs = self.steem.rpc.get_account_history(self.name, first, _limit)
+        if first <= 0:
+            return
+
+        if self.steem.history_store:
+            for i in self._stored_history(
+                    0, first, only_ops=only_ops, exclude_ops=exclude_ops,
+                    reverse=True, connections=connections):
+                cnt += 1
+                yield i
+                if limit >= 0 and cnt >= limit:
+                    return
+            return
+
+        def pages(first, _limit):
+            while first > 0:
+                yield first, _limit
+                first -= _limit + 1
+                if _limit > first:
+                    _limit = first
+
+        # The first page tells where the history ends
+        txs = self.steem.rpc.get_account_history(self.name, first, _limit)
+        results = [(_limit, txs)]
+        if txs and len(txs) >= _limit:
+            first = txs[0][0] - 1
+            requested, fetch = tee(pages(first, min(_limit, first)))
+            results = chain(results, zip(
+                (page[1] for page in requested),
+                self._history_pages(fetch, connections)))
+
+        for requested, txs in results:
             for i in txs[::-1]:
                 if exclude_ops and i[1]["op"][0] in exclude_ops:
                     continue
@@ -272,11 +478,6 @@ class Account(dict):
                     cnt += 1
                     yield i
                     if limit >= 0 and cnt >= limit:
-                        break
-            if limit >= 0 and cnt >= limit:
-                break
-            if len(txs) < _limit:
-                break
-            first = txs[0][0] - 1  # new first
-            if _limit > first:
-                _limit = first
+                        return
+            if len(txs) < requested:
+                return
@@ -11,6 +11,8 @@ class Block(dict):
         :param Steem steem_instance: Steem() instance to use when accesing a RPC
         :param bool lazy: Use lazy loading
 
+        If the Steem instance has a block ``archive``, the block is read
+        from there first.
     """
     def __init__(
         self,
@@ -29,9 +31,17 @@ class Block(dict):
             self.refresh()
 
     def refresh(self):
-        block = self.steem.rpc.get_block(self.block)
+        archive = self.steem.archive
+        block = None
+        if archive and isinstance(self.block, int):
+            block = archive.get(self.block)
         if not block:
-            raise BlockDoesNotExistsException
+            block = self.steem.rpc.get_block(self.block)
+            if not block:
+                raise BlockDoesNotExistsException
+            if (archive and isinstance(self.block, int) and
+                    self.block <= archive.irreversible):
+                archive.append(self.block, block)
         super(Block, self).__init__(block)
         self.cached = True
 
@@ -0,0 +1,155 @@
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+import logging
+
+from .storage import DataDir
+
+log = logging.getLogger(__name__)
+
+
+class BlockArchive(object):
+    """ Local append-only archive of irreversible blocks
+
+        :param str path: Directory to store the archive in (defaults to
+            ``blocks/`` in the piston data directory)
+        :param int segment_size: Number of blocks per segment file
+        :param int compresslevel: zlib compression level (0-9)
+
+        Blocks are stored as zlib compressed JSON records in segment
+        files (``segment-000042.dat`` holds the blocks
+        ``42 * segment_size`` to ``43 * segment_size - 1``). The file
+        ``index.dat`` holds one fixed-width ``(offset, length)`` entry per
+        block number and is memory mapped for lookups. A length of ``0``
+        marks a block that has not been archived yet.
+
+        Once an archive is attached to a ``Steem`` instance,
+        ``Blockchain.blocks()``, ``Blockchain.stream()`` and ``Block``
+        read from it before asking the node, and ``Blockchain.blocks()``
+        stores every irreversible block it fetches from the node:
+
+        .. code-block:: python
+
+            from piston import Steem
+            steem = Steem(archive=True)
+
+        Only one process should write to an archive at a time.
+    """
+
+    #: offset in the segment file, length of the compressed record
+    index_format = "<QI"
+    index_entry_size = struct.calcsize(index_format)
+
+    def __init__(self, path=None, segment_size=100000, compresslevel=6):
+        self.path = path or os.path.join(DataDir.data_dir, "blocks")
+        self.segment_size = segment_size
+        self.compresslevel = compresslevel
+
+        #: Highest block number known to be irreversible
+        self.irreversible = 0
+
+        if not os.path.isdir(self.path):
+            os.makedirs(self.path)
+
+        index_file = os.path.join(self.path, "index.dat")
+        if not os.path.exists(index_file):
+            open(index_file, "wb").close()
+        self._index = open(index_file, "r+b")
+        self._index_map = None
+        self._segments = {}
+        self._lock = threading.RLock()
+
+    def _segment(self, blocknum):
+        """ Returns the file object of the segment holding ``blocknum``
+        """
+        segment = blocknum // self.segment_size
+        if segment not in self._segments:
+            filename = os.path.join(
+                self.path, "segment-%06d.dat" % segment)
+            self._segments[segment] = open(filename, "a+b")
+        return self._segments[segment]
+
+    def _entry(self, blocknum):
+        """ Returns ``(offset, length)`` of ``blocknum`` from the index
+        """
+        position = blocknum * self.index_entry_size
+        end = position + self.index_entry_size
+        if not self._index_map or len(self._index_map) < end:
+            if not self._remap(end):
+                return 0, 0
+        return struct.unpack_from(self.index_format, self._index_map, position)
+
+    def _remap(self, end):
+        """ Map the index again if the file has grown to at least
+            ``end`` bytes since it was mapped. Returns ``False`` if it
+            has not.
+        """
+        size = os.fstat(self._index.fileno()).st_size
+        if size < end:
+            return False
+        if self._index_map:
+            self._index_map.close()
+        self._index_map = mmap.mmap(
+            self._index.fileno(), size, access=mmap.ACCESS_READ)
+        return True
+
+    def __contains__(self, blocknum):
+        with self._lock:
+            return self._entry(blocknum)[1] > 0
+
+    def get(self, blocknum):
+        """ Returns the archived block ``blocknum`` or ``None``
+
+            :param int blocknum: Block number
+        """
+        with self._lock:
+            offset, length = self._entry(blocknum)
+            if not length:
+                return None
+            segment = self._segment(blocknum)
+            segment.seek(offset)
+            record = segment.read(length)
+        return json.loads(zlib.decompress(record).decode("utf-8"))
+
+    def append(self, blocknum, block):
+        """ Store ``block`` as block number ``blocknum``. Blocks that are
+            archived already are not overwritten.
+
+            :param int blocknum: Block number
+            :param dict block: Block as returned by ``get_block``
+
+            Only irreversible blocks should be stored!
+        """
+        record = zlib.compress(
+            json.dumps(block, separators=(",", ":")).encode("utf-8"),
+            self.compresslevel)
+        with self._lock:
+            if blocknum in self:
+                return
+            segment = self._segment(blocknum)
+            segment.seek(0, os.SEEK_END)
+            offset = segment.tell()
+            segment.write(record)
+            segment.flush()
+
+            # The index entry is written last, so that an interrupted
+            # write leaves the block unarchived instead of broken
+            self._index.seek(blocknum * self.index_entry_size)
+            self._index.write(
+                struct.pack(self.index_format, offset, len(record)))
+            self._index.flush()
+
+    def close(self):
+        """ Close all files of the archive
+        """
+        with self._lock:
+            if self._index_map:
+                self._index_map.close()
+                self._index_map = None
+            for segment in self._segments.values():
+                segment.close()
+            self._segments = {}
+            self._index.close()
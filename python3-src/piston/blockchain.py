@@ -1,10 +1,21 @@
+import functools
+import logging
+import os
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from datetime import datetime, timedelta
+import threading
 
 from piston.instance import shared_steem_instance
+from pistonapi.steemnoderpc import SteemNodeRPC
 
 from .block import Block
+from .exceptions import BlockDoesNotExistsException
 from .utils import parse_time
 
+log = logging.getLogger(__name__)
+
 virtual_operations = [
     "fill_convert_request",
     "author_reward",
@@ -21,6 +32,286 @@ virtual_operations = [
 ]
 
 
+def op_filter(opNames=None, where=None, fields=None):
+    """ Compile a filter and projection for operations
+
+        :param list opNames: Only operations of these types
+        :param dict where: Only operations whose fields have one of the
+            given values, e.g. ``{"to": {"exchange"}}``. A value is
+            either a set (or list) of allowed values, a single allowed
+            value, or a function that is called with the value of the
+            field and tells if it matches.
+        :param list fields: Only keep these fields of the operations
+            (along with ``type``, ``timestamp`` and ``block_num``)
+        :returns: Function that is called with the type, the fields, the
+            timestamp and the block number of an operation and returns
+            the dict of the operation (as ``stream()`` yields them) or
+            ``None`` if it does not match
+
+        Allowed values are turned into sets once, so that every field
+        is checked with a single lookup. The dict of an operation is
+        only built once it matches.
+    """
+    names = frozenset(opNames) if opNames else None
+    conditions = []
+    for key, allowed in (where or {}).items():
+        if callable(allowed):
+            conditions.append((key, allowed))
+        else:
+            if isinstance(allowed, (str, bytes)) or not hasattr(
+                    allowed, "__iter__"):
+                allowed = [allowed]
+            conditions.append((key, frozenset(allowed).__contains__))
+    conditions = tuple(conditions)
+    fields = tuple(fields) if fields else None
+
+    def match(op_type, op, timestamp, block_num):
+        if names is not None and op_type not in names:
+            return None
+        for key, test in conditions:
+            try:
+                if not test(op.get(key)):
+                    return None
+            except TypeError:
+                # Unhashable values, such as the amounts of newer nodes,
+                # match no set
+                return None
+        r = {
+            "type": op_type,
+            "timestamp": timestamp,
+            "block_num": block_num
+        }
+        if fields is None:
+            r.update(op)
+        else:
+            for key in fields:
+                if key in op:
+                    r[key] = op[key]
+        return r
+
+    return match
+
+
+def block_ops(block, opNames=None, match=None):
+    """ Yield the operations of ``block`` as dicts the way ``stream()``
+        does
+
+        :param dict block: Block with ``block_num``
+        :param list opNames: Only operations of these types
+        :param match: Filter compiled with ``op_filter()`` to use in
+            place of ``opNames``
+    """
+    match = match or op_filter(opNames)
+    timestamp = block.get("timestamp")
+    block_num = block.get("block_num")
+    for tx in block.get("transactions"):
+        for op in tx["operations"]:
+            r = match(op[0], op[1], timestamp, block_num)
+            if r is not None:
+                yield r
+
+
+def virtual_op(op, match=None):
+    """ Turn an operation of ``get_ops_in_block`` into a dict the way
+        ``stream()`` does, or ``None`` if it does not ``match`` (see
+        ``op_filter()``)
+    """
+    return (match or op_filter())(
+        op["op"][0], op["op"][1], op.get("timestamp"), op.get("block"))
+
+
+def replay_blocks(rpc, archive, first, last, opNames=None,
+                  mapper=None, reducer=None, batch_size=100,
+                  where=None, fields=None):
+    """ Replay the blocks ``first`` to ``last`` for ``replay_sharded()``
+
+        :param SteemNodeRPC rpc: Connection to the node
+        :param BlockArchive archive: Archive to read blocks from first
+            (optional)
+        :param list opNames: Only operations of these types
+        :param mapper: Called with every operation, its result is kept
+            unless it is ``None``
+        :param reducer: Combines two results into one
+        :param int batch_size: Blocks to request per round trip
+        :param dict where: Field filter (see ``op_filter()``)
+        :param list fields: Fields to keep (see ``op_filter()``)
+        :returns: The list of results, or ``[result]`` reduced to one
+            (``[]`` if there is none) if ``reducer`` is given
+    """
+    virtual = bool(set(opNames or []).intersection(virtual_operations))
+    only_virtual = not set(opNames or []).difference(virtual_operations)
+    match = op_filter(opNames, where, fields)
+    results = []
+    for start in range(first, last + 1, batch_size):
+        blocknums = range(start, min(start + batch_size - 1, last) + 1)
+        if virtual:
+            replies = rpc.call_many([
+                ("get_ops_in_block", [blocknum, only_virtual])
+                for blocknum in blocknums])
+            ops = (
+                r for r in (
+                    virtual_op(op, match)
+                    for reply in replies for op in reply)
+                if r is not None)
+        else:
+            blocks = {}
+            if archive:
+                for blocknum in blocknums:
+                    block = archive.get(blocknum)
+                    if block:
+                        blocks[blocknum] = block
+            missing = [b for b in blocknums if b not in blocks]
+            if missing:
+                blocks.update(zip(missing, rpc.call_many(
+                    [("get_block", [blocknum]) for blocknum in missing])))
+            ops = []
+            for blocknum in blocknums:
+                block = blocks[blocknum]
+                if not block:
+                    raise BlockDoesNotExistsException(blocknum)
+                block.update({"block_num": blocknum})
+                ops.extend(block_ops(block, match=match))
+        if mapper:
+            ops = (r for r in map(mapper, ops) if r is not None)
+        results.extend(ops)
+        if reducer and len(results) > 1:
+            results = [functools.reduce(reducer, results)]
+    return results
+
+
+#: Connection and archive of a replay worker process
+_replay_worker = {}
+
+
+def _replay_shard(task):
+    """ Run ``replay_blocks()`` in a worker process of
+        ``replay_sharded()`` (internally used)
+    """
+    node, archive, args = task
+    if _replay_worker.get("pid") != os.getpid():
+        # Nothing inherited from the parent process is of use
+        _replay_worker.clear()
+        _replay_worker["pid"] = os.getpid()
+    if "node" not in _replay_worker or _replay_worker["node"] != node:
+        url, user, password, apis, num_retries = node
+        _replay_worker["node"] = node
+        _replay_worker["rpc"] = SteemNodeRPC(
+            url, user, password, apis=apis, num_retries=num_retries)
+    if "archive" not in _replay_worker or _replay_worker["archive"] != archive:
+        from .blockarchive import BlockArchive
+        _replay_worker["archive"] = archive
+        _replay_worker["archive_obj"] = (
+            BlockArchive(archive[0], segment_size=archive[1])
+            if archive else None)
+    return replay_blocks(
+        _replay_worker["rpc"], _replay_worker["archive_obj"], *args)
+
+
+class BlockPrefetcher(object):
+    """ Fetches blocks ahead of time and hands them out in order
+
+        :param Steem steem_instance: Steem() instance to use when accesing a RPC
+        :param int window: Maximum number of blocks requested ahead of
+            the one that is handed out
+        :param int workers: Number of connections fetching in parallel
+        :param list nodes: Nodes for the worker connections (defaults to
+            the node of ``steem_instance``). Workers are spread over the
+            nodes round robin.
+
+        The window is split into chunks of ``window / (workers + 1)``
+        blocks. Each chunk is requested with a single ``call_many()``
+        round trip by a background thread. While the blocks of one chunk
+        are handed out, the next chunks are already in flight. A single
+        worker uses the connection of ``steem_instance``, otherwise every
+        worker thread opens its own connection.
+
+        .. code-block:: python
+
+            prefetcher = BlockPrefetcher(steem, window=400, workers=4)
+            for blocknum, block in prefetcher.fetch(1, 100000):
+                print(blocknum, block["timestamp"])
+            prefetcher.close()
+    """
+    def __init__(self, steem_instance=None, window=100, workers=1, nodes=None):
+        self.steem = steem_instance or shared_steem_instance()
+        self.workers = max(1, int(workers))
+        self.window = max(1, int(window))
+        # The workers fetch one chunk each while one is handed out
+        self.chunk_size = max(1, self.window // (self.workers + 1))
+        self.nodes = nodes or [self.steem.rpc.url]
+        if isinstance(self.nodes, str):
+            self.nodes = [self.nodes]
+
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers)
+
+    def _rpc(self):
+        """ Connection of the current worker thread
+        """
+        if self.workers == 1:
+            return self.steem.rpc
+        rpc = getattr(self._local, "rpc", None)
+        if not rpc:
+            with self._lock:
+                node = self.nodes[len(self._connections) % len(self.nodes)]
+                rpc = SteemNodeRPC(
+                    node,
+                    self.steem.rpc.user,
+                    self.steem.rpc.password,
+                    apis=self.steem.rpc.apis,
+                    num_retries=self.steem.rpc.num_retries,
+                )
+                self._connections.append(rpc)
+            self._local.rpc = rpc
+        return rpc
+
+    def _fetch_chunk(self, first, last):
+        blocknums = list(range(first, last + 1))
+        blocks = self._rpc().call_many(
+            [("get_block", [blocknum]) for blocknum in blocknums]
+        )
+        return list(zip(blocknums, blocks))
+
+    def fetch(self, start, stop):
+        """ Yields ``(blocknum, block)`` for all blocks from ``start`` to
+            ``stop`` (inclusive) in order. ``block`` is ``None`` if the
+            node does not know the block (yet).
+        """
+        pending = deque()
+        first = start
+        try:
+            while first <= stop or pending:
+                while first <= stop and len(pending) < self.workers:
+                    last = min(first + self.chunk_size - 1, stop)
+                    pending.append(
+                        self._pool.submit(self._fetch_chunk, first, last))
+                    first = last + 1
+                chunk = pending.popleft().result()
+                # Request the next chunk before handing out this one
+                if first <= stop:
+                    last = min(first + self.chunk_size - 1, stop)
+                    pending.append(
+                        self._pool.submit(self._fetch_chunk, first, last))
+                    first = last + 1
+                yield from chunk
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def close(self):
+        """ Stop the workers and close their connections
+        """
+        self._pool.shutdown(wait=True)
+        for rpc in self._connections:
+            try:
+                rpc.ws.close()
+            except Exception:
+                pass
+        self._connections = []
+
+
 class Blockchain(object):
     """ This class allows to access the blockchain and read data
         from it
@@ -28,14 +319,27 @@ class Blockchain(object):
         :param Steem steem_instance: Steem() instance to use when accesing a RPC
         :param str mode: (default) Irreversible block
                 (``irreversible``) or actual head block (``head``)
+        :param bool subscribe: Let the node notify us about new blocks
+                instead of polling for them (defaults to ``False``)
+
+        When waiting for new blocks, ``blocks()``, ``ops()`` and
+        ``stream()`` sleep until the next block is due according to the
+        timestamp of the head block. With ``subscribe=True``, they
+        instead wake up as soon as the node sends a block applied
+        notice (see ``set_block_applied_callback``). If the node does
+        not allow the subscription, they fall back to polling.
 
     """
     def __init__(
         self,
         steem_instance=None,
-        mode="irreversible"
+        mode="irreversible",
+        subscribe=False
     ):
         self.steem = steem_instance or shared_steem_instance()
+        self.subscribe = subscribe
+        self._subscription = None
+        self._block_applied = threading.Event()
 
         if mode == "irreversible":
             self.mode = 'last_irreversible_block_num'
@@ -87,7 +391,7 @@ class Blockchain(object):
         """
         return int(Block(block_num, steem_instance=self.steem).time().timestamp())
 
-    def blocks(self, start=None, stop=None):
+    def blocks(self, start=None, stop=None, **kwargs):
         """ Yields blocks starting from ``start``.
 
             :param int start: Starting block
@@ -95,6 +399,21 @@ class Blockchain(object):
             :param str mode: We here have the choice between
                  * "head": the last block
                  * "irreversible": the block that is confirmed by 2/3 of all block producers and is thus irreversible!
+            :param int prefetch: Request up to this many blocks ahead
+                of the one being yielded (defaults to ``0``, one block
+                per round trip)
+            :param int workers: Number of connections that fetch blocks
+                in parallel when prefetching (defaults to ``1``)
+            :param list nodes: Nodes to open the worker connections to
+                (defaults to the node of the Steem instance)
+
+            Blocks are always yielded in order, prefetching only changes
+            how they are obtained from the node(s). See
+            ``BlockPrefetcher``.
+
+            If the Steem instance has a block ``archive``, blocks are
+            read from there first, and irreversible blocks obtained
+            from the node are added to it.
         """
         # Let's find out how often blocks are generated!
         block_interval = self.config().get("STEEMIT_BLOCK_INTERVAL")
@@ -102,35 +421,136 @@ class Blockchain(object):
         if not start:
             start = self.get_current_block_num()
 
-        # We are going to loop indefinitely
-        while True:
-            retry = False
-
-            # Get chain properies to identify the
-            head_block = self.get_current_block_num()
-
-            # Blocks from start until head block
-            for blocknum in range(start, head_block + 1):
-                # Get full block
-                block = self.steem.rpc.get_block(blocknum)
-                if not block:
-                    start = blocknum
-                    retry = True
+        archive = self.steem.archive
+        prefetcher = None
+        if kwargs.get("prefetch"):
+            prefetcher = BlockPrefetcher(
+                self.steem,
+                window=kwargs["prefetch"],
+                workers=kwargs.get("workers", 1),
+                nodes=kwargs.get("nodes"),
+            )
+
+        try:
+            # We are going to loop indefinitely
+            while True:
+                retry = False
+
+                # Get chain properies to identify the
+                props = self.info()
+                head_block = props.get(self.mode)
+                if archive:
+                    archive.irreversible = props.get(
+                        "last_irreversible_block_num")
+
+                # Blocks from start until head block
+                for blocknum, block in self._fetch_blocks(
+                        start, head_block, prefetcher):
+                    if not block:
+                        start = blocknum
+                        retry = True
+                        break
+                    block.update({"block_num": blocknum})
+                    yield block
+
+                if retry:
+                    continue
+
+                # Set new start
+                start = head_block + 1
+
+                if stop and start > stop:
                     break
-                block.update({"block_num": blocknum})
-                yield block
 
-            if retry:
-                continue
+                # Wait for the next block
+                self.wait_for_block(props, block_interval)
+        finally:
+            if prefetcher:
+                prefetcher.close()
+            self._unsubscribe()
+
+    def wait_for_block(self, props, block_interval=3):
+        """ Block until the block after the one in ``props`` is expected
+
+            :param dict props: Dynamic global properties obtained after
+                the last block has been processed
+            :param int block_interval: Block interval in seconds
+
+            With a subscription, this returns once the node notifies
+            about a new block (or after two block intervals at the
+            latest). Otherwise, it sleeps until the timestamp of the
+            next block has passed, but at least a tenth of a block
+            interval.
+        """
+        if self.subscribe and self._subscribe():
+            self._block_applied.wait(2 * block_interval)
+            self._block_applied.clear()
+            return
 
-            # Set new start
-            start = head_block + 1
+        next_block = (
+            parse_time(props["time"]) + timedelta(seconds=block_interval)
+        )
+        # Give the node a moment to receive the block
+        delay = (next_block - datetime.utcnow()).total_seconds() + 0.2
+        time.sleep(min(max(delay, block_interval / 10), block_interval))
 
-            if stop and start > stop:
-                break
+    def _subscribe(self):
+        """ Subscribe to block applied notices once. Returns ``False``
+            if the node does not allow it (internally used)
+        """
+        if self._subscription is not None:
+            return True
+        try:
+            self._subscription = self.steem.rpc.subscribe(
+                "set_block_applied_callback",
+                self._on_block_applied,
+                api="database"
+            )
+        except Exception as e:
+            log.warning(
+                "Node does not allow subscriptions (%s), polling instead"
+                % str(e))
+            self.subscribe = False
+            return False
+        return True
+
+    def _unsubscribe(self):
+        """ Cancel the subscription of ``_subscribe()``, so that the
+            connection leaves pipelined mode (internally used)
+        """
+        if self._subscription is None:
+            return
+        subscription, self._subscription = self._subscription, None
+        self.steem.rpc.unsubscribe(subscription)
+
+    def _on_block_applied(self, *args):
+        self._block_applied.set()
+
+    def _fetch_blocks(self, start, stop, prefetcher=None):
+        """ Yields ``(blocknum, block)`` from ``start`` to ``stop``,
+            from the archive as far as possible and from the node
+            afterwards (internally used)
+        """
+        archive = self.steem.archive
+        if archive:
+            while start <= stop:
+                block = archive.get(start)
+                if not block:
+                    break
+                yield start, block
+                start += 1
 
-            # Sleep for one block
-            time.sleep(block_interval)
+        if prefetcher:
+            fetched = prefetcher.fetch(start, stop)
+        else:
+            fetched = (
+                (blocknum, self.steem.rpc.get_block(blocknum))
+                for blocknum in range(start, stop + 1)
+            )
+        for blocknum, block in fetched:
+            if archive and block and blocknum <= archive.irreversible:
+                archive.append(blocknum, block)
+            yield blocknum, block
 
     def ops(self, start=None, stop=None, only_virtual_ops=False, **kwargs):
         """ Yields all operations (including virtual operations) starting from ``start``.
@@ -165,27 +585,32 @@ class Blockchain(object):
         if not start:
             start = self.get_current_block_num()
 
-        # We are going to loop indefinitely
-        while True:
+        try:
+            # We are going to loop indefinitely
+            while True:
 
-            # Get chain properies to identify the
-            head_block = self.get_current_block_num()
+                # Get chain properies to identify the
+                props = self.info()
+                head_block = props.get(self.mode)
 
-            # Blocks from start until head block
-            for blocknum in range(start, head_block + 1):
-                # Get full block
-                yield from self.steem.rpc.get_ops_in_block(blocknum, only_virtual_ops)
+                # Blocks from start until head block
+                for blocknum in range(start, head_block + 1):
+                    # Get full block
+                    yield from self.steem.rpc.get_ops_in_block(blocknum, only_virtual_ops)
 
-            # Set new start
-            start = head_block + 1
+                # Set new start
+                start = head_block + 1
 
-            if stop and start > stop:
-                break
+                if stop and start > stop:
+                    break
 
-            # Sleep for one block
-            time.sleep(block_interval)
+                # Wait for the next block
+                self.wait_for_block(props, block_interval)
+        finally:
+            self._unsubscribe()
 
-    def stream(self, opNames=[], *args, **kwargs):
+    def stream(self, opNames=[], *args, ops=None, where=None, fields=None,
+               **kwargs):
         """ Yield specific operations (e.g. comments) only
 
             :param array opNames: List of operations to filter for, e.g.
@@ -201,38 +626,43 @@ class Blockchain(object):
             :param str mode: We here have the choice between
                  * "head": the last block
                  * "irreversible": the block that is confirmed by 2/3 of all block producers and is thus irreversible!
+            :param array ops: Same as ``opNames``
+            :param dict where: Only yield operations whose fields have
+                certain values, e.g. ``{"to": {"exchange"}}`` (see
+                ``op_filter()``)
+            :param array fields: Only keep these fields of the
+                operations
 
             The dict output is formated such that ``type`` caries the
             operation type, timestamp and block_num are taken from the
             block the operation was stored in and the other key depend
             on the actualy operation.
+
+            The filter is compiled once and applied before the dict of
+            an operation is built:
+
+            .. code-block:: python
+
+                for transfer in Blockchain().stream(
+                        ops=["transfer"], where={"to": {"exchange"}},
+                        fields=["from", "amount"]):
+                    print(transfer)
         """
+        if ops is not None:
+            opNames = ops
         if isinstance(opNames, str):
             opNames = [opNames]
+        match = op_filter(opNames, where, fields)
         if not bool(set(opNames).intersection(virtual_operations)):
             # uses get_block instead of get_ops_in_block
             for block in self.blocks(*args, **kwargs):
-                for tx in block.get("transactions"):
-                    for op in tx["operations"]:
-                        if not opNames or op[0] in opNames:
-                            r = {
-                                "type": op[0],
-                                "timestamp": block.get("timestamp"),
-                                "block_num": block.get("block_num")
-                            }
-                            r.update(op[1])
-                            yield r
+                yield from block_ops(block, match=match)
         else:
             # uses get_ops_in_block
             kwargs["only_virtual_ops"] = not bool(set(opNames).difference(virtual_operations))
             for op in self.ops(*args, **kwargs):
-                if not opNames or op["op"][0] in opNames:
-                    r = {
-                        "type": op["op"][0],
-                        "timestamp": op.get("timestamp"),
-                        "block_num": op.get("block")
-                    }
-                    r.update(op["op"][1])
+                r = virtual_op(op, match)
+                if r is not None:
                     yield r
 
     def replay(self, start_block=1, end_block=None, filter_by=list(), **kwargs):
@@ -246,6 +676,130 @@ class Blockchain(object):
             **kwargs
         )
 
+    def replay_sharded(
+        self, start_block=1, end_block=None, filter_by=list(),
+        processes=None, shard_size=10000, ordered=True,
+        mapper=None, reducer=None, initial=None, batch_size=100,
+        where=None, fields=None
+    ):
+        """ Replay a range of blocks split into shards that are replayed
+            by a pool of worker processes
+
+            :param int start_block: First block
+            :param int end_block: Last block (defaults to the current
+                block of the ``mode``)
+            :param array filter_by: Operation types as for ``stream()``
+            :param int processes: Number of worker processes (defaults
+                to the number of CPUs, ``1`` replays in this process)
+            :param int shard_size: Number of blocks per shard
+            :param bool ordered: Yield the results in block order.
+                Otherwise, every shard is handed out as soon as it is
+                done, which suits aggregations.
+            :param mapper: Called with every operation (as ``stream()``
+                yields them) in the worker. Its result is used in place
+                of the operation unless it is ``None``, in which case
+                the operation is dropped.
+            :param reducer: Combines two results into one. With a
+                ``reducer``, the results of every shard are reduced in
+                the worker, the results of the shards in this process,
+                and the result is returned instead of a generator.
+            :param initial: Result to start reducing with, and returned
+                if there is none
+            :param int batch_size: Blocks requested per round trip
+            :param dict where: Field filter as for ``stream()``
+            :param array fields: Fields to keep as for ``stream()``
+
+            Every worker opens its own connection to the node and reads
+            from the block ``archive`` of the Steem instance as far as
+            possible. Decoding blocks and building, filtering and
+            mapping operations happens in the workers. ``mapper`` and
+            ``reducer`` thus have to be picklable, i.e. functions
+            defined at the top level of a module. The ``reducer`` has to
+            be associative, and commutative if not ``ordered``.
+
+            .. code-block:: python
+
+                from collections import Counter
+                from operator import add
+
+                def count(op):
+                    return Counter({op["author"]: 1})
+
+                votes = Blockchain().replay_sharded(
+                    1, 10000000, filter_by=["vote"],
+                    mapper=count, reducer=add)
+        """
+        if isinstance(filter_by, str):
+            filter_by = [filter_by]
+        if not end_block:
+            end_block = self.get_current_block_num()
+        processes = processes or os.cpu_count() or 1
+        args = (filter_by, mapper, reducer, batch_size, where, fields)
+        shards = (
+            (first, min(first + shard_size - 1, end_block))
+            for first in range(start_block, end_block + 1, shard_size)
+        )
+
+        if processes == 1:
+            archive = self.steem.archive
+            results = (
+                replay_blocks(self.steem.rpc, archive, first, last, *args)
+                for first, last in shards
+            )
+        else:
+            rpc = self.steem.rpc
+            node = (rpc.url, rpc.user, rpc.password, rpc.apis,
+                    rpc.num_retries)
+            archive = self.steem.archive
+            if archive:
+                archive = (archive.path, archive.segment_size)
+            tasks = (
+                (node, archive, (first, last) + args)
+                for first, last in shards
+            )
+            results = self._replay_pool(tasks, processes, ordered)
+
+        if reducer:
+            results = [r for shard in results for r in shard]
+            if initial is not None:
+                results.insert(0, initial)
+            if not results:
+                return initial
+            return functools.reduce(reducer, results)
+        return (r for shard in results for r in shard)
+
+    def _replay_pool(self, tasks, processes, ordered):
+        """ Run the shard ``tasks`` in a pool of ``processes`` and yield
+            their results, in order or as they are done (internally
+            used)
+        """
+        from concurrent.futures import ProcessPoolExecutor
+
+        tasks = iter(tasks)
+        pending = deque()
+        with ProcessPoolExecutor(processes) as pool:
+            try:
+                while len(pending) < 2 * processes:
+                    task = next(tasks, None)
+                    if task is None:
+                        break
+                    pending.append(pool.submit(_replay_shard, task))
+                while pending:
+                    if ordered:
+                        done = [pending.popleft()]
+                    else:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            pending.remove(future)
+                    for future in done:
+                        task = next(tasks, None)
+                        if task is not None:
+                            pending.append(pool.submit(_replay_shard, task))
+                        yield future.result()
+            finally:
+                for future in pending:
+                    future.cancel()
+
     def get_block_from_time(self, timestring, error_margin=10):
         """ Estimate block number from given time
 
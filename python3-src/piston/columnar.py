@@ -0,0 +1,500 @@
+import array
+import calendar
+import glob
+import json
+import os
+import re
+import time
+import logging
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+except ImportError:
+    pyarrow = None
+
+log = logging.getLogger(__name__)
+
+#: Amounts as the blockchain writes them, e.g. ``1.000 STEEM``
+amount_pattern = re.compile(r"(-?\d+)(?:\.(\d+))? ([A-Z][A-Z0-9]*)")
+
+#: Timestamps as the blockchain writes them, e.g. ``2016-08-01T12:00:00``
+timestamp_pattern = re.compile(r"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d")
+
+#: Name of the npz entry and the Arrow schema metadata with the number
+#: of rows and the kinds of the columns
+schema_key = "_schema"
+
+
+def _require(arrow=False):
+    if numpy is None:
+        raise ImportError("Missing dependency: numpy")
+    if arrow and pyarrow is None:
+        raise ImportError("Missing dependency: pyarrow")
+
+
+def kind_of(value):
+    """ Kind of the column to store ``value`` in: ``int``, ``float``,
+        ``amount``, ``time`` or ``str`` (dictionary encoded, used for
+        everything else, too)
+    """
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, str):
+        if amount_pattern.fullmatch(value):
+            return "amount"
+        if timestamp_pattern.fullmatch(value):
+            return "time"
+    return "str"
+
+
+class Column(object):
+    """ Typed buffer of one field of an operation type (internally used)
+
+        :param str kind: See ``kind_of()``
+
+        Numbers and timestamps (seconds since epoch) go to an ``int64``
+        or ``float64`` buffer along with a validity flag. Amounts go to
+        an ``int64`` buffer of units (``1.000 STEEM`` is ``1000`` at
+        precision ``3``) along with the precision and the code of the
+        asset. Strings, and values of any other type as JSON, are
+        dictionary encoded, i.e. stored as ``int32`` codes into a list
+        of the distinct values. Missing values have the code ``-1``.
+    """
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.values = array.array("d" if kind == "float" else "q")
+        self.valid = bytearray()
+        self.precision = array.array("b")
+        self.codes = array.array("i")
+        self.dictionary = {}
+        self._last_time = None
+        self._last_seconds = None
+
+    def encode(self, value):
+        """ Dictionary code of ``value``
+        """
+        if not isinstance(value, str):
+            value = json.dumps(value, sort_keys=True, separators=(",", ":"))
+        code = self.dictionary.get(value)
+        if code is None:
+            code = self.dictionary[value] = len(self.dictionary)
+        return code
+
+    def append(self, value):
+        if value is None:
+            self.append_missing()
+            return
+        try:
+            if self.kind == "str":
+                self.codes.append(self.encode(value))
+            elif self.kind == "amount":
+                units, decimals, asset = amount_pattern.fullmatch(
+                    value).groups()
+                decimals = decimals or ""
+                self.values.append(int(units + decimals))
+                self.precision.append(len(decimals))
+                self.codes.append(self.encode(asset))
+            elif self.kind == "time":
+                # The operations of a block share their timestamp
+                if value != self._last_time:
+                    if not timestamp_pattern.fullmatch(value):
+                        raise ValueError(value)
+                    self._last_time = value
+                    self._last_seconds = calendar.timegm((
+                        int(value[0:4]), int(value[5:7]), int(value[8:10]),
+                        int(value[11:13]), int(value[14:16]),
+                        int(value[17:19])))
+                self.values.append(self._last_seconds)
+                self.valid.append(1)
+            else:
+                if isinstance(value, (str, bytes)):
+                    raise TypeError(value)
+                self.values.append(value)
+                self.valid.append(1)
+        except (AttributeError, TypeError, ValueError, OverflowError):
+            # The value does not fit, so the column falls back to strings
+            log.debug("Storing %s column as strings" % self.kind)
+            self.to_str()
+            self.codes.append(self.encode(value))
+
+    def append_missing(self, count=1):
+        for _ in range(count):
+            if self.kind in ("str", "amount"):
+                self.codes.append(-1)
+            if self.kind != "str":
+                self.values.append(0)
+                self.valid.append(0)
+            if self.kind == "amount":
+                self.precision.append(0)
+
+    def decoded(self):
+        """ Yield the buffered values as they were added
+        """
+        if self.kind == "str":
+            strings = list(self.dictionary)
+            for code in self.codes:
+                yield None if code < 0 else strings[code]
+        elif self.kind == "amount":
+            assets = list(self.dictionary)
+            for units, precision, code in zip(
+                    self.values, self.precision, self.codes):
+                if code < 0:
+                    yield None
+                    continue
+                sign = "-" if units < 0 else ""
+                digits = str(abs(units)).rjust(precision + 1, "0")
+                if precision:
+                    digits = digits[:-precision] + "." + digits[-precision:]
+                yield "%s%s %s" % (sign, digits, assets[code])
+        else:
+            for value, valid in zip(self.values, self.valid):
+                if not valid:
+                    yield None
+                elif self.kind == "time":
+                    yield time.strftime(
+                        "%Y-%m-%dT%H:%M:%S", time.gmtime(value))
+                else:
+                    yield value
+
+    def to_str(self):
+        """ Turn this column into a dictionary encoded one
+        """
+        values = list(self.decoded())
+        self.__init__("str")
+        for value in values:
+            self.append(value)
+
+    def arrays(self, name):
+        """ Returns the ``numpy`` arrays of the column as a dict, see
+            ``ColumnarSink``
+        """
+        r = {}
+        if self.kind == "str":
+            r[name] = numpy.frombuffer(self.codes, dtype=numpy.int32)
+            r.update(_pack_strings(name + ".dict", self.dictionary))
+        elif self.kind == "amount":
+            r[name] = numpy.frombuffer(self.values, dtype=numpy.int64)
+            r[name + ".precision"] = numpy.frombuffer(
+                self.precision, dtype=numpy.int8)
+            r[name + ".asset"] = numpy.frombuffer(
+                self.codes, dtype=numpy.int32)
+            r.update(_pack_strings(name + ".asset.dict", self.dictionary))
+        else:
+            r[name] = numpy.frombuffer(
+                self.values,
+                dtype=numpy.float64 if self.kind == "float" else numpy.int64)
+            if not all(self.valid):
+                r[name + ".valid"] = numpy.frombuffer(
+                    bytes(self.valid), dtype=numpy.bool_)
+        return r
+
+
+def _pack_strings(name, strings):
+    """ Pack ``strings`` into one UTF-8 buffer and offsets, which, unlike
+        a numpy string array, costs no more than the strings themselves
+    """
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = numpy.zeros(len(encoded) + 1, dtype=numpy.int64)
+    numpy.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return {
+        name: numpy.frombuffer(b"".join(encoded), dtype=numpy.uint8),
+        name + ".offsets": offsets,
+    }
+
+
+def _unpack_strings(data, offsets):
+    data = data.tobytes()
+    return [
+        data[offsets[i]:offsets[i + 1]].decode("utf-8")
+        for i in range(len(offsets) - 1)
+    ]
+
+
+class Table(object):
+    """ Buffered operations of one type (internally used)
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.columns = {}
+
+    def add(self, op):
+        columns = self.columns
+        for key, column in columns.items():
+            column.append(op.get(key))
+        for key in op:
+            if key not in columns and key != "type":
+                # New field, which the earlier operations lack
+                column = columns[key] = Column(kind_of(op[key]))
+                column.append_missing(self.rows)
+                column.append(op[key])
+        self.rows += 1
+
+
+class ColumnarSink(object):
+    """ Collects operations, e.g. of ``Blockchain.stream()`` or
+        ``Account.history()``, into typed columns per operation type and
+        writes them to files
+
+        :param str path: Directory to write the files to
+        :param str format: ``npz`` (NumPy) or ``arrow`` (Arrow IPC)
+        :param int flush_rows: Write the operations of a type to a new
+            file once that many are buffered
+
+        Every flush writes a file ``<type>-<number>.npz`` (or
+        ``.arrow``) with one column per field:
+
+        * numbers as ``int64`` or ``float64``,
+        * timestamps as ``int64`` seconds since epoch (``timestamp[s]``
+          in Arrow),
+        * amounts as ``int64`` units plus an ``int8`` precision and the
+          asset (``<field>.precision``, ``<field>.asset``),
+        * strings, i.e. account names, permlinks and so on, dictionary
+          encoded as ``int32`` codes (``-1`` if missing) into the
+          distinct values. Other values are stored as JSON strings.
+
+        In npz files, dictionaries are stored as UTF-8 data with offsets
+        (``<field>.dict``, ``<field>.dict.offsets``) and missing numbers
+        are flagged in ``<field>.valid``. ``load()`` reads all files of
+        a type back into one set of arrays.
+
+        .. code-block:: python
+
+            from piston.blockchain import Blockchain
+            from piston.columnar import ColumnarSink, load
+
+            with ColumnarSink("votes") as sink:
+                sink.extend(Blockchain().stream(
+                    ops=["vote"], start=10000000, stop=10864000))
+            votes = load("votes", "vote")
+            print(votes["weight"].mean())
+
+        Requires ``numpy``, and ``pyarrow`` for the Arrow format.
+    """
+
+    def __init__(self, path, format="npz", flush_rows=100000):
+        if format not in ("npz", "arrow"):
+            raise ValueError("invalid value for 'format'!")
+        _require(format == "arrow")
+        self.path = path
+        self.format = format
+        self.flush_rows = flush_rows
+        self.tables = {}
+        self._numbers = {}
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def add(self, op):
+        """ Add one operation (a dict with ``type``)
+        """
+        op_type = op["type"]
+        table = self.tables.get(op_type)
+        if table is None:
+            table = self.tables[op_type] = Table()
+        table.add(op)
+        if table.rows >= self.flush_rows:
+            self.flush(op_type)
+
+    def extend(self, ops):
+        """ Add all operations of ``ops``
+        """
+        for op in ops:
+            self.add(op)
+
+    def _filename(self, op_type):
+        """ Name of the next file of ``op_type``, after the ones written
+            before, also by earlier sinks
+        """
+        if op_type not in self._numbers:
+            existing = glob.glob(os.path.join(
+                glob.escape(self.path),
+                "%s-*.%s" % (glob.escape(op_type), self.format)))
+            numbers = [
+                int(f.rsplit("-", 1)[1].split(".")[0]) for f in existing]
+            self._numbers[op_type] = max(numbers, default=-1)
+        self._numbers[op_type] += 1
+        return os.path.join(self.path, "%s-%06d.%s" % (
+            op_type, self._numbers[op_type], self.format))
+
+    def flush(self, op_type=None):
+        """ Write the buffered operations of ``op_type`` (defaults to all
+            types) to files
+        """
+        types = [op_type] if op_type else list(self.tables)
+        for op_type in types:
+            table = self.tables.pop(op_type, None)
+            if not table or not table.rows:
+                continue
+            filename = self._filename(op_type)
+            schema = json.dumps({
+                "rows": table.rows,
+                "kinds": {n: c.kind for n, c in table.columns.items()},
+            })
+            if self.format == "npz":
+                arrays = {}
+                for name, column in table.columns.items():
+                    arrays.update(column.arrays(name))
+                arrays[schema_key] = numpy.array(schema)
+                with open(filename, "wb") as f:
+                    numpy.savez(f, **arrays)
+            else:
+                columns = {}
+                for name, column in table.columns.items():
+                    columns.update(_arrow_columns(name, column))
+                t = pyarrow.table(columns).replace_schema_metadata(
+                    {schema_key: schema})
+                with pyarrow.OSFile(filename, "wb") as sink:
+                    with pyarrow.ipc.new_file(sink, t.schema) as writer:
+                        writer.write_table(t)
+            log.debug("Wrote %d %s operations to %s" % (
+                table.rows, op_type, filename))
+
+    def close(self):
+        """ Write all buffered operations
+        """
+        self.flush()
+
+
+def _arrow_columns(name, column):
+    """ Arrow arrays of ``column`` (internally used)
+    """
+    arrays = column.arrays(name)
+    r = {}
+    if column.kind in ("str", "amount"):
+        key = name if column.kind == "str" else name + ".asset"
+        codes = arrays[key]
+        dictionary = pyarrow.array(
+            list(column.dictionary), type=pyarrow.string())
+        indices = pyarrow.array(codes, mask=codes < 0, type=pyarrow.int32())
+        r[key] = pyarrow.DictionaryArray.from_arrays(indices, dictionary)
+        if column.kind == "amount":
+            missing = codes < 0
+            r[name] = pyarrow.array(arrays[name], mask=missing)
+            r[name + ".precision"] = pyarrow.array(
+                arrays[name + ".precision"], mask=missing)
+            r = {n: r[n] for n in (name, name + ".precision", key)}
+    else:
+        valid = arrays.get(name + ".valid")
+        mask = None if valid is None else ~valid
+        if column.kind == "time":
+            r[name] = pyarrow.array(
+                arrays[name], mask=mask,
+                type=pyarrow.timestamp("s", tz="UTC"))
+        else:
+            r[name] = pyarrow.array(arrays[name], mask=mask)
+    return r
+
+
+def load(path, op_type, format="npz"):
+    """ Read all files of ``op_type`` written by ``ColumnarSink``
+
+        :param str path: Directory of the files
+        :param str op_type: Operation type
+        :param str format: ``npz`` or ``arrow``
+        :returns: A ``pyarrow.Table`` for ``arrow``. For ``npz``, a dict
+            of ``numpy`` arrays laid out as in the files, where the
+            codes of the dictionary encoded columns refer to one merged
+            dictionary, ``<field>.dict`` (or ``<field>.asset.dict``), a
+            list of strings.
+        :raises ValueError: if the files store a field in columns of
+            different kinds
+    """
+    _require(format == "arrow")
+    files = sorted(glob.glob(os.path.join(
+        glob.escape(path), "%s-*.%s" % (glob.escape(op_type), format))))
+    if format == "arrow":
+        tables = [pyarrow.ipc.open_file(f).read_all() for f in files]
+        if not tables:
+            return None
+        try:
+            table = pyarrow.concat_tables(tables, promote_options="default")
+        except TypeError:
+            table = pyarrow.concat_tables(tables, promote=True)
+        return table.unify_dictionaries()
+
+    parts = []
+    kinds = {}
+    for f in files:
+        with numpy.load(f) as data:
+            part = {k: data[k] for k in data.files}
+        schema = json.loads(str(part.pop(schema_key)))
+        for name, kind in schema["kinds"].items():
+            if kinds.setdefault(name, kind) != kind:
+                raise ValueError(
+                    "Column %s is %s in one file and %s in another" % (
+                        name, kinds[name], kind))
+        parts.append((schema, part))
+
+    r = {}
+    for name, kind in kinds.items():
+        pieces = {}
+        dictionary = {}
+        key = name if kind == "str" else name + ".asset"
+        for schema, part in parts:
+            rows = schema["rows"]
+            if name not in schema["kinds"]:
+                # None of the operations of this file has the field
+                part = _missing(name, kind, rows)
+            elif kind in ("int", "float", "time"):
+                part.setdefault(
+                    name + ".valid", numpy.ones(rows, dtype=numpy.bool_))
+            if kind in ("str", "amount") and key + ".dict" in part:
+                strings = _unpack_strings(
+                    part[key + ".dict"], part[key + ".dict.offsets"])
+                # The code -1 picks the trailing -1
+                remap = numpy.array(
+                    [dictionary.setdefault(s, len(dictionary))
+                     for s in strings] + [-1], dtype=numpy.int32)
+                part[key] = remap[part[key]]
+            for n in _column_arrays(name, kind):
+                pieces.setdefault(n, []).append(part[n])
+        for n, p in pieces.items():
+            r[n] = numpy.concatenate(p)
+        if kind in ("str", "amount"):
+            r[key + ".dict"] = list(dictionary)
+        if name + ".valid" in r and r[name + ".valid"].all():
+            del r[name + ".valid"]
+    return r
+
+
+def _column_arrays(name, kind):
+    """ Names of the arrays of a column (internally used)
+    """
+    if kind == "str":
+        return [name]
+    if kind == "amount":
+        return [name, name + ".precision", name + ".asset"]
+    return [name, name + ".valid"]
+
+
+def _missing(name, kind, rows):
+    """ Arrays of a column without values (internally used)
+    """
+    if kind == "str":
+        return {name: numpy.full(rows, -1, dtype=numpy.int32)}
+    if kind == "amount":
+        return {
+            name: numpy.zeros(rows, dtype=numpy.int64),
+            name + ".precision": numpy.zeros(rows, dtype=numpy.int8),
+            name + ".asset": numpy.full(rows, -1, dtype=numpy.int32),
+        }
+    return {
+        name: numpy.zeros(rows, dtype=numpy.float64
+                          if kind == "float" else numpy.int64),
+        name + ".valid": numpy.zeros(rows, dtype=numpy.bool_),
+    }
@@ -0,0 +1,336 @@
+import calendar
+import datetime
+import heapq
+import json
+import os
+import sqlite3
+import threading
+import time
+import logging
+
+from .storage import DataDir
+
+log = logging.getLogger(__name__)
+
+
+def timestamp(t):
+    """ Seconds since epoch of a time of the blockchain
+
+        :param str,datetime,int t: Timestamp as used by the blockchain
+            (``2016-08-01T12:00:00``), ``datetime`` (UTC unless it has
+            a time zone) or seconds since epoch
+    """
+    if isinstance(t, str):
+        return calendar.timegm(time.strptime(t, "%Y-%m-%dT%H:%M:%S"))
+    if isinstance(t, datetime.datetime):
+        if t.tzinfo is not None:
+            return int(t.timestamp())
+        return calendar.timegm(t.timetuple())
+    return int(t)
+
+
+class AccountHistoryStore(object):
+    """ Local store of the histories of accounts
+
+        :param str path: SQLite database file (defaults to
+            ``history.sqlite`` in the piston data directory)
+        :param int page_size: Number of entries to request per page
+            when syncing
+        :param int time_step: Distance of the entries in the sparse
+            timestamp index
+
+        Every entry of an account history is stored as returned by
+        ``get_account_history``, keyed by account and index. Queries
+        for operation types go through an index on ``(account, type,
+        index)``, i.e. a posting list of every type. Since the
+        timestamps grow with the index, a sparse index holds the
+        timestamp of every ``time_step``-th entry only, which is enough
+        to narrow a time range down to a range of indices.
+
+        ``sync()`` only downloads the entries that are newer than the
+        last stored one, and only stores entries of irreversible blocks.
+        A sync that is interrupted resumes where it stopped.
+
+        Once a store is attached to a ``Steem`` instance,
+        ``Account.rawhistory()``, ``Account.history()`` and everything
+        built on them sync the account and read from the store. Only the
+        entries of reversible blocks are requested from the node:
+
+        .. code-block:: python
+
+            from piston import Steem
+            from piston.account import Account
+            steem = Steem(history_store=True)
+            for op in Account("xeroc", steem_instance=steem).history(
+                    filter_by="curation_reward"):
+                print(op)
+    """
+
+    def __init__(self, path=None, page_size=1000, time_step=100):
+        self.path = path or os.path.join(DataDir.data_dir, "history.sqlite")
+        self.page_size = page_size
+        self.time_step = time_step
+        self._connection = None
+        self._connection_pid = None
+        self._lock = threading.RLock()
+
+    def connection(self):
+        """ Returns the connection to the database of this process
+        """
+        with self._lock:
+            if (self._connection is None or
+                    self._connection_pid != os.getpid()):
+                directory = os.path.dirname(self.path)
+                if directory and not os.path.isdir(directory):
+                    os.makedirs(directory)
+                connection = sqlite3.connect(
+                    self.path, check_same_thread=False)
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute("PRAGMA synchronous=NORMAL")
+                self.create_tables(connection)
+                self._connection = connection
+                self._connection_pid = os.getpid()
+            return self._connection
+
+    def create_tables(self, connection):
+        """ Create the tables if the database is brand new
+        """
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            "account TEXT NOT NULL,"
+            "idx INTEGER NOT NULL,"
+            "type TEXT NOT NULL,"
+            "timestamp INTEGER NOT NULL,"
+            "entry TEXT NOT NULL,"
+            "PRIMARY KEY (account, idx)"
+            ") WITHOUT ROWID")
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS history_type "
+            "ON history (account, type, idx)")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS history_time ("
+            "account TEXT NOT NULL,"
+            "idx INTEGER NOT NULL,"
+            "timestamp INTEGER NOT NULL,"
+            "PRIMARY KEY (account, idx)"
+            ") WITHOUT ROWID")
+        connection.execute(
+            "CREATE INDEX IF NOT EXISTS history_time_timestamp "
+            "ON history_time (account, timestamp)")
+        connection.commit()
+
+    def execute(self, query, args=()):
+        """ Run a query and return all rows
+        """
+        with self._lock:
+            return self.connection().execute(query, args).fetchall()
+
+    def last_index(self, account):
+        """ Index of the latest stored entry of ``account`` or ``-1``
+
+            :param str account: Name of the account
+        """
+        row = self.execute(
+            "SELECT max(idx) FROM history WHERE account=?", (account,))
+        return -1 if row[0][0] is None else row[0][0]
+
+    def count(self, account):
+        """ Number of stored entries of ``account``
+        """
+        return self.execute(
+            "SELECT count(*) FROM history WHERE account=?", (account,))[0][0]
+
+    def add(self, account, entries):
+        """ Store ``entries`` (``[index, entry]`` pairs as returned by
+            ``get_account_history``) of ``account``
+        """
+        rows = [
+            (account, index, entry["op"][0], timestamp(entry["timestamp"]),
+             json.dumps(entry, separators=(",", ":")))
+            for index, entry in entries
+        ]
+        with self._lock:
+            connection = self.connection()
+            with connection:
+                connection.executemany(
+                    "INSERT OR REPLACE INTO history "
+                    "(account, idx, type, timestamp, entry) "
+                    "VALUES (?, ?, ?, ?, ?)", rows)
+                connection.executemany(
+                    "INSERT OR REPLACE INTO history_time "
+                    "(account, idx, timestamp) VALUES (?, ?, ?)",
+                    [r[:2] + r[3:4] for r in rows
+                     if r[1] % self.time_step == 0])
+
+    def sync(self, rpc, account, connections=1):
+        """ Download and store the new irreversible entries of
+            ``account``
+
+            :param SteemNodeRPC rpc: Connection to the node
+            :param str account: Name of the account
+            :param int connections: Number of connections to download on
+                (see ``Account.rawhistory()``)
+            :returns: Index of the latest entry on the node or ``-1``
+        """
+        from .account import history_pages
+
+        try:
+            head = rpc.get_account_history(account, -1, 0)[0][0]
+        except IndexError:
+            return -1
+        last = self.last_index(account)
+        if last >= head:
+            return head
+        irreversible = rpc.get_dynamic_global_properties()[
+            "last_irreversible_block_num"]
+
+        size = self.page_size
+        pages = (
+            (min(i + size - 1, head), min(size - 1, head - i))
+            for i in range(last + 1, head + 1, size)
+        )
+        reversible = False
+        for page in history_pages(rpc, account, pages, connections):
+            entries = []
+            for entry in page:
+                if entry[0] <= last:
+                    continue
+                if entry[1]["block"] > irreversible:
+                    reversible = True
+                    break
+                entries.append(entry)
+            if entries:
+                # One transaction per page, so that an interrupted sync
+                # resumes after the last stored page
+                self.add(account, entries)
+                last = entries[-1][0]
+            if reversible:
+                break
+        log.debug("Synced %s up to %d of %d" % (account, last, head))
+        return head
+
+    def index_range(self, account, start=None, end=None):
+        """ Range of indices that holds the entries of ``account`` from
+            ``start`` to ``end`` (seconds since epoch), as found in the
+            sparse timestamp index. The range may hold a few entries
+            more, but not less.
+
+            :param str account: Name of the account
+            :param int start: Earliest time
+            :param int end: Latest time
+            :returns: ``(first, last)``, where ``last`` is ``None`` if
+                the range is open
+        """
+        first, last = 0, None
+        if start is not None:
+            row = self.execute(
+                "SELECT max(idx) FROM history_time "
+                "WHERE account=? AND timestamp<?", (account, start))
+            if row[0][0] is not None:
+                first = row[0][0]
+        if end is not None:
+            row = self.execute(
+                "SELECT min(idx) FROM history_time "
+                "WHERE account=? AND timestamp>?", (account, end))
+            if row[0][0] is not None:
+                last = row[0][0]
+        return first, last
+
+    def entries(self, account, first=None, last=None,
+                types=None, exclude=None, reverse=False,
+                start=None, end=None):
+        """ Yield the stored ``[index, entry]`` pairs of ``account``
+
+            :param str account: Name of the account
+            :param int first: Lowest index
+            :param int last: Highest index
+            :param list types: Only these operation types
+            :param list exclude: Skip these operation types
+            :param bool reverse: Latest entry first
+            :param start: Earliest time (see ``timestamp()``)
+            :param end: Latest time (see ``timestamp()``)
+        """
+        if start is not None or end is not None:
+            start = None if start is None else timestamp(start)
+            end = None if end is None else timestamp(end)
+            low, high = self.index_range(account, start, end)
+            first = low if first is None else max(first, low)
+            if high is not None:
+                last = high if last is None else min(last, high)
+        first = -1 if first is None else first
+        last = 2 ** 62 if last is None else last
+
+        if not types:
+            yield from self._entries(
+                account, first, last, None, exclude, reverse, start, end)
+        elif len(types) == 1:
+            yield from self._entries(
+                account, first, last, types[0], exclude, reverse, start, end)
+        else:
+            # Merge the posting lists of the types, so that every one of
+            # them is read in order off the index
+            yield from heapq.merge(*[
+                self._entries(
+                    account, first, last, t, exclude, reverse, start, end)
+                for t in set(types)
+            ], key=lambda e: e[0], reverse=reverse)
+
+    def _entries(self, account, first, last, type, exclude, reverse,
+                 start, end):
+        """ Yield the stored ``[index, entry]`` pairs of ``account`` from
+            ``first`` to ``last`` of one or all types (internally used)
+        """
+        if type is None:
+            query = "SELECT idx, entry FROM history WHERE account=?"
+            args = [account]
+        else:
+            query = ("SELECT idx, entry FROM history INDEXED BY history_type "
+                     "WHERE account=? AND type=?")
+            args = [account, type]
+        if start is not None:
+            query += " AND timestamp>=?"
+            args.append(start)
+        if end is not None:
+            query += " AND timestamp<=?"
+            args.append(end)
+        if exclude:
+            query += " AND type NOT IN (%s)" % ",".join("?" * len(exclude))
+            args.extend(exclude)
+        query += " AND idx>=? AND idx<=? ORDER BY idx %s LIMIT ?" % (
+            "DESC" if reverse else "ASC")
+
+        # Read in chunks, so that a slow consumer does not hold the lock
+        # and an abandoned generator does not keep a cursor open
+        chunk = 1000
+        while first <= last:
+            rows = self.execute(query, args + [first, last, chunk])
+            for index, entry in rows:
+                yield [index, json.loads(entry)]
+            if len(rows) < chunk:
+                return
+            if reverse:
+                last = rows[-1][0] - 1
+            else:
+                first = rows[-1][0] + 1
+
+    def clear(self, account):
+        """ Drop the stored entries of ``account``
+        """
+        with self._lock:
+            connection = self.connection()
+            with connection:
+                connection.execute(
+                    "DELETE FROM history WHERE account=?", (account,))
+                connection.execute(
+                    "DELETE FROM history_time WHERE account=?", (account,))
+
+    def close(self):
+        with self._lock:
+            if self._connection is not None:
+                if self._connection_pid == os.getpid():
+                    self._connection.close()
+                self._connection = None
+
+
+#: Store of the ``Steem`` instances that ask for the default one
+historyStore = AccountHistoryStore()
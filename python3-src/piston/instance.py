@@ -1,18 +1,54 @@
+import threading
+
 import piston as pstn
 
 _shared_steem_instance = None
+_threaded_steem_instance = None
+_shared_steem_lock = threading.Lock()
 
 
 def shared_steem_instance():
     """ This method will initialize _shared_steem_instance and return it.
     The purpose of this method is to have offer single default Steem instance that can be reused by multiple classes.
+
+    The instance can be used from several threads, their calls are sent one
+    after another. See ``threaded_steem_instance()`` to have them in flight
+    at the same time.
     """
     global _shared_steem_instance
     if not _shared_steem_instance:
-        _shared_steem_instance = pstn.Steem()  # todo: add piston config
+        with _shared_steem_lock:
+            # Another thread may have connected in the meantime
+            if not _shared_steem_instance:
+                _shared_steem_instance = pstn.Steem()  # todo: add piston config
     return _shared_steem_instance
 
 
+def threaded_steem_instance():
+    """ Returns a Steem instance with its connection in pipelined mode for
+    use by many worker threads. It is created once and kept apart from the
+    shared instance (see ``shared_steem_instance()``), whose mode is left
+    untouched.
+
+    All threads share the one websocket connection. Their calls are sent
+    right away and a background thread hands each reply to the thread
+    waiting for it, so a slow call does not hold up the others.
+
+    .. code-block:: python
+
+        from concurrent.futures import ThreadPoolExecutor
+        steem = threaded_steem_instance()
+        with ThreadPoolExecutor(8) as pool:
+            accounts = list(pool.map(steem.rpc.get_account, names))
+    """
+    global _threaded_steem_instance
+    if not _threaded_steem_instance:
+        with _shared_steem_lock:
+            if not _threaded_steem_instance:
+                _threaded_steem_instance = pstn.Steem(pipelined=True)
+    return _threaded_steem_instance
+
+
 def set_shared_steem_instance(steem_instance):
     """ This method allows us to override default steem instance for all users of
     _shared_steem_instance.
@@ -4,7 +4,6 @@ import random
 import re
 from datetime import datetime, timedelta
 
-import pkg_resources  # part of setuptools
 from pistonapi.steemnoderpc import SteemNodeRPC, NoAccessApi
 from pistonbase import memo
 from pistonbase import operations
@@ -12,6 +11,8 @@ from pistonbase.account import PrivateKey, PublicKey
 
 from .account import Account
 from .amount import Amount
+from .blockarchive import BlockArchive
+from .historystore import AccountHistoryStore, historyStore
 from .blockchain import Blockchain
 from .exceptions import (
     AccountExistsException,
@@ -20,7 +21,7 @@ from .exceptions import (
 from .post import (
     Post
 )
-from .storage import configStorage as config
+from .storage import configStorage as config, handshakeStorage
 from .transactionbuilder import TransactionBuilder
 from .utils import (
     resolveIdentifier,
@@ -46,6 +47,18 @@ class Steem(object):
         :param bool debug: Enable Debugging *(optional)*
         :param array,dict,string keys: Predefine the wif keys to shortcut the wallet database
         :param bool offline: Boolean to prevent connecting to network (defaults to ``False``)
+        :param BlockArchive,str,bool archive: Local block archive to read
+            irreversible blocks from (see ``blockarchive.py``). Either an
+            instance, a directory, or ``True`` for the default directory
+            *(optional)*
+        :param AccountHistoryStore,str,bool history_store: Local store
+            to keep the histories of accounts in (see
+            ``historystore.py``). Either an instance, a database file,
+            or ``True`` for the default file *(optional)*
+        :param handshake_cache: Where to cache what nodes tell about
+            themselves when connecting (defaults to the ``handshake``
+            table of the SQLite database, ``False`` to disable)
+            *(optional)*
 
         Three wallet operation modes are possible:
 
@@ -113,6 +126,11 @@ class Steem(object):
                 "database",
                 "network_broadcast",
             ]
+        # Registered to along with the others, if the node offers them
+        if "optional_apis" not in kwargs:
+            kwargs["optional_apis"] = ["account_by_key", "follow"]
+        if "handshake_cache" not in kwargs:
+            kwargs["handshake_cache"] = handshakeStorage
 
         self.rpc = None
         self.debug = debug
@@ -122,18 +140,25 @@ class Steem(object):
         self.unsigned = kwargs.get("unsigned", False)
         self.expiration = int(kwargs.get("expiration", 30))
 
+        self.archive = kwargs.get("archive", None)
+        if self.archive and not isinstance(self.archive, BlockArchive):
+            self.archive = BlockArchive(
+                self.archive if isinstance(self.archive, str) else None)
+
+        self.history_store = kwargs.get("history_store", None)
+        if (self.history_store and
+                not isinstance(self.history_store, AccountHistoryStore)):
+            if isinstance(self.history_store, str):
+                self.history_store = AccountHistoryStore(self.history_store)
+            else:
+                self.history_store = historyStore
+
         if not self.offline:
             self._connect(node=node,
                           rpcuser=rpcuser,
                           rpcpassword=rpcpassword,
                           **kwargs)
 
-        # Try Optional APIs
-        try:
-            self.rpc.register_apis(["account_by_key", "follow"])
-        except NoAccessApi as e:
-            log.info(str(e))
-
         self.wallet = Wallet(self.rpc, **kwargs)
 
     def _connect(self,
@@ -351,6 +376,7 @@ class Steem(object):
 
         # Default "app"
         if "app" not in meta:
+            import pkg_resources  # part of setuptools
             version = pkg_resources.require("piston-lib")[0].version
             meta["app"] = "pysteem/{}".format(version)
 
@@ -566,9 +592,8 @@ class Steem(object):
             # store private keys
             if storekeys:
                 # self.wallet.addPrivateKey(owner_privkey)
-                self.wallet.addPrivateKey(active_privkey)
-                self.wallet.addPrivateKey(posting_privkey)
-                self.wallet.addPrivateKey(memo_privkey)
+                self.wallet.addPrivateKeys(
+                    [active_privkey, posting_privkey, memo_privkey])
         elif (owner_key and posting_key and active_key and memo_key):
             posting_pubkey = PublicKey(posting_key, prefix=self.rpc.chain_params["prefix"])
             active_pubkey = PublicKey(active_key, prefix=self.rpc.chain_params["prefix"])
@@ -1087,6 +1112,29 @@ class Steem(object):
             raise MissingKeyError
         return memo.decode_memo(PrivateKey(wif), enc_memo)
 
+    def decode_memos(self, enc_memos, return_exceptions=False):
+        """ Decode many encrypted memos with the keys of the wallet
+
+            :param list enc_memos: Encrypted memos (starting with ``#``)
+            :param bool return_exceptions: Return exceptions of memos
+                that cannot be decoded instead of raising the first one
+            :return: Decoded memos in the given order
+
+            See ``pistonbase.memo.decode_memos``.
+        """
+        enc_memos = list(enc_memos)
+        wifs = {}
+        for enc_memo in enc_memos:
+            assert enc_memo[0] == "#", "decode memo requires memos to start with '#'"
+            for key in memo.involved_keys(enc_memo):
+                if str(key) not in wifs:
+                    wifs[str(key)] = self.wallet.getPrivateKeyForPublicKey(str(key))
+        privs = [PrivateKey(wif) for wif in set(wifs.values()) if wif]
+        if not privs:
+            raise MissingKeyError
+        return memo.decode_memos(
+            privs, enc_memos, return_exceptions=return_exceptions)
+
     def stream_comments(self, *args, **kwargs):
         """ Generator that yields posts when they come in
 
@@ -1,15 +1,16 @@
 import argparse
+import json
 import shutil
 import time
 import os
 import sqlite3
-from .aes import AESCipher
 from appdirs import user_data_dir
 from datetime import datetime
 import logging
 from binascii import hexlify
 import random
 import hashlib
+import threading
 log = logging.getLogger(__name__)
 log.setLevel(logging.DEBUG)
 log.addHandler(logging.StreamHandler())
@@ -36,6 +37,10 @@ class DataDir(object):
 
          Furthermore, it offers an interface to generated backups
          in the `backups/` directory every now and then.
+
+         All storages share one connection to the SQLite database per
+         process (see ``execute()``). The database is kept in WAL mode
+         so that readers do not block the writer.
     """
 
     appname = "piston"
@@ -45,6 +50,14 @@ class DataDir(object):
     data_dir = user_data_dir(appname, appauthor)
     sqlDataBaseFile = os.path.join(data_dir, storageDatabase)
 
+    #: Shared connection and the process it belongs to
+    _connection = None
+    _connection_pid = None
+    _connection_lock = threading.RLock()
+
+    #: Has ``prepare()`` been called?
+    _prepared = False
+
     def __init__(self):
         #: Storage
         self.check_legacy_v1()
@@ -100,6 +113,54 @@ class DataDir(object):
             except OSError:
                 raise
 
+    @classmethod
+    def connection(cls):
+        """ Returns the connection to the SQLite database of this
+            process
+
+            The connection is opened once and reused, so that SQLite can
+            reuse its prepared statements. A child process does not use
+            the connection of its parent after a fork but opens its own.
+        """
+        with DataDir._connection_lock:
+            if (DataDir._connection is None or
+                    DataDir._connection_pid != os.getpid()):
+                # Never close the connection of the parent, it is
+                # still in use there
+                connection = sqlite3.connect(
+                    cls.sqlDataBaseFile,
+                    check_same_thread=False,
+                    cached_statements=256)
+                connection.execute("PRAGMA journal_mode=WAL")
+                connection.execute("PRAGMA synchronous=NORMAL")
+                DataDir._connection = connection
+                DataDir._connection_pid = os.getpid()
+            return DataDir._connection
+
+    def prepare(self):
+        """ Prepare the database for this storage, e.g. create its
+            tables. Called before the first query.
+        """
+        pass
+
+    def execute(self, query, args=(), commit=False):
+        """ Run a query on the shared connection and return all rows
+
+            :param str query: SQL query
+            :param tuple args: Parameters of the query
+            :param bool commit: Commit after the query
+        """
+        with DataDir._connection_lock:
+            if not self._prepared:
+                self._prepared = True
+                self.prepare()
+            connection = self.connection()
+            cursor = connection.execute(query, args)
+            rows = cursor.fetchall()
+            if commit:
+                connection.commit()
+            return rows
+
     def sqlite3_backup(self, dbfile, backupdir):
         """ Create timestamped database copy
         """
@@ -109,15 +170,12 @@ class DataDir(object):
             backupdir,
             os.path.basename(self.storageDatabase) +
             datetime.now().strftime("-" + timeformat))
-        connection = sqlite3.connect(self.sqlDataBaseFile)
-        cursor = connection.cursor()
-        # Lock database before making a backup
-        cursor.execute('begin immediate')
-        # Make new backup file
-        shutil.copyfile(dbfile, backup_file)
+        # The backup API also copies what is still in the WAL file
+        backup = sqlite3.connect(backup_file)
+        with DataDir._connection_lock:
+            self.connection().backup(backup)
+        backup.close()
         log.info("Creating {}...".format(backup_file))
-        # Unlock database
-        connection.rollback()
         configStorage["lastBackup"] = datetime.now().strftime(timeformat)
 
     def clean_data(self):
@@ -155,10 +213,12 @@ class Key(DataDir):
         query = ("SELECT name FROM sqlite_master " +
                  "WHERE type='table' AND name=?",
                  (self.__tablename__, ))
-        connection = sqlite3.connect(self.sqlDataBaseFile)
-        cursor = connection.cursor()
-        cursor.execute(*query)
-        return True if cursor.fetchone() else False
+        return True if self.execute(*query) else False
+
+    def prepare(self):
+        # Create the table if the database is brand new
+        if not self.exists_table():
+            self.create_table()
 
     def create_table(self):
         """ Create the new table in the SQLite database
@@ -168,20 +228,13 @@ class Key(DataDir):
                  'pub STRING(256),' +
                  'wif STRING(256)' +
                  ')')
-        connection = sqlite3.connect(self.sqlDataBaseFile)
-        cursor = connection.cursor()
-        cursor.execute(query)
-        connection.commit()
+        self.execute(query, commit=True)
 
     def getPublicKeys(self):
         """ Returns the public keys stored in the database
         """
         query = ("SELECT pub from %s " % (self.__tablename__))
-        connection = sqlite3.connect(self.sqlDataBaseFile)
-        cursor = connection.cursor()
-        cursor.execute(query)
-        results = cursor.fetchall()
-        return [x[0] for x in results]
+        return [x[0] for x in self.execute(query)]
 
     def getPrivateKeyForPublicKey(self, pub):
         """ Returns the (possibly encrypted) private key that
@@ -194,12 +247,9 @@ class Key(DataDir):
         query = ("SELECT wif from %s " % (self.__tablename__) +
                  "WHERE pub=?",
                  (pub,))
-        connection = sqlite3.connect(self.sqlDataBaseFile)
-        cursor = connection.cursor()
-        cursor.execute(*query)
-        key = cursor.fetchone()
+        key = self.execute(*query)
         if key:
-            return key[0]
+            return key[0][0]
         else:
             return None
 
@@ -212,10 +262,7 @@ class Key(DataDir):
         query = ("UPDATE %s " % self.__tablename__ +
                  "SET wif=? WHERE pub=?",
                  (wif, pub))
-        connection = sqlite3.connect(self.sqlDataBaseFile)
-        cursor = connection.cursor()
-        cursor.execute(*query)
-        connection.commit()
+        self.execute(*query, commit=True)
 
     def add(self, wif, pub):
         """ Add a new public/private key pair (correspondence has to be
@@ -229,10 +276,29 @@ class Key(DataDir):
         query = ('INSERT INTO %s (pub, wif) ' % self.__tablename__ +
                  'VALUES (?, ?)',
                  (pub, wif))
-        connection = sqlite3.connect(self.sqlDataBaseFile)
-        cursor = connection.cursor()
-        cursor.execute(*query)
-        connection.commit()
+        self.execute(*query, commit=True)
+
+    def add_many(self, keys):
+        """ Add several public/private key pairs in one transaction
+            (correspondence has to be checked elsewhere!)
+
+           :param list keys: List of ``(wif, pub)`` pairs
+
+           Nothing is added if any of the public keys is in storage
+           already.
+        """
+        keys = list(keys)
+        query = ('INSERT INTO %s (pub, wif) ' % self.__tablename__ +
+                 'VALUES (?, ?)')
+        with DataDir._connection_lock:
+            stored = set(self.getPublicKeys())
+            pubs = [pub for wif, pub in keys]
+            if stored.intersection(pubs) or len(set(pubs)) != len(pubs):
+                raise ValueError("Key already in storage")
+            connection = self.connection()
+            with connection:
+                connection.executemany(
+                    query, [(pub, wif) for wif, pub in keys])
 
     def delete(self, pub):
         """ Delete the key identified as `pub`
@@ -242,10 +308,7 @@ class Key(DataDir):
         query = ("DELETE FROM %s " % (self.__tablename__) +
                  "WHERE pub=?",
                  (pub,))
-        connection = sqlite3.connect(self.sqlDataBaseFile)
-        cursor = connection.cursor()
-        cursor.execute(*query)
-        connection.commit()
+        self.execute(*query, commit=True)
 
 
 class Configuration(DataDir):
@@ -272,8 +335,14 @@ class Configuration(DataDir):
     def __init__(self):
         """ This is the configuration storage that stores key/value
             pairs in the `config` table of the SQLite3 database.
+
+            The table is cached in memory. Writes go to the database
+            and the cache, and the cache is reloaded once another
+            process has changed the database.
         """
         super(Configuration, self).__init__()
+        self._cache = None
+        self._data_version = None
 
     def exists_table(self):
         """ Check if the database table exists
@@ -281,10 +350,12 @@ class Configuration(DataDir):
         query = ("SELECT name FROM sqlite_master " +
                  "WHERE type='table' AND name=?",
                  (self.__tablename__, ))
-        connection = sqlite3.connect(self.sqlDataBaseFile)
-        cursor = connection.cursor()
-        cursor.execute(*query)
-        return True if cursor.fetchone() else False
+        return True if self.execute(*query) else False
+
+    def prepare(self):
+        # Create the table if the database is brand new
+        if not self.exists_table():
+            self.create_table()
 
     def create_table(self):
         """ Create the new table in the SQLite database
@@ -294,10 +365,8 @@ class Configuration(DataDir):
                  'key STRING(256),' +
                  'value STRING(256)' +
                  ')')
-        connection = sqlite3.connect(self.sqlDataBaseFile)
-        cursor = connection.cursor()
-        cursor.execute(query)
-        connection.commit()
+        self.execute(query, commit=True)
+        self._cache = None
 
     def checkBackup(self):
         """ Backup the SQL database every 7 days
@@ -317,32 +386,34 @@ class Configuration(DataDir):
         except:
             self.refreshBackup()
 
+    def _config(self):
+        """ Returns the cached ``config`` table (internally used)
+        """
+        with DataDir._connection_lock:
+            # data_version changes with commits of other connections
+            data_version = self.execute("PRAGMA data_version")[0][0]
+            if self._cache is None or data_version != self._data_version:
+                query = ("SELECT key, value FROM %s " % (self.__tablename__) +
+                         "ORDER BY id")
+                cache = {}
+                for key, value in self.execute(query):
+                    cache.setdefault(key, value)
+                self._cache = cache
+                self._data_version = data_version
+            return self._cache
+
     def _haveKey(self, key):
         """ Is the key `key` available int he configuration?
         """
-        query = ("SELECT value FROM %s " % (self.__tablename__) +
-                 "WHERE key=?",
-                 (key,)
-                 )
-        connection = sqlite3.connect(self.sqlDataBaseFile)
-        cursor = connection.cursor()
-        cursor.execute(*query)
-        return True if cursor.fetchone() else False
+        return key in self._config()
 
     def __getitem__(self, key):
         """ This method behaves differently from regular `dict` in that
             it returns `None` if a key is not found!
         """
-        query = ("SELECT value FROM %s " % (self.__tablename__) +
-                 "WHERE key=?",
-                 (key,)
-                 )
-        connection = sqlite3.connect(self.sqlDataBaseFile)
-        cursor = connection.cursor()
-        cursor.execute(*query)
-        result = cursor.fetchone()
-        if result:
-            value = result[0]
+        config = self._config()
+        if key in config:
+            value = config[key]
         else:
             if key in self.config_defaults:
                 value = self.config_defaults[key]
@@ -369,18 +440,21 @@ class Configuration(DataDir):
             return False
 
     def __setitem__(self, key, value):
-        if self._haveKey(key):
-            query = ("UPDATE %s " % self.__tablename__ +
-                     "SET value=? WHERE key=?",
-                     (value, key))
-        else:
-            query = ("INSERT INTO %s " % self.__tablename__ +
-                     "(key, value) VALUES (?, ?)",
-                     (key, value))
-        connection = sqlite3.connect(self.sqlDataBaseFile)
-        cursor = connection.cursor()
-        cursor.execute(*query)
-        connection.commit()
+        with DataDir._connection_lock:
+            if self._haveKey(key):
+                query = ("UPDATE %s " % self.__tablename__ +
+                         "SET value=? WHERE key=?",
+                         (value, key))
+            else:
+                query = ("INSERT INTO %s " % self.__tablename__ +
+                         "(key, value) VALUES (?, ?)",
+                         (key, value))
+            self.execute(*query, commit=True)
+            # Cache the value the way SQLite stored it (type affinity)
+            query = ("SELECT value FROM %s " % (self.__tablename__) +
+                     "WHERE key=?",
+                     (key,))
+            self._config()[key] = self.execute(*query)[0][0]
 
     def delete(self, key):
         """ Delete a key from the configuration store
@@ -388,27 +462,91 @@ class Configuration(DataDir):
         query = ("DELETE FROM %s " % (self.__tablename__) +
                  "WHERE key=?",
                  (key,))
-        connection = sqlite3.connect(self.sqlDataBaseFile)
-        cursor = connection.cursor()
-        cursor.execute(*query)
-        connection.commit()
+        with DataDir._connection_lock:
+            self.execute(*query, commit=True)
+            self._config().pop(key, None)
 
     def __iter__(self):
-        query = ("SELECT key, value from %s " % (self.__tablename__))
-        connection = sqlite3.connect(self.sqlDataBaseFile)
-        cursor = connection.cursor()
-        cursor.execute(query)
-        r = {}
-        for key, value in cursor.fetchall():
-            r[key] = value
-        return iter(r)
+        return iter(list(self._config()))
 
     def __len__(self):
-        query = ("SELECT id from %s " % (self.__tablename__))
-        connection = sqlite3.connect(self.sqlDataBaseFile)
-        cursor = connection.cursor()
-        cursor.execute(query)
-        return len(cursor.fetchall())
+        query = ("SELECT count(id) from %s " % (self.__tablename__))
+        return self.execute(query)[0][0]
+
+
+class Handshake(DataDir):
+    """ Caches what ``SteemNodeRPC`` learns about a node when connecting
+        (e.g. ``chain_params``) per node URL in the `handshake` table of
+        the SQLite3 database.
+
+        :param int ttl: Seconds an entry is used for
+    """
+    __tablename__ = "handshake"
+
+    def __init__(self, ttl=86400):
+        super(Handshake, self).__init__()
+        self.ttl = ttl
+
+    def exists_table(self):
+        """ Check if the database table exists
+        """
+        query = ("SELECT name FROM sqlite_master " +
+                 "WHERE type='table' AND name=?",
+                 (self.__tablename__, ))
+        return True if self.execute(*query) else False
+
+    def prepare(self):
+        # Create the table if the database is brand new
+        if not self.exists_table():
+            self.create_table()
+
+    def create_table(self):
+        """ Create the new table in the SQLite database
+        """
+        query = ('CREATE TABLE %s (' % self.__tablename__ +
+                 'url STRING(256) PRIMARY KEY,' +
+                 'data TEXT,' +
+                 'updated REAL' +
+                 ')')
+        self.execute(query, commit=True)
+
+    def get(self, url):
+        """ Returns the cached data of the node ``url`` or ``None`` if
+            there is none or it has expired
+
+           :param str url: URL of the node
+        """
+        query = ("SELECT data, updated FROM %s " % self.__tablename__ +
+                 "WHERE url=?",
+                 (url,))
+        row = self.execute(*query)
+        if not row or row[0][1] < time.time() - self.ttl:
+            return None
+        try:
+            return json.loads(row[0][0])
+        except ValueError:
+            return None
+
+    def set(self, url, data):
+        """ Cache ``data`` for the node ``url``
+
+           :param str url: URL of the node
+           :param dict data: JSON serializable data
+        """
+        query = ("INSERT OR REPLACE INTO %s " % self.__tablename__ +
+                 "(url, data, updated) VALUES (?, ?, ?)",
+                 (url, json.dumps(data), time.time()))
+        self.execute(*query, commit=True)
+
+    def delete(self, url):
+        """ Drop the cached data of the node ``url``
+
+           :param str url: URL of the node
+        """
+        query = ("DELETE FROM %s " % self.__tablename__ +
+                 "WHERE url=?",
+                 (url,))
+        self.execute(*query, commit=True)
 
 
 class WrongMasterPasswordException(Exception):
@@ -451,6 +589,7 @@ class MasterPassword(object):
     def decryptEncryptedMaster(self):
         """ Decrypt the encrypted masterpassword
         """
+        from .aes import AESCipher
         aes = AESCipher(self.password)
         checksum, encrypted_master = configStorage[self.config_key].split("$")
         try:
@@ -487,6 +626,7 @@ class MasterPassword(object):
         """
         if not self.decrypted_master:
             raise Exception("master not decrypted")
+        from .aes import AESCipher
         aes = AESCipher(self.password)
         return "{}${}".format(self.deriveChecksum(self.decrypted_master),
                               aes.encrypt(self.decrypted_master))
@@ -503,15 +643,8 @@ class MasterPassword(object):
         configStorage[self.config_key] = ""
 
 
-# Create keyStorage
+# Create keyStorage. The database is opened and its tables are created
+# with the first query.
 keyStorage = Key()
 configStorage = Configuration()
-
-# Create Tables if database is brand new
-if not configStorage.exists_table():
-    configStorage.create_table()
-
-newKeyStorage = False
-if not keyStorage.exists_table():
-    newKeyStorage = True
-    keyStorage.create_table()
+handshakeStorage = Handshake()
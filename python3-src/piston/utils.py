@@ -4,8 +4,6 @@ import sys
 import time
 from datetime import datetime
 
-import frontmatter
-
 
 def constructIdentifier(author, slug):
     return "@%s/%s" % (author, slug)
@@ -40,6 +38,7 @@ def resolveIdentifier(identifier):
 
 
 def yaml_parse_file(args, initial_content):
+    import frontmatter
     message = None
 
     if args.file and args.file != "-":
@@ -1,7 +1,8 @@
 import logging
 import os
+import threading
+import time
 
-from graphenebase import bip38
 from pistonbase.account import PrivateKey, GraphenePrivateKey
 
 from .account import Account
@@ -13,6 +14,21 @@ from .exceptions import (
 log = logging.getLogger(__name__)
 
 
+def _decryptWif(query):
+    """ Decrypt one ``(encwif, masterpassword)`` pair (worker of
+        ``Wallet.unlock(preload=True)``)
+    """
+    encwif, masterpassword = query
+    try:
+        # Keys may be stored unencrypted
+        PrivateKey(encwif)
+        return encwif
+    except:
+        pass
+    from graphenebase import bip38
+    return format(bip38.decrypt(encwif, masterpassword), "wif")
+
+
 class Wallet():
     """ The wallet is meant to maintain access to private keys for
         your accounts. It either uses manually provided private keys
@@ -51,6 +67,10 @@ class Wallet():
     keys = {}  # struct with pubkey as key and wif as value
     keyMap = {}  # type:wif pairs to force certain keys
 
+    #: Seconds the decrypted keys of ``unlock(preload=True)`` are held
+    #: in memory after their last use
+    keyIndexTimeout = 600
+
     def __init__(self, rpc, *args, **kwargs):
         from .storage import configStorage
         self.configStorage = configStorage
@@ -58,6 +78,12 @@ class Wallet():
         # RPC
         Wallet.rpc = rpc
 
+        # Decrypted keys of the wallet database, see unlock()
+        self.keyIndex = {}
+        self.keyIndexLock = threading.RLock()
+        self.keyIndexUsed = 0
+        self.keyIndexTimer = None
+
         # Prefix?
         if Wallet.rpc:
             self.prefix = Wallet.rpc.chain_params["prefix"]
@@ -98,8 +124,23 @@ class Wallet():
                 raise InvalidWifError
             Wallet.keys[format(key.pubkey, self.prefix)] = str(key)
 
-    def unlock(self, pwd=None):
+    def unlock(self, pwd=None, preload=False, timeout=None, processes=None):
         """ Unlock the wallet database
+
+            :param str pwd: Passphrase (asked for if not provided)
+            :param bool preload: Decrypt all keys of the wallet database
+                at once and keep them in memory
+            :param int timeout: Seconds the preloaded keys are kept after
+                their last use (defaults to ``keyIndexTimeout``, ``0``
+                keeps them until ``lock()``)
+            :param int processes: Number of worker processes to decrypt
+                the keys with (``None`` for one per CPU, ``1`` to decrypt
+                in this process)
+
+            Every key of the wallet database is BIP38 encrypted and costs
+            a scrypt run to decrypt. With ``preload``, these runs are
+            done once and spread over all CPUs, and later calls of
+            ``getPrivateKeyForPublicKey()`` are dictionary lookups.
         """
         if not self.created():
             self.newWallet()
@@ -111,9 +152,72 @@ class Wallet():
             masterpwd = self.MasterPassword(pwd)
             self.masterpassword = masterpwd.decrypted_master
 
+        if preload:
+            self.preloadKeys(timeout=timeout, processes=processes)
+
+    def preloadKeys(self, timeout=None, processes=None):
+        """ Decrypt all keys of the wallet database into memory, see
+            ``unlock()``
+        """
+        if not self.keyStorage:
+            return
+        self.unlock()
+        pubs = self.getPublicKeys()
+        queries = [
+            (self.keyStorage.getPrivateKeyForPublicKey(pub),
+             self.masterpassword)
+            for pub in pubs
+        ]
+        if processes == 1 or len(queries) < 2:
+            wifs = [_decryptWif(q) for q in queries]
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            processes = processes or os.cpu_count() or 1
+            with ProcessPoolExecutor(processes) as pool:
+                wifs = list(pool.map(
+                    _decryptWif, queries,
+                    chunksize=max(1, len(queries) // (processes * 4))))
+
+        if timeout is None:
+            timeout = self.keyIndexTimeout
+        with self.keyIndexLock:
+            self.keyIndex = dict(zip(pubs, wifs))
+            self.keyIndexUsed = time.time()
+            self._scheduleKeyIndexExpiry(timeout)
+
+    def _scheduleKeyIndexExpiry(self, timeout, delay=None):
+        """ Clear the key index once it was not used for ``timeout``
+            seconds (internally used)
+        """
+        if self.keyIndexTimer:
+            self.keyIndexTimer.cancel()
+            self.keyIndexTimer = None
+        if not timeout:
+            return
+
+        def expire():
+            with self.keyIndexLock:
+                if self.keyIndexTimer is not timer:
+                    return
+                self.keyIndexTimer = None
+                idle = time.time() - self.keyIndexUsed
+                if idle < timeout:
+                    self._scheduleKeyIndexExpiry(timeout, timeout - idle)
+                else:
+                    log.debug("Dropping decrypted keys after %ds" % idle)
+                    self.keyIndex = {}
+
+        timer = threading.Timer(timeout if delay is None else delay, expire)
+        timer.daemon = True
+        self.keyIndexTimer = timer
+        timer.start()
+
     def lock(self):
         """ Lock the wallet database
         """
+        with self.keyIndexLock:
+            self.keyIndex = {}
+            self._scheduleKeyIndexExpiry(0)
         self.masterpassword = None
 
     def locked(self):
@@ -159,6 +263,7 @@ class Wallet():
     def encrypt_wif(self, wif):
         """ Encrypt a wif key
         """
+        from graphenebase import bip38
         self.unlock()
         return format(bip38.encrypt(PrivateKey(wif), self.masterpassword), "encwif")
 
@@ -171,6 +276,7 @@ class Wallet():
             return encwif
         except:
             pass
+        from graphenebase import bip38
         self.unlock()
         return format(bip38.decrypt(encwif, self.masterpassword), "wif")
 
@@ -221,6 +327,34 @@ class Wallet():
             if not self.created():
                 self.newWallet()
             self.keyStorage.add(self.encrypt_wif(wif), pub)
+            with self.keyIndexLock:
+                if self.keyIndex:
+                    self.keyIndex[pub] = wif
+
+    def addPrivateKeys(self, wifs):
+        """ Add several private keys to the wallet database at once
+
+            :param list wifs: Private keys
+        """
+        pairs = []
+        for wif in wifs:
+            if isinstance(wif, PrivateKey) or isinstance(wif, GraphenePrivateKey):
+                wif = str(wif)
+            try:
+                pub = format(PrivateKey(wif).pubkey, self.prefix)
+            except:
+                raise InvalidWifError("Invalid Private Key Format. Please use WIF!")
+            pairs.append((wif, pub))
+
+        if self.keyStorage:
+            # Test if wallet exists
+            if not self.created():
+                self.newWallet()
+            self.keyStorage.add_many(
+                [(self.encrypt_wif(wif), pub) for wif, pub in pairs])
+            with self.keyIndexLock:
+                if self.keyIndex:
+                    self.keyIndex.update((pub, wif) for wif, pub in pairs)
 
     def getPrivateKeyForPublicKey(self, pub):
         """ Obtain the private key for a given public key
@@ -236,6 +370,11 @@ class Wallet():
                 # authorization is left to ensure by the developer
                 return list(self.keys.values())[0]
         else:
+            with self.keyIndexLock:
+                if pub in self.keyIndex:
+                    self.keyIndexUsed = time.time()
+                    return self.keyIndex[pub]
+
             # Test if wallet exists
             if not self.created():
                 self.newWallet()
@@ -250,6 +389,8 @@ class Wallet():
             if not self.created():
                 self.newWallet()
             self.keyStorage.delete(pub)
+            with self.keyIndexLock:
+                self.keyIndex.pop(pub, None)
 
     def removeAccount(self, account):
         """ Remove all keys associated with a given account
@@ -9,6 +9,11 @@ except ImportError:
 
 import websockets
 import json
+import logging
+from collections import deque
+from datetime import datetime, timedelta
+
+log = logging.getLogger(__name__)
 
 """ Error Classes """
 
@@ -134,6 +139,185 @@ class Config():
 """ API class """
 
 
+class SteemAsyncConnection(object):
+    """ A websocket connection that multiplexes concurrent calls
+
+        Internal implementation specific class. Users of ``SteemAsyncClient``
+        do not need to use this class.
+
+        :param str url: Websocket URL
+        :param str name: Name used in error messages (``witness``/``wallet``)
+        :param int max_in_flight: Maximum number of concurrent calls
+        :param float timeout: Default timeout per call in seconds (``None``
+            for no timeout)
+        :param bool reconnect: Reconnect if the connection is lost
+        :param coroutine on_connect: Awaited after every (re)connect before
+            any other call is sent, e.g. to login and register APIs
+    """
+    def __init__(self, url, name, max_in_flight=100, timeout=None,
+                 reconnect=True, on_connect=None):
+        self.url = url
+        self.name = name
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.reconnect = reconnect
+        self._on_connect = on_connect
+        #: Called as ``resolve(query, api)`` before a query is sent
+        self.resolve = None
+        self._call_id = 0
+        self._generation = 0
+        # call id -> [query, future, api, generation it was sent on]
+        self._pending = {}
+        self._ws = None
+        self._reader = None
+        self._ready = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._closing = False
+
+    async def connect(self):
+        """ Connect, start reading replies and (re-)send pending calls
+        """
+        self._closing = False
+        self._ws = await websockets.connect(self.url)
+        self._generation += 1
+        self._reader = asyncio.ensure_future(self._read())
+        if self._on_connect:
+            await self._on_connect()
+        self._ready.set()
+        for call_id in list(self._pending):
+            await self._send(call_id)
+
+    async def close(self):
+        self._closing = True
+        self._ready.clear()
+        if self._reader:
+            self._reader.cancel()
+        if self._ws:
+            await self._ws.close()
+        for query, future, api, generation in self._pending.values():
+            future.cancel()
+        self._pending = {}
+
+    async def call(self, query, timeout=None, future=False, api=None, early=False):
+        """ Send ``query`` and return its result
+
+            :param dict query: JSON-RPC request without ``id``
+            :param float timeout: Timeout in seconds, overrides the
+                default of the connection
+            :param bool future: Return an ``asyncio.Future`` instead of
+                waiting for the result
+            :param str api: Name of the API the query is addressed to
+            :param bool early: Send before ``on_connect`` has finished
+                and without waiting for a free slot (used by
+                ``on_connect`` itself)
+
+            The timeout covers waiting for a free slot and for the
+            connection as well.
+        """
+        if future:
+            return await self._submit(query, api, early)
+        timeout = timeout if timeout is not None else self.timeout
+        return await asyncio.wait_for(self._call(query, api, early), timeout)
+
+    async def _call(self, query, api, early):
+        result = await self._submit(query, api, early)
+        try:
+            return await result
+        finally:
+            result.cancel()
+
+    async def _submit(self, query, api, early):
+        """ Queue and send ``query``, returns the future of its result
+        """
+        # Calls of on_connect do not take a slot, the pending calls may
+        # hold all of them until the connection is back
+        if not early:
+            await self._semaphore.acquire()
+        self._call_id += 1
+        call_id = self._call_id
+        result = asyncio.get_event_loop().create_future()
+        if not early:
+            result.add_done_callback(lambda f: self._semaphore.release())
+        result.add_done_callback(lambda f: self._pending.pop(call_id, None))
+        self._pending[call_id] = [dict(query, id=call_id), result, api, 0]
+        try:
+            await self._send(call_id, early)
+        except BaseException:
+            result.cancel()
+            raise
+        return result
+
+    async def _send(self, call_id, early=False):
+        if not early:
+            await self._ready.wait()
+        entry = self._pending.get(call_id)
+        if not entry or entry[1].done() or entry[3] == self._generation:
+            # answered, cancelled or already sent on this connection
+            return
+        if entry[2] and self.resolve:
+            entry[0] = self.resolve(entry[0], entry[2])
+        entry[3] = self._generation
+        try:
+            await self._ws.send(json.dumps(entry[0]))
+        except websockets.exceptions.ConnectionClosed:
+            if not self.reconnect:
+                self._pending.pop(call_id, None)
+                entry[1].set_exception(RPCClientError(
+                    "Lost connection to {} server".format(self.name)))
+            # otherwise, it is sent again after reconnecting
+
+    async def _read(self):
+        while True:
+            try:
+                reply = await self._ws.recv()
+            except websockets.exceptions.ConnectionClosed:
+                self._ready.clear()
+                if self._closing:
+                    return
+                if not self.reconnect:
+                    pending, self._pending = self._pending, {}
+                    for query, future, api, generation in pending.values():
+                        if not future.done():
+                            future.set_exception(RPCClientError(
+                                "Lost connection to {} server".format(self.name)))
+                    return
+                asyncio.ensure_future(self._reconnect())
+                return
+            try:
+                r = json.loads(reply)
+            except ValueError:
+                log.warning("{} server returned invalid format via websocket. Expected JSON!".format(self.name.capitalize()))
+                continue
+            if not isinstance(r, dict) or r.get("method") == "notice":
+                continue
+            call_id = r.get("id")
+            if call_id not in self._pending:
+                # e.g. the reply to a call that timed out
+                continue
+            query, future, api, generation = self._pending.pop(call_id)
+            if future.done():
+                continue
+            if "error" in r:
+                if "detail" in r["error"]:
+                    future.set_exception(RPCServerError(r["error"]["detail"]))
+                else:
+                    future.set_exception(RPCServerError(r["error"]["message"]))
+            else:
+                future.set_result(r["result"])
+
+    async def _reconnect(self):
+        cnt = 0
+        while not self._closing:
+            cnt += 1
+            sleeptime = (cnt - 1) * 2 if cnt < 10 else 10
+            await asyncio.sleep(sleeptime)
+            try:
+                await self.connect()
+                return
+            except (OSError, websockets.exceptions.WebSocketException, RPCClientError):
+                continue
+
+
 class SteemAsyncClient(object):
     """ Steem Asynchronous Client
 
@@ -141,16 +325,39 @@ class SteemAsyncClient(object):
         use of the RPC API of either steemd (witness) or cli_wallet (wallet)  easy to use.
 
         :param class config: the configuration class
+        :param int max_in_flight: Maximum number of concurrent calls per
+            connection, further calls wait for a free slot (default: 100)
+        :param float timeout: Default timeout per call in seconds
+            (default: ``None``, no timeout). Every call also accepts a
+            ``timeout`` keyword argument.
+        :param bool reconnect: Reconnect, login and re-register the APIs
+            if a connection is lost (default: ``True``). Pending calls
+            are sent again.
 
-        Example usage of this class:
+        The client plugs into an existing event loop:
 
         .. code-block:: python
 
-            from pistonasyncclient import SteemAsyncClient, Config
+            from pistonapi.steemasyncclient import SteemAsyncClient, Config
+
+            async def main():
+                config = Config(witness_url="ws://localhost:8090",
+                                witness_apis=["database"])
+                async with SteemAsyncClient(config) as steem:
+                    res = await steem.database.get_dynamic_global_properties()
+                    print(res["head_block_number"])
+                    async for block in steem.blocks():
+                        print(block["block_num"])
 
-            @asyncio.coroutine
-            def print_block_number(steem):
-               res = yield from piston.database.get_dynamic_global_properties()
+            asyncio.get_event_loop().run_until_complete(main())
+
+        ``run()`` still accepts a list of coroutine functions that are
+        passed the client:
+
+        .. code-block:: python
+
+            async def print_block_number(steem):
+               res = await steem.database.get_dynamic_global_properties()
                print(res["head_block_number"])
 
             steem = SteemAsyncClient(Config(witness_url="ws://localhost:8090",
@@ -160,17 +367,26 @@ class SteemAsyncClient(object):
         See more examples of how to use this class in the examples folder.
     """
 
-    def __init__(self, config):
+    def __init__(self, config, max_in_flight=100, timeout=None, reconnect=True):
         self._config = config
         self._api_map = {"login": "login"}
         self._api_id = {"login": 1}
-        self._witness_call_id = 0
-        self._wallet_call_id = 0
-        self._witness_pending_rpc = {}
-        self._wallet_pending_rpc = {}
-        self._witness_ws = None
-        self._wallet_ws = None
+        self._witness = None
+        self._wallet = None
+        if hasattr(config, "witness"):
+            self._witness = SteemAsyncConnection(
+                config.witness["url"], "witness",
+                max_in_flight=max_in_flight,
+                timeout=timeout,
+                reconnect=reconnect,
+                on_connect=self._login)
+            self._witness.resolve = self._resolve_api_id
         if hasattr(config, "wallet"):
+            self._wallet = SteemAsyncConnection(
+                config.wallet["url"], "wallet",
+                max_in_flight=max_in_flight,
+                timeout=timeout,
+                reconnect=reconnect)
             self.wallet = SteemAsyncClient.WalletRPCDispatch(self)
 
     class WalletRPCDispatch(object):
@@ -184,25 +400,19 @@ class SteemAsyncClient(object):
             if method_name[0] == '_':
                 raise RPCClientError("RPC call method name starts with _ which is not allowed")
 
-            @asyncio.coroutine
-            def method(*args, **kwargs):
-                call_id = self._steem._wallet_call_id
-                self._steem._wallet_call_id += 1
-                query = {"jsonrpc": "2.0", "id": call_id, "method": method_name, "params": args}
-                self._steem._wallet_pending_rpc[call_id] = asyncio.Future()
-                yield from self._steem._wallet_ws.send(json.dumps(query))
-                if "future" in kwargs and kwargs["future"]:
-                    return self._steem._wallet_pending_rpc[call_id]
-                else:
-                    ret = yield from self._steem._wallet_pending_rpc[call_id]
-                    return ret
+            async def method(*args, **kwargs):
+                query = {"jsonrpc": "2.0", "method": method_name, "params": args}
+                return await self._steem._wallet.call(
+                    query,
+                    timeout=kwargs.get("timeout"),
+                    future=kwargs.get("future", False))
             return method
 
     class WitnessRPCDispatch(object):
         # Internal implementation specific class. Users of SteemAsyncClient do not need to use this class.
-        def __init__(self, steem, api_id):
+        def __init__(self, steem, api_name):
             self._steem = steem
-            self._api_id = api_id
+            self._api_name = api_name
 
         def __getattr__(self, method_name):
             """ Map field names to Steem methods within the specific Steem API that this
@@ -211,18 +421,15 @@ class SteemAsyncClient(object):
             if method_name[0] == '_':
                 raise RPCClientError("RPC call method name starts with _ which is not allowed")
 
-            @asyncio.coroutine
-            def method(*args, **kwargs):
-                call_id = self._steem._witness_call_id
-                self._steem._witness_call_id += 1
-                query = {"jsonrpc": "2.0", "id": call_id, "method": "call", "params": [self._api_id, method_name, args]}
-                self._steem._witness_pending_rpc[call_id] = asyncio.Future()
-                yield from self._steem._witness_ws.send(json.dumps(query))
-                if "future" in kwargs and kwargs["future"]:
-                    return self._steem._witness_pending_rpc[call_id]
-                else:
-                    ret = yield from self._steem._witness_pending_rpc[call_id]
-                    return ret
+            async def method(*args, **kwargs):
+                api_id = self._steem._api_id.get(self._api_name, 0)
+                query = {"jsonrpc": "2.0", "method": "call",
+                         "params": [api_id, method_name, args]}
+                return await self._steem._witness.call(
+                    query,
+                    timeout=kwargs.get("timeout"),
+                    future=kwargs.get("future", False),
+                    api=self._api_name)
             return method
 
     def __getattr__(self, api_name):
@@ -230,105 +437,165 @@ class SteemAsyncClient(object):
         """
         if api_name == "wallet":
             raise RPCClientError("Wallet RPC was not specified when initializing SteemAsyncClient")
-        if not self._witness_ws:
+        if api_name[0] == '_':
+            raise AttributeError(api_name)
+        if not self._witness:
             raise RPCClientError("Witness RPC was not specified when initializing SteemAsyncClient")
         if api_name in self._api_map and self._api_map[api_name] in self._api_id:
-            api_id = self._api_id[self._api_map[api_name]]
+            return SteemAsyncClient.WitnessRPCDispatch(self, self._api_map[api_name])
         else:
             raise RPCClientError("Have not registered an API with alias '{}'".format(api_name))
-        return SteemAsyncClient.WitnessRPCDispatch(self, api_id)
-
-    @asyncio.coroutine
-    def _initialize(self, coroutines):
-        if self._witness_ws:
-            l = yield from self.login.login(self._config.witness["user"], self._config.witness["password"])
-            if not l:
-                raise RPCClientError("Could not login to steemd node")
-            for (alias, api_name) in self._config.witness["apis"].items():
-                api_id = yield from self.login.get_api_by_name("{}_api".format(api_name))
-                if not api_id:
-                    raise RPCClientError("Could not acquire {}_api".format(api_name))
-                self._api_id[api_name] = api_id
-                self._api_map[alias] = api_name
-        futures = []
-        for c in coroutines:
-            futures.append(asyncio.async(c(self)))
-        yield from asyncio.wait(futures)
-
-    @asyncio.coroutine
-    def _handle(self, coroutines):
-        if hasattr(self._config, "wallet"):
-            self._wallet_ws = yield from websockets.connect(self._config.wallet["url"])
-            wallet_ws_recv_task = asyncio.async(self._wallet_ws.recv())
-        if hasattr(self._config, "witness"):
-            self._witness_ws = yield from websockets.connect(self._config.witness["url"])
-            witness_ws_recv_task = asyncio.async(self._witness_ws.recv())
-        try:
-            main_task = asyncio.async(self._initialize(coroutines))
-            while True:
-                tasks = [main_task]
-                if hasattr(self._config, "wallet"):
-                    tasks.append(wallet_ws_recv_task)
-                if hasattr(self._config, "witness"):
-                    tasks.append(witness_ws_recv_task)
-
-                done, pending = yield from asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
-                if main_task in done:
-                    if hasattr(self._config, "wallet"):
-                        wallet_ws_recv_task.cancel()
-                        self._wallet_pending_rpc = {}
-                    if hasattr(self._config, "witness"):
-                        witness_ws_recv_task.cancel()
-                        self._witness_pending_rpc = {}
-                    break
-
-                if hasattr(self._config, "wallet") and wallet_ws_recv_task in done:
-                    try:
-                        r = json.loads(wallet_ws_recv_task.result())
-                    except ValueError:
-                        raise RPCClientError("Wallet server returned invalid format via websocket. Expected JSON!")
-                    call_id = r["id"]
-                    if call_id in self._wallet_pending_rpc:
-                        future = self._wallet_pending_rpc[call_id]
-                        del self._wallet_pending_rpc[call_id]
-                        if "error" in r:
-                            if "detail" in r["error"]:
-                                future.set_exception(RPCServerError(r["error"]["detail"]))
-                            else:
-                                future.set_exception(RPCServerError(r["error"]["message"]))
-                        future.set_result(r["result"])
-                    else:
-                        raise RPCClientError("Not expecting a response via websocket from wallet server with call id {}".format(call_id))
-                    wallet_ws_recv_task = asyncio.async(self._wallet_ws.recv())
-
-                if hasattr(self._config, "witness") and witness_ws_recv_task in done:
-                    try:
-                        r = json.loads(witness_ws_recv_task.result())
-                    except ValueError:
-                        raise RPCClientError("Witness server returned invalid format via websocket. Expected JSON!")
-                    call_id = r["id"]
-                    if call_id in self._witness_pending_rpc:
-                        future = self._witness_pending_rpc[call_id]
-                        del self._witness_pending_rpc[call_id]
-                        if "error" in r:
-                            if "detail" in r["error"]:
-                                future.set_exception(RPCServerError(r["error"]["detail"]))
-                            else:
-                                future.set_exception(RPCServerError(r["error"]["message"]))
-                        future.set_result(r["result"])
-                    else:
-                        raise RPCClientError("Not expecting a response via websocket from witness server with call id {}".format(call_id))
-                    witness_ws_recv_task = asyncio.async(self._witness_ws.recv())
 
+    def _resolve_api_id(self, query, api):
+        """ Update the API id of a query, it may change when re-registering
+        """
+        params = list(query["params"])
+        params[0] = self._api_id.get(api, 0)
+        return dict(query, params=params)
+
+    async def _login_call(self, method_name, *args):
+        query = {"jsonrpc": "2.0", "method": "call",
+                 "params": [self._api_id["login"], method_name, args]}
+        return await self._witness.call(query, early=True)
+
+    async def _login(self):
+        """ Login and register the APIs, done on every (re)connect
+        """
+        l = await self._login_call("login", self._config.witness["user"], self._config.witness["password"])
+        if not l:
+            raise RPCClientError("Could not login to steemd node")
+        for (alias, api_name) in self._config.witness["apis"].items():
+            api_id = await self._login_call("get_api_by_name", "{}_api".format(api_name))
+            if not api_id:
+                raise RPCClientError("Could not acquire {}_api".format(api_name))
+            self._api_id[api_name] = api_id
+            self._api_map[alias] = api_name
+
+    async def connect(self):
+        """ Connect to the configured servers, login and register the APIs
+        """
+        if self._wallet:
+            await self._wallet.connect()
+        if self._witness:
+            await self._witness.connect()
+
+    async def close(self):
+        if self._wallet:
+            await self._wallet.close()
+        if self._witness:
+            await self._witness.close()
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def _database(self, method_name, *args):
+        """ Call a method of the database API, registered or not
+        """
+        return await getattr(
+            SteemAsyncClient.WitnessRPCDispatch(self, "database"),
+            method_name)(*args)
+
+    async def blocks(self, start=None, stop=None, mode="irreversible"):
+        """ Yields blocks starting from ``start``, the asynchronous
+            equivalent of ``piston.blockchain.Blockchain.blocks()``.
+
+            :param int start: Starting block
+            :param int stop: Stop at this block
+            :param str mode: We here have the choice between
+                 * "head": the last block
+                 * "irreversible": the block that is confirmed by 2/3 of all block producers and is thus irreversible!
+        """
+        if mode == "irreversible":
+            mode = "last_irreversible_block_num"
+        elif mode == "head":
+            mode = "head_block_number"
+        else:
+            raise ValueError("invalid value for 'mode'!")
+
+        config = await self._database("get_config")
+        block_interval = config.get("STEEMIT_BLOCK_INTERVAL", 3)
+
+        if not start:
+            props = await self._database("get_dynamic_global_properties")
+            start = props[mode]
+
+        while True:
+            props = await self._database("get_dynamic_global_properties")
+            head_block = props[mode]
+            if stop:
+                head_block = min(head_block, stop)
+
+            # Keep a window of requests in flight and yield in order
+            window = deque()
+            blocknum = start
+            try:
+                while start <= head_block:
+                    while (len(window) < self._witness.max_in_flight and
+                           blocknum <= head_block):
+                        window.append(asyncio.ensure_future(
+                            self._database("get_block", blocknum)))
+                        blocknum += 1
+                    block = await window.popleft()
+                    if not block:
+                        break
+                    block.update({"block_num": start})
+                    yield block
+                    start += 1
+            finally:
+                for future in window:
+                    future.cancel()
+
+            if stop and start > stop:
+                break
+
+            # Sleep until the next block is due
+            next_block = (
+                datetime.strptime(props["time"], "%Y-%m-%dT%H:%M:%S") +
+                timedelta(seconds=block_interval)
+            )
+            delay = (next_block - datetime.utcnow()).total_seconds() + 0.2
+            await asyncio.sleep(
+                min(max(delay, block_interval / 10), block_interval))
+
+    async def stream(self, opNames=[], start=None, stop=None, mode="irreversible"):
+        """ Yield specific operations (e.g. comments) only, the
+            asynchronous equivalent of
+            ``piston.blockchain.Blockchain.stream()`` for
+            non-virtual operations.
+
+            :param array opNames: List of operations to filter for
+            :param int start: Start at this block
+            :param int stop: Stop at this block
+            :param str mode: ``irreversible`` or ``head``
+        """
+        if isinstance(opNames, str):
+            opNames = [opNames]
+        async for block in self.blocks(start, stop, mode):
+            for tx in block.get("transactions"):
+                for op in tx["operations"]:
+                    if not opNames or op[0] in opNames:
+                        r = {
+                            "type": op[0],
+                            "timestamp": block.get("timestamp"),
+                            "block_num": block.get("block_num")
+                        }
+                        r.update(op[1])
+                        yield r
+
+    async def _run(self, coroutines):
+        await self.connect()
+        try:
+            await asyncio.gather(*[c(self) for c in coroutines])
         finally:
-            if hasattr(self._config, "wallet"):
-                yield from self._wallet_ws.close()
-            if hasattr(self._config, "witness"):
-                yield from self._witness_ws.close()
+            await self.close()
 
     def run(self, coroutines):
         loop = asyncio.get_event_loop()
         try:
-            loop.run_until_complete(self._handle(coroutines))
+            loop.run_until_complete(self._run(coroutines))
         finally:
             pass  # loop.close()
@@ -2,5 +2,6 @@ __all__ = ['transactions',
            'chains',
            'objecttypes',
            'operations',
+           'signedblocks',
            'memo',
            'account']
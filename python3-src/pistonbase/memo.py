@@ -1,11 +1,21 @@
+import os
 import sys
 import hashlib
 from binascii import hexlify, unhexlify
-from Crypto.Cipher import AES
+from collections import OrderedDict
+import threading
+import ecdsa
 from pistonbase.account import PrivateKey, PublicKey
 from graphenebase.base58 import base58encode, base58decode
+from graphenebase.types import readvarint
 import struct
 
+try:
+    import secp256k1
+    USE_SECP256K1 = True
+except ImportError:
+    USE_SECP256K1 = False
+
 " This class and the methods require python3 "
 assert sys.version_info[0] == 3, "graphenelib requires python3"
 
@@ -24,14 +34,52 @@ def get_shared_secret(priv, pub):
 
             Pub(Alice) * Priv(Bob) = Pub(Bob) * Priv(Alice)
 
+        Shared secrets are cached by ``(priv, pub)``.
+    """
+    return shared_secret(repr(priv), repr(pub))
+
+
+#: Shared secrets by ``(priv, pub)``
+_secrets = OrderedDict()
+_secrets_size = 4096
+_secrets_lock = threading.Lock()
+
+
+def _cacheSecret(pair, secret):
+    with _secrets_lock:
+        _secrets[pair] = secret
+        if len(_secrets) > _secrets_size:
+            _secrets.popitem(last=False)
+
+
+def shared_secret(priv, pub):
+    """ Derive the shared secret of the hex encoded private key ``priv``
+        and public key ``pub`` (cached)
     """
-    pub_point = pub.point()
-    priv_point = int(repr(priv), 16)
-    res = pub_point * priv_point
-    res_hex = '%032x' % res.x()
-    # Zero padding
-    res_hex = '0' * (64 - len(res_hex)) + res_hex
-    return hashlib.sha512(unhexlify(res_hex)).hexdigest()
+    pair = (priv, pub)
+    with _secrets_lock:
+        secret = _secrets.get(pair)
+        if secret is not None:
+            _secrets.move_to_end(pair)
+            return secret
+    secret = _shared_secret(pair)
+    _cacheSecret(pair, secret)
+    return secret
+
+
+def _shared_secret(pair):
+    priv, pub = pair
+    if USE_SECP256K1:
+        point = secp256k1.PublicKey(unhexlify(pub), raw=True).tweak_mul(
+            unhexlify(priv))
+        x = point.serialize(compressed=False)[1:33]
+    else:
+        pub_point = PublicKey(pub).point()
+        if hasattr(ecdsa.ellipticcurve, "PointJacobi"):
+            pub_point = ecdsa.ellipticcurve.PointJacobi.from_affine(pub_point)
+        res = pub_point * int(priv, 16)
+        x = res.x().to_bytes(32, "big")
+    return hashlib.sha512(x).hexdigest()
 
 
 def init_aes(shared_secret, nonce):
@@ -51,6 +99,7 @@ def init_aes(shared_secret, nonce):
     check = hashlib.sha256(unhexlify(encryption_key)).digest()
     check = struct.unpack_from("<I", check[:4])[0]
     " AES "
+    from Crypto.Cipher import AES
     key = unhexlify(encryption_key[0:64])
     iv = unhexlify(encryption_key[64:96])
     return AES.new(key, AES.MODE_CBC, iv), check
@@ -115,6 +164,88 @@ def decode_memo(priv, message):
                string
 
     """
+    from_key, to_key, nonce, check, cipher = _parse_memo(message)
+
+    if repr(to_key) == repr(priv.pubkey):
+        secret = get_shared_secret(priv, from_key)
+    elif repr(from_key) == repr(priv.pubkey):
+        secret = get_shared_secret(priv, to_key)
+    else:
+        raise ValueError("Incorrect PrivateKey")
+    return _decrypt(secret, nonce, check, cipher)
+
+
+def decode_memos(privs, messages, processes=1, return_exceptions=False):
+    """ Decode many messages
+
+        :param list privs: Private Keys (of Bob), e.g. the memo keys of
+            an account
+        :param list messages: Encrypted Memo messages
+        :param int processes: Number of worker processes to derive the
+            shared secrets with (``None`` for the number of CPUs)
+        :param bool return_exceptions: Return exceptions of messages that
+            cannot be decoded instead of raising the first one
+        :return: Decrypted messages in the order of ``messages``
+        :rtype: list
+
+        The messages are grouped by counterparty, so that the shared
+        secret of every counterparty is derived only once.
+    """
+    if not isinstance(privs, (list, tuple, set)):
+        privs = [privs]
+    privkeys = dict((repr(priv.pubkey), repr(priv)) for priv in privs)
+
+    parsed = []
+    groups = {}
+    for message in messages:
+        try:
+            from_key, to_key, nonce, check, cipher = _parse_memo(message)
+            if repr(to_key) in privkeys:
+                pair = (privkeys[repr(to_key)], repr(from_key))
+            elif repr(from_key) in privkeys:
+                pair = (privkeys[repr(from_key)], repr(to_key))
+            else:
+                raise ValueError("Incorrect PrivateKey")
+            groups.setdefault(pair, []).append(len(parsed))
+            parsed.append((pair, nonce, check, cipher))
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            parsed.append(e)
+
+    missing = [pair for pair in groups if pair not in _secrets]
+    if processes != 1 and len(missing) > 1:
+        processes = processes or os.cpu_count() or 1
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(processes) as pool:
+            for pair, secret in zip(missing, pool.map(
+                    _shared_secret, missing,
+                    chunksize=max(1, len(missing) // (processes * 4)))):
+                _cacheSecret(pair, secret)
+
+    secrets = {}
+
+    results = []
+    for item in parsed:
+        if isinstance(item, Exception):
+            results.append(item)
+            continue
+        pair, nonce, check, cipher = item
+        try:
+            if pair not in secrets:
+                secrets[pair] = shared_secret(*pair)
+            results.append(_decrypt(secrets[pair], nonce, check, cipher))
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            results.append(e)
+    return results
+
+
+def _parse_memo(message):
+    """ Returns ``from_key, to_key, nonce, check, cipher`` of an
+        encrypted memo
+    """
     " decode structure "
     raw = base58decode(message[1:])
     from_key = PublicKey(raw[:66])
@@ -126,14 +257,10 @@ def decode_memo(priv, message):
     check = struct.unpack_from("<I", unhexlify(raw[:8]))[0]
     raw = raw[8:]
     cipher = raw
+    return from_key, to_key, nonce, check, cipher
 
-    if repr(to_key) == repr(priv.pubkey):
-        shared_secret = get_shared_secret(priv, from_key)
-    elif repr(from_key) == repr(priv.pubkey):
-        shared_secret = get_shared_secret(priv, to_key)
-    else:
-        raise ValueError("Incorrect PrivateKey")
 
+def _decrypt(shared_secret, nonce, check, cipher):
     " Init encryption "
     aes, checksum = init_aes(shared_secret, nonce)
 
@@ -141,10 +268,10 @@ def decode_memo(priv, message):
     assert check == checksum, "Checksum failure"
 
     " Encryption "
-    # remove the varint prefix (FIXME, long messages!)
-    message = cipher[2:]
-    from graphenebase.types import varintdecode
-    message = aes.decrypt(unhexlify(bytes(message, 'ascii')))
+    # remove the varint prefix
+    cipher = unhexlify(bytes(cipher, 'ascii'))
+    length, offset = readvarint(cipher)
+    message = aes.decrypt(cipher[offset:offset + length])
     try:
         return _unpad(message.decode('utf8'), 16)
     except:
@@ -0,0 +1,11 @@
+from graphenebase.signedblocks import Signed_Block as GrapheneSigned_Block
+from .signedtransactions import Signed_Transaction
+
+
+class Signed_Block(GrapheneSigned_Block):
+    """ Decodes signed blocks of the Steem blockchain from their wire
+        format, see ``graphenebase.signedblocks.Signed_Block``
+    """
+    @classmethod
+    def getTransactionKlass(cls):
+        return Signed_Transaction
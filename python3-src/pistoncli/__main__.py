@@ -23,7 +23,6 @@ from piston.blockchain import Blockchain
 from piston.block import Block
 from piston.dex import Dex
 from piston.witness import Witness
-import frontmatter
 import time
 from prettytable import PrettyTable
 import logging
@@ -38,7 +37,7 @@ from .ui import (
     get_terminal
 )
 from piston.exceptions import AccountDoesNotExistsException
-import pkg_resources  # part of setuptools
+from . import startup
 
 
 availableConfigurationKeys = [
@@ -56,9 +55,30 @@ availableConfigurationKeys = [
 ]
 
 
+class VersionAction(argparse.Action):
+    """ Like argparse's ``version`` action, but only looks up the
+        installed version when it is asked for
+    """
+    def __init__(self, option_strings, dest=argparse.SUPPRESS,
+                 default=argparse.SUPPRESS, help=None):
+        super(VersionAction, self).__init__(
+            option_strings=option_strings, dest=dest, default=default,
+            nargs=0, help=help)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        import pkg_resources  # part of setuptools
+        version = pkg_resources.require("piston-cli")[0].version
+        parser.exit(message="%s %s\n" % (parser.prog, version))
+
+
 def main():
     global args
 
+    if "--profile-startup" in sys.argv[1:] and not startup.profiling():
+        # Run the command again in a subprocess that reports its startup
+        sys.exit(startup.profile(sys.argv[1:]))
+    startup.mark("imports")
+
     parser = argparse.ArgumentParser(
         formatter_class=argparse.RawDescriptionHelpFormatter,
         description="Command line tool to interact with the Steem network"
@@ -113,10 +133,13 @@ def main():
     )
     parser.add_argument(
         '--version',
-        action='version',
-        version='%(prog)s {version}'.format(
-            version=pkg_resources.require("piston-cli")[0].version
-        )
+        action=VersionAction,
+        help="show program's version number and exit"
+    )
+    parser.add_argument(
+        '--profile-startup',
+        action='store_true',
+        help='Report the time spent importing and initializing each module'
     )
 
     subparsers = parser.add_subparsers(help='sub-command help')
@@ -1176,6 +1199,7 @@ def main():
         Parse Arguments
     """
     args = parser.parse_args()
+    startup.mark("arguments")
 
     # Logging
     log = logging.getLogger(__name__)
@@ -1240,6 +1264,7 @@ def main():
             options.update({"offline": True})
 
         steem = Steem(**options)
+        startup.mark("connect")
 
     if args.command == "set":
         if (args.key in ["default_author",
@@ -1441,6 +1466,7 @@ def main():
 
         reply_message = indent(parent["body"], "> ")
 
+        import frontmatter
         post = frontmatter.Post(reply_message, **{
             "title": args.title if args.title else "Re: " + parent["title"],
             "author": args.author if args.author else "required",
@@ -1478,11 +1504,13 @@ def main():
             "allow_curation_rewards": True,
         }
 
+        import frontmatter
         post = frontmatter.Post("", **initmeta)
         meta, json_meta, body = yaml_parse_file(args, initial_content=post)
 
         # Default "app"
         if "app" not in json_meta:
+            import pkg_resources  # part of setuptools
             version = pkg_resources.require("piston-cli")[0].version
             json_meta["app"] = "piston/{}".format(version)
 
@@ -1515,6 +1543,7 @@ def main():
             print("Can't find post %s" % args.post)
             return
 
+        import frontmatter
         post = frontmatter.Post(original_post["body"], **{
             "title": original_post["title"] + " (immutable)",
             "author": original_post["author"] + " (immutable)",
@@ -1573,6 +1602,7 @@ def main():
                         meta[key] = str(post[key])
                     else:
                         meta[key] = post[key]
+                import frontmatter
                 yaml = frontmatter.Post(body, **meta)
                 print(frontmatter.dumps(yaml))
             else:
@@ -0,0 +1,102 @@
+""" Startup profiling for ``piston --profile-startup``
+
+    The command is run again in a subprocess with ``python -X importtime``.
+    The subprocess reports the time of its initialization phases (see
+    ``mark()``) on stderr, and the parent sums everything up into a report.
+"""
+import atexit
+import os
+import subprocess
+import sys
+import time
+
+#: Environment variable that holds the start time of a profiled subprocess
+ENV = "PISTON_PROFILE_STARTUP"
+
+#: Prefix of the phase lines on stderr
+PREFIX = "piston-startup:"
+
+_last = None
+
+
+def profiling():
+    """ Is this process profiled?
+    """
+    return bool(os.environ.get(ENV))
+
+
+def mark(phase):
+    """ Report the time since the previous phase (or the start of the
+        process) as ``phase``. Does nothing unless profiled.
+
+        :param str phase: Name of the phase that just ended
+    """
+    global _last
+    if not profiling():
+        return
+    now = time.time()
+    if _last is None:
+        _last = float(os.environ[ENV])
+        # Whatever runs after the last mark is the command itself
+        atexit.register(mark, "command")
+    sys.stderr.write("%s %s %d\n" % (PREFIX, phase, (now - _last) * 1e6))
+    sys.stderr.flush()
+    _last = now
+
+
+def profile(argv, top=25):
+    """ Run the command line tool with ``argv`` in a profiled subprocess
+        and print the report to stderr. Returns the exit code.
+
+        :param list argv: Command line arguments
+        :param int top: Number of modules to list
+    """
+    argv = [a for a in argv if a != "--profile-startup"]
+    env = dict(os.environ)
+    env[ENV] = repr(time.time())
+    proc = subprocess.Popen(
+        [sys.executable, "-X", "importtime", "-m", "pistoncli"] + argv,
+        env=env,
+        stderr=subprocess.PIPE,
+        universal_newlines=True)
+
+    imports = []
+    phases = []
+    for line in proc.stderr:
+        if line.startswith("import time:"):
+            fields = line[len("import time:"):].split("|")
+            try:
+                imports.append(
+                    (int(fields[0]), int(fields[1]), fields[2].strip()))
+            except ValueError:
+                # header
+                pass
+        elif line.startswith(PREFIX):
+            phase, usec = line[len(PREFIX):].split()
+            phases.append((phase, int(usec)))
+        else:
+            sys.stderr.write(line)
+    proc.wait()
+
+    out = sys.stderr
+    out.write("\nStartup profile\n\n")
+    out.write("%-30s %10s\n" % ("Phase", "ms"))
+    for phase, usec in phases:
+        out.write("%-30s %10.1f\n" % (phase, usec / 1e3))
+    out.write("%-30s %10.1f\n" % ("total", sum(u for p, u in phases) / 1e3))
+
+    # Import and module initialization, summed up per package
+    packages = {}
+    for self_usec, cumulative, module in imports:
+        package = module.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_usec
+    out.write("\n%-30s %10s\n" % ("Package", "ms"))
+    for package, usec in sorted(
+            packages.items(), key=lambda x: -x[1])[:top]:
+        out.write("%-30s %10.1f\n" % (package, usec / 1e3))
+
+    out.write("\n%-50s %10s %10s\n" % ("Module", "self ms", "total ms"))
+    for self_usec, cumulative, module in sorted(imports, reverse=True)[:top]:
+        out.write("%-50s %10.1f %10.1f\n" % (
+            module, self_usec / 1e3, cumulative / 1e3))
+    return proc.returncode
@@ -2,7 +2,6 @@ import sys
 import json
 from prettytable import PrettyTable, ALL as allBorders
 from textwrap import fill, TextWrapper
-import frontmatter
 import re
 from piston.storage import configStorage as config
 from piston.utils import constructIdentifier
@@ -236,6 +235,7 @@ def dump_recursive_parents(rpc,
         body = markdownify(post["body"])
     else:
         body = post["body"]
+    import frontmatter
     yaml = frontmatter.Post(body, **meta)
     print(frontmatter.dumps(yaml))
 
@@ -263,6 +263,7 @@ def dump_recursive_comments(rpc,
             body = markdownify(post["body"])
         else:
             body = post["body"]
+        import frontmatter
         yaml = frontmatter.Post(body, **meta)
         print(frontmatter.dumps(yaml))
         reply = rpc.get_content_replies(post["author"], post["permlink"])
@@ -21,6 +21,13 @@ class SteemNodeRPC(GrapheneWebsocketRPC):
         :param str user: Username for Authentication
         :param str password: Password for Authentication
         :param Array apis: List of APIs to register to (default: ["database", "network_broadcast"])
+        :param bool pool: Keep connections to all ``urls`` and route each
+            call to the healthiest node (default: ``False``)
+        :param Array optional_apis: APIs to register to if the node offers
+            them (default: ``[]``)
+        :param handshake_cache: Cache for what is learned about a node
+            when connecting. Any object with ``get(url)`` and
+            ``set(url, data)``, e.g. ``piston.storage.handshakeStorage``
 
         Available APIs
 
@@ -36,6 +43,22 @@ class SteemNodeRPC(GrapheneWebsocketRPC):
             ws = SteemNodeRPC("ws://10.0.0.16:8090")
             print(ws.get_account_count())
 
+        Many calls can be sent as a single JSON-RPC batch. The results
+        come back in order and errors are mapped onto the same
+        exceptions as for single calls:
+
+        .. code-block:: python
+
+            with ws.batch() as b:
+                for name in ["init0", "init1"]:
+                    b.get_accounts([name])
+            print(b.results)
+
+        Logging in, registering to the APIs and identifying the network
+        are sent at once when connecting, so the handshake costs a
+        single round trip. With a ``handshake_cache``, the network does
+        not need to be identified again.
+
     """
     call_id = 0
     api_id = {}
@@ -49,15 +72,106 @@ class SteemNodeRPC(GrapheneWebsocketRPC):
             "apis",
             ["database", "network_broadcast"]
         )
+        self.optional_apis = kwargs.pop("optional_apis", [])
+        self.handshake_cache = kwargs.pop("handshake_cache", None)
+        self.chain_params = None
+        self.logged_in = False
         super(SteemNodeRPC, self).__init__(urls, user, password, **kwargs)
-        self.chain_params = self.get_network()
+        if not self.chain_params:
+            self.chain_params = self.get_network()
+
+    def wsconnect(self):
+        """ Connect to the next node. Logging in is left to
+            ``register_apis()``, which sends it along with the API
+            registrations.
+        """
+        self.wsopen()
+        self.logged_in = False
 
     def register_apis(self, apis=None):
-        for api in (apis or self.apis):
-            api = api.replace("_api", "")
-            self.api_id[api] = self.get_api_by_name("%s_api" % api, api_id=1)
-            if not self.api_id[api] and not isinstance(self.api_id[api], int):
+        """ Register to ``apis`` (defaults to ``apis`` and
+            ``optional_apis`` given at construction)
+
+            :param Array apis: Names of the APIs
+            :raises NoAccessApi: if the node does not offer one of the
+                ``apis`` (missing optional APIs are skipped)
+
+            Right after connecting, this also logs in and identifies the
+            network (unless ``chain_params`` are known or cached). All
+            calls are pipelined, which costs one round trip, also with
+            nodes that do not support batch arrays.
+        """
+        if apis:
+            required, optional = apis, []
+        else:
+            required, optional = self.apis, self.optional_apis
+        names = [api.replace("_api", "") for api in required + optional]
+
+        calls = []
+        login = not self.logged_in and not self.pool
+        if login:
+            calls.append(("login", [self.user, self.password], {"api_id": 1}))
+        calls.extend(
+            ("get_api_by_name", ["%s_api" % api], {"api_id": 1})
+            for api in names
+        )
+        if not self.chain_params and self.handshake_cache:
+            cached = self.handshake_cache.get(self.url)
+            if cached and cached.get("chain_params"):
+                self.chain_params = cached["chain_params"]
+        identify = not self.chain_params
+        if identify:
+            calls.append(("get_dynamic_global_properties", []))
+
+        if self.pool:
+            # The pool sends registrations to all of its nodes, one at
+            # a time
+            results = []
+            for call in calls:
+                try:
+                    results.append(getattr(self, call[0])(
+                        *call[1], **(call[2] if len(call) > 2 else {})))
+                except Exception as e:
+                    results.append(e)
+        else:
+            results = self.call_many(
+                calls, return_exceptions=True, batch=False)
+
+        if login:
+            if isinstance(results[0], Exception):
+                raise results[0]
+            self.logged_in = True
+            results = results[1:]
+        if identify:
+            props = results.pop()
+            if isinstance(props, Exception):
+                raise props
+            self.chain_params = self._chain_params(props)
+            if self.handshake_cache:
+                self.handshake_cache.set(
+                    self.url, {"chain_params": self.chain_params})
+
+        for i, (api, api_id) in enumerate(zip(names, results)):
+            if isinstance(api_id, Exception) or (
+                    not api_id and not isinstance(api_id, int)):
+                if i >= len(required):
+                    log.info("No permission to access %s API. " % api)
+                    continue
+                if isinstance(api_id, Exception):
+                    raise api_id
                 raise NoAccessApi("No permission to access %s API. " % api)
+            self.api_id[api] = api_id
+
+    def clone(self):
+        """ Open another connection to the same node with the same
+            settings, e.g. to run calls on several connections at once
+        """
+        return self.__class__(
+            self.url, self.user, self.password,
+            apis=self.apis,
+            optional_apis=self.optional_apis,
+            handshake_cache=self.handshake_cache,
+            num_retries=self.num_retries)
 
     def get_account(self, name):
         account = self.get_accounts([name])
@@ -105,7 +219,12 @@ class SteemNodeRPC(GrapheneWebsocketRPC):
             dictionary with keys chain_id, prefix, and other chain
             specific settings
         """
-        props = self.get_dynamic_global_properties()
+        return self._chain_params(self.get_dynamic_global_properties())
+
+    def _chain_params(self, props):
+        """ Look up the chain of the global properties ``props``
+            (internally used)
+        """
         chain = props["current_supply"].split(" ")[1]
         assert chain in known_chains, "The chain you are connecting to is not supported"
         return known_chains.get(chain)
@@ -123,32 +242,42 @@ class SteemNodeRPC(GrapheneWebsocketRPC):
             # Forward call to GrapheneWebsocketRPC and catch+evaluate errors
             return super(SteemNodeRPC, self).rpcexec(payload)
         except RPCError as e:
-            msg = exceptions.decodeRPCErrorMsg(e).strip()
-            if msg == "Account already transacted this block.":
-                raise exceptions.AlreadyTransactedThisBlock(msg)
-            elif msg == "missing required posting authority":
-                raise exceptions.MissingRequiredPostingAuthority
-            elif msg == "Voting weight is too small, please accumulate more voting power or steem power.":
-                raise exceptions.VoteWeightTooSmall(msg)
-            elif msg == "Can only vote once every 3 seconds.":
-                raise exceptions.OnlyVoteOnceEvery3Seconds(msg)
-            elif msg == "You have already voted in a similar way.":
-                raise exceptions.AlreadyVotedSimilarily(msg)
-            elif msg == "You may only post once every 5 minutes.":
-                raise exceptions.PostOnlyEvery5Min(msg)
-            elif msg == "Duplicate transaction check failed":
-                raise exceptions.DuplicateTransaction(msg)
-            elif msg == "Account exceeded maximum allowed bandwidth per vesting share.":
-                raise exceptions.ExceededAllowedBandwidth(msg)
-            elif re.match("^no method with name.*", msg):
-                raise exceptions.NoMethodWithName(msg)
-            elif msg:
-                raise exceptions.UnhandledRPCError(msg)
-            else:
-                raise e
+            raise self.translate_error(e)
         except Exception as e:
             raise e
 
+    def translate_error(self, e):
+        """ Map an ``RPCError`` returned by the node onto the Steem
+            specific exceptions in ``exceptions``. This is also used for
+            the results of ``batch()`` and ``call_many()``.
+        """
+        if type(e) is not RPCError:
+            # already translated
+            return e
+        msg = exceptions.decodeRPCErrorMsg(e).strip()
+        if msg == "Account already transacted this block.":
+            return exceptions.AlreadyTransactedThisBlock(msg)
+        elif msg == "missing required posting authority":
+            return exceptions.MissingRequiredPostingAuthority()
+        elif msg == "Voting weight is too small, please accumulate more voting power or steem power.":
+            return exceptions.VoteWeightTooSmall(msg)
+        elif msg == "Can only vote once every 3 seconds.":
+            return exceptions.OnlyVoteOnceEvery3Seconds(msg)
+        elif msg == "You have already voted in a similar way.":
+            return exceptions.AlreadyVotedSimilarily(msg)
+        elif msg == "You may only post once every 5 minutes.":
+            return exceptions.PostOnlyEvery5Min(msg)
+        elif msg == "Duplicate transaction check failed":
+            return exceptions.DuplicateTransaction(msg)
+        elif msg == "Account exceeded maximum allowed bandwidth per vesting share.":
+            return exceptions.ExceededAllowedBandwidth(msg)
+        elif re.match("^no method with name.*", msg):
+            return exceptions.NoMethodWithName(msg)
+        elif msg:
+            return exceptions.UnhandledRPCError(msg)
+        else:
+            return e
+
     def __getattr__(self, name):
         """ Map all methods to RPC calls and pass through the arguments.
             It makes use of the GrapheneRPC library.
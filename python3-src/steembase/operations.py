@@ -17,6 +17,8 @@ from .operationids import operations
 
 default_prefix = "STM"
 
+decodePublicKey = PublicKey.decoder(default_prefix)
+
 asset_precision = {
     "STEEM": 3,
     "VESTS": 6,
@@ -56,6 +58,12 @@ class Operation(GrapheneOperation):
 
 
 class Permission(GrapheneObject):
+    layout = [
+        ('weight_threshold', Uint32.decode),
+        ('account_auths', Map.decoder(String.decode, Uint16.decode)),
+        ('key_auths', Map.decoder(decodePublicKey, Uint16.decode)),
+    ]
+
     def __init__(self, *args, **kwargs):
         if isArgsThisClass(self, args):
             self.data = args[0].data
@@ -94,6 +102,14 @@ class Permission(GrapheneObject):
 
 
 class Memo(GrapheneObject):
+    layout = [
+        ('from', decodePublicKey),
+        ('to', decodePublicKey),
+        ('nonce', Uint64.decode),
+        ('check', Uint32.decode),
+        ('encrypted', Bytes.decode),
+    ]
+
     def __init__(self, *args, **kwargs):
         if isArgsThisClass(self, args):
             self.data = args[0].data
@@ -113,6 +129,13 @@ class Memo(GrapheneObject):
 
 
 class Vote(GrapheneObject):
+    layout = [
+        ('voter', String.decode),
+        ('author', String.decode),
+        ('permlink', String.decode),
+        ('weight', Int16.decode),
+    ]
+
     def __init__(self, *args, **kwargs):
         if isArgsThisClass(self, args):
             self.data = args[0].data
@@ -128,6 +151,16 @@ class Vote(GrapheneObject):
 
 
 class Comment(GrapheneObject):
+    layout = [
+        ('parent_author', String.decode),
+        ('parent_permlink', String.decode),
+        ('author', String.decode),
+        ('permlink', String.decode),
+        ('title', String.decode),
+        ('body', String.decode),
+        ('json_metadata', String.decode),
+    ]
+
     def __init__(self, *args, **kwargs):
         if isArgsThisClass(self, args):
             self.data = args[0].data
@@ -154,6 +187,8 @@ class Comment(GrapheneObject):
 
 
 class Amount():
+    fmt = "<qb7s"
+
     def __init__(self, d):
         self.amount, self.asset = d.strip().split(" ")
         self.amount = float(self.amount)
@@ -173,6 +208,13 @@ class Amount():
             bytes(asset, "ascii")
         )
 
+    def packValues(self):
+        return (
+            round(float(self.amount) * 10 ** self.precision),
+            self.precision,
+            bytes(self.asset, "ascii"),
+        )
+
     def __str__(self):
         return '{:.{}f} {}'.format(
             self.amount,
@@ -180,8 +222,25 @@ class Amount():
             self.asset
         )
 
+    @staticmethod
+    def decode(data, offset=0):
+        amount, precision = struct.unpack_from("<qb", data, offset)
+        asset = bytes(data[offset + 9:offset + 16]).rstrip(b"\x00")
+        whole, fraction = divmod(abs(amount), 10 ** precision)
+        return "%s%d%s %s" % (
+            "-" if amount < 0 else "",
+            whole,
+            ".%0*d" % (precision, fraction) if precision else "",
+            asset.decode("ascii"),
+        ), offset + 16
+
 
 class Exchange_rate(GrapheneObject):
+    layout = [
+        ('base', Amount.decode),
+        ('quote', Amount.decode),
+    ]
+
     def __init__(self, *args, **kwargs):
         if isArgsThisClass(self, args):
             self.data = args[0].data
@@ -196,6 +255,12 @@ class Exchange_rate(GrapheneObject):
 
 
 class Witness_props(GrapheneObject):
+    layout = [
+        ('account_creation_fee', Amount.decode),
+        ('maximum_block_size', Uint32.decode),
+        ('sbd_interest_rate', Uint16.decode),
+    ]
+
     def __init__(self, *args, **kwargs):
         if isArgsThisClass(self, args):
             self.data = args[0].data
@@ -216,6 +281,17 @@ class Witness_props(GrapheneObject):
 
 
 class Account_create(GrapheneObject):
+    layout = [
+        ('fee', Amount.decode),
+        ('creator', String.decode),
+        ('new_account_name', String.decode),
+        ('owner', Permission.decode),
+        ('active', Permission.decode),
+        ('posting', Permission.decode),
+        ('memo_key', decodePublicKey),
+        ('json_metadata', String.decode),
+    ]
+
     def __init__(self, *args, **kwargs):
         if isArgsThisClass(self, args):
             self.data = args[0].data
@@ -245,6 +321,15 @@ class Account_create(GrapheneObject):
 
 
 class Account_update(GrapheneObject):
+    layout = [
+        ('account', String.decode),
+        ('owner', Optional.decoder(Permission.decode)),
+        ('active', Optional.decoder(Permission.decode)),
+        ('posting', Optional.decoder(Permission.decode)),
+        ('memo_key', decodePublicKey),
+        ('json_metadata', String.decode),
+    ]
+
     def __init__(self, *args, **kwargs):
         if isArgsThisClass(self, args):
             self.data = args[0].data
@@ -275,6 +360,13 @@ class Account_update(GrapheneObject):
 
 
 class Transfer(GrapheneObject):
+    layout = [
+        ('from', String.decode),
+        ('to', String.decode),
+        ('amount', Amount.decode),
+        ('memo', String.decode),
+    ]
+
     def __init__(self, *args, **kwargs):
         if isArgsThisClass(self, args):
             self.data = args[0].data
@@ -292,6 +384,12 @@ class Transfer(GrapheneObject):
 
 
 class Transfer_to_vesting(GrapheneObject):
+    layout = [
+        ('from', String.decode),
+        ('to', String.decode),
+        ('amount', Amount.decode),
+    ]
+
     def __init__(self, *args, **kwargs):
         if isArgsThisClass(self, args):
             self.data = args[0].data
@@ -306,6 +404,11 @@ class Transfer_to_vesting(GrapheneObject):
 
 
 class Withdraw_vesting(GrapheneObject):
+    layout = [
+        ('account', String.decode),
+        ('vesting_shares', Amount.decode),
+    ]
+
     def __init__(self, *args, **kwargs):
         if isArgsThisClass(self, args):
             self.data = args[0].data
@@ -319,6 +422,15 @@ class Withdraw_vesting(GrapheneObject):
 
 
 class Limit_order_create(GrapheneObject):
+    layout = [
+        ('owner', String.decode),
+        ('orderid', Uint32.decode),
+        ('amount_to_sell', Amount.decode),
+        ('min_to_receive', Amount.decode),
+        ('fill_or_kill', Bool.decode),
+        ('expiration', PointInTime.decode),
+    ]
+
     def __init__(self, *args, **kwargs):
         if isArgsThisClass(self, args):
             self.data = args[0].data
@@ -336,6 +448,11 @@ class Limit_order_create(GrapheneObject):
 
 
 class Limit_order_cancel(GrapheneObject):
+    layout = [
+        ('owner', String.decode),
+        ('orderid', Uint32.decode),
+    ]
+
     def __init__(self, *args, **kwargs):
         if isArgsThisClass(self, args):
             self.data = args[0].data
@@ -349,6 +466,13 @@ class Limit_order_cancel(GrapheneObject):
 
 
 class Set_withdraw_vesting_route(GrapheneObject):
+    layout = [
+        ('from_account', String.decode),
+        ('to_account', String.decode),
+        ('percent', Uint16.decode),
+        ('auto_vest', Bool.decode),
+    ]
+
     def __init__(self, *args, **kwargs):
         if isArgsThisClass(self, args):
             self.data = args[0].data
@@ -364,6 +488,12 @@ class Set_withdraw_vesting_route(GrapheneObject):
 
 
 class Convert(GrapheneObject):
+    layout = [
+        ('owner', String.decode),
+        ('requestid', Uint32.decode),
+        ('amount', Amount.decode),
+    ]
+
     def __init__(self, *args, **kwargs):
         if isArgsThisClass(self, args):
             self.data = args[0].data
@@ -378,6 +508,11 @@ class Convert(GrapheneObject):
 
 
 class Feed_publish(GrapheneObject):
+    layout = [
+        ('publisher', String.decode),
+        ('exchange_rate', Exchange_rate.decode),
+    ]
+
     def __init__(self, *args, **kwargs):
         if isArgsThisClass(self, args):
             self.data = args[0].data
@@ -391,6 +526,14 @@ class Feed_publish(GrapheneObject):
 
 
 class Witness_update(GrapheneObject):
+    layout = [
+        ('owner', String.decode),
+        ('url', String.decode),
+        ('block_signing_key', decodePublicKey),
+        ('props', Witness_props.decode),
+        ('fee', Amount.decode),
+    ]
+
     def __init__(self, *args, **kwargs):
         if isArgsThisClass(self, args):
             self.data = args[0].data
@@ -411,6 +554,13 @@ class Witness_update(GrapheneObject):
 
 
 class Transfer_to_savings(GrapheneObject):
+    layout = [
+        ('from', String.decode),
+        ('to', String.decode),
+        ('amount', Amount.decode),
+        ('memo', String.decode),
+    ]
+
     def __init__(self, *args, **kwargs):
         if isArgsThisClass(self, args):
             self.data = args[0].data
@@ -428,6 +578,14 @@ class Transfer_to_savings(GrapheneObject):
 
 
 class Transfer_from_savings(GrapheneObject):
+    layout = [
+        ('from', String.decode),
+        ('request_id', Uint32.decode),
+        ('to', String.decode),
+        ('amount', Amount.decode),
+        ('memo', String.decode),
+    ]
+
     def __init__(self, *args, **kwargs):
         if isArgsThisClass(self, args):
             self.data = args[0].data
@@ -447,6 +605,11 @@ class Transfer_from_savings(GrapheneObject):
 
 
 class Cancel_transfer_from_savings(GrapheneObject):
+    layout = [
+        ('from', String.decode),
+        ('request_id', Uint32.decode),
+    ]
+
     def __init__(self, *args, **kwargs):
         if isArgsThisClass(self, args):
             self.data = args[0].data
@@ -460,6 +623,12 @@ class Cancel_transfer_from_savings(GrapheneObject):
 
 
 class Account_witness_vote(GrapheneObject):
+    layout = [
+        ('account', String.decode),
+        ('witness', String.decode),
+        ('approve', Bool.decode),
+    ]
+
     def __init__(self, *args, **kwargs):
         if isArgsThisClass(self, args):
             self.data = args[0].data
@@ -473,7 +642,71 @@ class Account_witness_vote(GrapheneObject):
             ]))
 
 
+class Account_witness_proxy(GrapheneObject):
+    layout = [
+        ('account', String.decode),
+        ('proxy', String.decode),
+    ]
+
+    def __init__(self, *args, **kwargs):
+        if isArgsThisClass(self, args):
+            self.data = args[0].data
+        else:
+            if len(args) == 1 and len(kwargs) == 0:
+                kwargs = args[0]
+            super().__init__(OrderedDict([
+                ('account', String(kwargs["account"])),
+                ('proxy', String(kwargs["proxy"])),
+            ]))
+
+
+class Delete_comment(GrapheneObject):
+    layout = [
+        ('author', String.decode),
+        ('permlink', String.decode),
+    ]
+
+    def __init__(self, *args, **kwargs):
+        if isArgsThisClass(self, args):
+            self.data = args[0].data
+        else:
+            if len(args) == 1 and len(kwargs) == 0:
+                kwargs = args[0]
+            super().__init__(OrderedDict([
+                ('author', String(kwargs["author"])),
+                ('permlink', String(kwargs["permlink"])),
+            ]))
+
+
+class Custom(GrapheneObject):
+    layout = [
+        ('required_auths', Array.decoder(String.decode)),
+        ('id', Uint16.decode),
+        ('data', Bytes.decode),
+    ]
+
+    def __init__(self, *args, **kwargs):
+        if isArgsThisClass(self, args):
+            self.data = args[0].data
+        else:
+            if len(args) == 1 and len(kwargs) == 0:
+                kwargs = args[0]
+            super().__init__(OrderedDict([
+                ('required_auths',
+                    Array([String(o) for o in kwargs["required_auths"]])),
+                ('id', Uint16(int(kwargs["id"]))),
+                ('data', Bytes(kwargs["data"])),
+            ]))
+
+
 class Custom_json(GrapheneObject):
+    layout = [
+        ('required_auths', Array.decoder(String.decode)),
+        ('required_posting_auths', Array.decoder(String.decode)),
+        ('id', String.decode),
+        ('json', String.decode),
+    ]
+
     def __init__(self, *args, **kwargs):
         if isArgsThisClass(self, args):
             self.data = args[0].data
@@ -500,7 +733,54 @@ class Custom_json(GrapheneObject):
             ]))
 
 
+class Beneficiary(GrapheneObject):
+    layout = [
+        ('account', String.decode),
+        ('weight', Uint16.decode),
+    ]
+
+    def __init__(self, *args, **kwargs):
+        if isArgsThisClass(self, args):
+            self.data = args[0].data
+        else:
+            if len(args) == 1 and len(kwargs) == 0:
+                kwargs = args[0]
+            super().__init__(OrderedDict([
+                ('account', String(kwargs["account"])),
+                ('weight', Uint16(int(kwargs["weight"]))),
+            ]))
+
+
+class Comment_payout_beneficiaries(GrapheneObject):
+    layout = [
+        ('beneficiaries', Array.decoder(Beneficiary.decode)),
+    ]
+
+    def __init__(self, *args, **kwargs):
+        if isArgsThisClass(self, args):
+            self.data = args[0].data
+        else:
+            if len(args) == 1 and len(kwargs) == 0:
+                kwargs = args[0]
+            super().__init__(OrderedDict([
+                ('beneficiaries',
+                    Array([Beneficiary(o) for o in kwargs["beneficiaries"]])),
+            ]))
+
+
 class Comment_options(GrapheneObject):
+    layout = [
+        ('author', String.decode),
+        ('permlink', String.decode),
+        ('max_accepted_payout', Amount.decode),
+        ('percent_steem_dollars', Uint16.decode),
+        ('allow_votes', Bool.decode),
+        ('allow_curation_rewards', Bool.decode),
+        ('extensions', Array.decoder(Static_variant.decoder([
+            Comment_payout_beneficiaries.decode,
+        ]))),
+    ]
+
     def __init__(self, *args, **kwargs):
         if isArgsThisClass(self, args):
             self.data = args[0].data
@@ -514,5 +794,8 @@ class Comment_options(GrapheneObject):
                 ('percent_steem_dollars', Uint16(int(kwargs["percent_steem_dollars"]))),
                 ('allow_votes', Bool(bool(kwargs["allow_votes"]))),
                 ('allow_curation_rewards', Bool(bool(kwargs["allow_curation_rewards"]))),
-                ('extensions', Array([])),
+                ('extensions', Array([
+                    Static_variant(Comment_payout_beneficiaries(e[1]), e[0])
+                    for e in kwargs.get("extensions", [])
+                ])),
             ]))
@@ -20,10 +20,21 @@ class Signed_Transaction(GrapheneSigned_Transaction):
     def sign(self, wifkeys, chain="STEEM"):
         return super(Signed_Transaction, self).sign(wifkeys, chain)
 
+    @classmethod
+    def signMany(cls, transactions, wifkeys, chain="STEEM", processes=None):
+        return super(Signed_Transaction, cls).signMany(
+            transactions, wifkeys, chain, processes)
+
+    @classmethod
+    def verifyMany(cls, transactions, pubkeys=None, chain="STEEM", processes=None):
+        return super(Signed_Transaction, cls).verifyMany(
+            transactions, pubkeys, chain, processes)
+
     def verify(self, pubkeys=[], chain="STEEM"):
         return super(Signed_Transaction, self).verify(pubkeys, chain)
 
-    def getOperationKlass(self):
+    @classmethod
+    def getOperationKlass(cls):
         return Operation
 
     def getKnownChains(self):
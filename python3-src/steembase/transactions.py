@@ -17,6 +17,8 @@ from .operations import (
     Limit_order_cancel, Set_withdraw_vesting_route, Convert, Feed_publish,
     Witness_update, Transfer_to_savings, Transfer_from_savings,
     Cancel_transfer_from_savings, Account_witness_vote, Custom_json,
+    Comment_options, Beneficiary, Comment_payout_beneficiaries,
+    Account_witness_proxy, Delete_comment, Custom,
 )
 from .chains import known_chains
 
@@ -35,6 +37,16 @@ class Signed_Transaction(GrapheneSigned_Transaction):
     def sign(self, wifkeys, chain=chain):
         return super(Signed_Transaction, self).sign(wifkeys, chain)
 
+    @classmethod
+    def signMany(cls, transactions, wifkeys, chain=chain, processes=None):
+        return super(Signed_Transaction, cls).signMany(
+            transactions, wifkeys, chain, processes)
+
+    @classmethod
+    def verifyMany(cls, transactions, pubkeys=None, chain=chain, processes=None):
+        return super(Signed_Transaction, cls).verifyMany(
+            transactions, pubkeys, chain, processes)
+
     def verify(self, pubkey, chain=chain):
         return super(Signed_Transaction, self).verify(pubkey, chain)
 